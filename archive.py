@@ -0,0 +1,191 @@
+"""
+Archival of completed reservations.
+
+`flask reservations archive --before=YYYY-MM-DD` moves reservations whose
+rental ended before that date (and before today) from `reservations` to
+`reservations_archive`, and drops the car_occupancy rows of days before it,
+which no booking can use any more. This keeps the tables the booking and
+admin endpoints read down to current and future rentals plus a recent tail.
+
+Work happens in batches of --batch-size rows, each moved by an
+INSERT ... SELECT and a DELETE in one transaction, so an interrupted run
+leaves every row in exactly one table and rerunning the command picks up
+where it stopped. --max-batches bounds a run (for a nightly window) and
+--sleep spaces batches out on a busy database. On Postgres the batch rows
+are locked with SKIP LOCKED, so two runs at once do not collide.
+
+When the archive table is range-partitioned by start_date (see the
+migration that creates it), a yearly partition is created before the first
+row of that year is moved, in a short transaction of its own: the DDL
+locks the whole archive table, which must not be held for a batch.
+
+Reports that need history select from all_reservations(), the union of
+both tables; GET /reservations/export?include_archived=true does this.
+"""
+
+import logging
+import time
+from datetime import date, datetime
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import delete, func, insert, literal, select, text, tuple_, union_all
+
+from extensions import db
+from models import CarOccupancy, Reservation, ReservationArchive
+
+logger = logging.getLogger(__name__)
+
+ARCHIVED_COLUMNS = (
+    "id", "firstname", "lastname", "email", "home", "cell", "car_id",
+    "start_date", "end_date", "total_price", "created_at",
+)
+
+
+def cutoff_for(before):
+    """Reservations ending before this date are complete and may be archived"""
+    return min(before, date.today())
+
+
+def is_partitioned():
+    if db.session.get_bind().dialect.name != "postgresql":
+        return False
+    return db.session.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid"
+        " WHERE c.relname = 'reservations_archive'"
+    )).first() is not None
+
+
+def partition_years():
+    """Years that already have a reservations_archive_<year> partition"""
+    names = db.session.execute(text(
+        "SELECT c.relname FROM pg_inherits i"
+        " JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent"
+        " WHERE p.relname = 'reservations_archive'"
+    )).scalars()
+    years = {name.rsplit("_", 1)[1] for name in names}
+    db.session.rollback()
+    return {int(year) for year in years if year.isdigit()}
+
+
+def ensure_year_partitions(years):
+    """Create reservations_archive_<year> partitions that do not exist yet, and commit"""
+    for year in sorted(years):
+        db.session.execute(text(
+            f"CREATE TABLE IF NOT EXISTS reservations_archive_{year:d} PARTITION OF reservations_archive"
+            f" FOR VALUES FROM ('{year:d}-01-01') TO ('{year + 1:d}-01-01')"
+        ))
+    db.session.commit()
+
+
+def archive_batch_query(cutoff, batch_size):
+    """Select (id, start_date) of up to batch_size completed reservations, read off the end_date index"""
+    return (
+        select(Reservation.id, Reservation.start_date)
+        .where(Reservation.end_date < cutoff)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+
+
+def archive_batch(cutoff, batch_size, years=None):
+    """Move up to batch_size completed reservations in one transaction; returns how many moved.
+
+    For a partitioned archive, `years` is the set of years with a partition;
+    missing ones are created (and added to it) before the batch is moved.
+    """
+    while True:
+        rows = db.session.execute(archive_batch_query(cutoff, batch_size)).all()
+        if not rows:
+            db.session.rollback()
+            return 0
+        missing = {row.start_date.year for row in rows} - years if years is not None else set()
+        if not missing:
+            break
+        # Release the batch's row locks before the DDL, then select the batch again
+        db.session.rollback()
+        ensure_year_partitions(missing)
+        years |= missing
+    ids = [row.id for row in rows]
+
+    db.session.execute(
+        insert(ReservationArchive).from_select(
+            [*ARCHIVED_COLUMNS, "archived_at"],
+            select(*(getattr(Reservation, name) for name in ARCHIVED_COLUMNS), literal(datetime.utcnow()))
+            .where(Reservation.id.in_(ids)),
+        )
+    )
+    db.session.execute(delete(Reservation).where(Reservation.id.in_(ids)))
+    db.session.commit()
+    return len(ids)
+
+
+def purge_occupancy(cutoff, batch_size):
+    """Delete car_occupancy rows for days before cutoff in batches; returns how many went"""
+    removed = 0
+    while True:
+        keys = db.session.execute(
+            select(CarOccupancy.car_id, CarOccupancy.day)
+            .where(CarOccupancy.day < cutoff)
+            .limit(batch_size)
+        ).all()
+        if not keys:
+            db.session.rollback()
+            return removed
+        db.session.execute(
+            delete(CarOccupancy).where(tuple_(CarOccupancy.car_id, CarOccupancy.day).in_([tuple(k) for k in keys]))
+        )
+        db.session.commit()
+        removed += len(keys)
+
+
+def archive_before(before, batch_size=1000, max_batches=None, sleep=0.0):
+    """Archive reservations that ended before `before`; returns (moved, batches, occupancy rows purged).
+
+    Occupancy is purged only once no completed reservation is left, so a
+    run stopped by max_batches leaves availability data untouched.
+    """
+    cutoff = cutoff_for(before)
+    years = partition_years() if is_partitioned() else None
+    moved = batches = 0
+    while max_batches is None or batches < max_batches:
+        count = archive_batch(cutoff, batch_size, years)
+        if not count:
+            break
+        moved += count
+        batches += 1
+        logger.info(f"Archived batch {batches}: {count} reservations ({moved} so far)")
+        if sleep:
+            time.sleep(sleep)
+
+    remaining = db.session.execute(
+        select(func.count()).select_from(Reservation).where(Reservation.end_date < cutoff)
+    ).scalar()
+    purged = purge_occupancy(cutoff, batch_size) if not remaining else 0
+    return moved, batches, purged
+
+
+def all_reservations():
+    """Subquery over reservations and archived reservations with the shared columns"""
+    return union_all(
+        select(*(getattr(Reservation, name) for name in ARCHIVED_COLUMNS)),
+        select(*(getattr(ReservationArchive, name) for name in ARCHIVED_COLUMNS)),
+    ).subquery("all_reservations")
+
+
+reservations_cli = AppGroup("reservations", help="Maintain the reservations tables.")
+
+
+@reservations_cli.command("archive")
+@click.option("--before", required=True, type=click.DateTime(formats=["%Y-%m-%d"]),
+              help="Archive rentals that ended before this date (YYYY-MM-DD; capped at today).")
+@click.option("--batch-size", default=1000, show_default=True)
+@click.option("--max-batches", type=int, default=None, help="Stop after this many batches; rerun to continue.")
+@click.option("--sleep", default=0.0, show_default=True, help="Seconds to pause between batches.")
+def archive_command(before, batch_size, max_batches, sleep):
+    """Move completed reservations to reservations_archive."""
+    moved, batches, purged = archive_before(before.date(), batch_size, max_batches, sleep)
+    message = (f"Archived {moved} reservations in {batches} batches; "
+               f"removed {purged} past occupancy rows")
+    logger.info(message)
+    click.echo(message)
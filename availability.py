@@ -0,0 +1,239 @@
+"""
+Date-range availability for the fleet.
+
+`Car.quantity` is the number of units of a car that we own. How many of
+them are taken on a given day lives in `car_occupancy`, one row per
+(car, day) that has at least one booking, kept in step with reservations by
+reserve() and release(). A reservation occupies the days from its
+start_date up to, but not including, its end_date (a same-day rental
+occupies its start day), so a car returned in the morning can go out again
+that day.
+
+Free units for a window are the owned units minus the busiest day in the
+window, which for the whole fleet is a single GROUP BY over the
+(day, car_id) index.
+"""
+
+from collections import Counter
+from datetime import timedelta
+
+from sqlalchemy import Date, Integer, bindparam, case, exists, func, select
+
+from extensions import db
+from models import Car, CarCategory, CarOccupancy
+
+
+def occupied_range(start_date, end_date):
+    """Half-open [first, last) range of days a booking occupies"""
+    return start_date, max(end_date, start_date + timedelta(days=1))
+
+
+def _greatest(*args):
+    if db.session.get_bind().dialect.name == "sqlite":
+        return func.max(*args)
+    return func.greatest(*args)
+
+
+def _insert_missing_days(car_id, days):
+    """Add a booked=0 row for each day of a car that has none yet"""
+    rows = [{"car_id": car_id, "day": day, "booked": 0} for day in days]
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        db.session.execute(
+            insert(CarOccupancy).on_conflict_do_nothing(index_elements=[CarOccupancy.car_id, CarOccupancy.day]),
+            rows,
+        )
+        return
+
+    # Portable INSERT ... SELECT ... WHERE NOT EXISTS; a concurrent insert of
+    # the same day fails the transaction, which the caller rolls back
+    table = CarOccupancy.__table__
+    car, day = bindparam("car_id", type_=Integer), bindparam("day", type_=Date)
+    missing = (
+        select(car, day, bindparam("booked", type_=Integer))
+        .where(~exists().where(table.c.car_id == car, table.c.day == day))
+    )
+    db.session.execute(table.insert().from_select(["car_id", "day", "booked"], missing), rows)
+
+
+def reserve(car_id, start_date, end_date, units=1):
+    """Atomically take `units` of a car for every day of a booking.
+
+    The free-units check and the increment are one conditional UPDATE, so
+    concurrent bookings cannot both take the last unit: on Postgres the
+    second waits for the first's row locks and then re-checks the condition.
+    Returns False if any day had too few free units; some days may already
+    have been incremented, so the caller must roll back.
+    """
+    first, last = occupied_range(start_date, end_date)
+    return _take(car_id, {first + timedelta(days=n): units for n in range((last - first).days)})
+
+
+def reserve_many(car_id, windows):
+    """reserve() for several (start_date, end_date) bookings of one car in one UPDATE.
+
+    Overlapping windows add up on the days they share. All or none of the
+    bookings fit; on False the caller must roll back, as with reserve().
+    """
+    per_day = Counter()
+    for start_date, end_date in windows:
+        first, last = occupied_range(start_date, end_date)
+        per_day.update(first + timedelta(days=n) for n in range((last - first).days))
+    return _take(car_id, per_day)
+
+
+def _take(car_id, per_day):
+    """Conditionally add per_day[day] bookings to each day's row for a car"""
+    days = sorted(per_day)
+
+    # Make sure every day has a row to lock and update
+    _insert_missing_days(car_id, days)
+
+    if len(set(per_day.values())) == 1:
+        increment = per_day[days[0]]
+    else:
+        increment = case(per_day, value=CarOccupancy.day)
+
+    if (days[-1] - days[0]).days + 1 == len(days):
+        in_days = (CarOccupancy.day >= days[0]) & (CarOccupancy.day <= days[-1])
+    else:
+        in_days = CarOccupancy.day.in_(days)
+
+    owned = select(func.coalesce(Car.quantity, 0)).where(Car.id == car_id).scalar_subquery()
+    result = db.session.execute(
+        CarOccupancy.__table__.update()
+        .where(
+            CarOccupancy.car_id == car_id,
+            in_days,
+            CarOccupancy.booked + increment <= owned,
+        )
+        .values(booked=CarOccupancy.booked + increment)
+    )
+    return result.rowcount == len(days)
+
+
+def release(car_id, start_date, end_date, units=1):
+    """Undo reserve() for a cancelled reservation"""
+    first, last = occupied_range(start_date, end_date)
+    in_range = (
+        (CarOccupancy.car_id == car_id)
+        & (CarOccupancy.day >= first)
+        & (CarOccupancy.day < last)
+    )
+    db.session.execute(
+        CarOccupancy.__table__.update()
+        .where(in_range)
+        .values(booked=CarOccupancy.booked - units)
+    )
+    db.session.execute(CarOccupancy.__table__.delete().where(in_range & (CarOccupancy.booked <= 0)))
+
+
+def peak_bookings(start_date, end_date, car_id=None):
+    """Subquery of (car_id, booked) with each car's busiest day in the window"""
+    first, last = occupied_range(start_date, end_date)
+    query = (
+        select(CarOccupancy.car_id, func.max(CarOccupancy.booked).label("booked"))
+        .where(CarOccupancy.day >= first, CarOccupancy.day < last)
+        .group_by(CarOccupancy.car_id)
+    )
+    if car_id is not None:
+        query = query.where(CarOccupancy.car_id == car_id)
+    return query.subquery()
+
+
+def with_free_units(query, start_date, end_date, order_by=()):
+    """Add each car's free units for the window to a select over Car; returns (query, available).
+
+    Each car's occupancy rows for the window are left-joined (a range on
+    the (car_id, day) primary key) and grouped per car, so the busiest day
+    is one aggregate that the select list, a HAVING on `available` and an
+    ORDER BY on it all share: one occupancy lookup per car. Grouping by the
+    `order_by` columns ahead of Car.id lets an index that supplies that
+    order keep supplying it.
+    """
+    first, last = occupied_range(start_date, end_date)
+    peak = func.coalesce(func.max(CarOccupancy.booked), 0)
+    available = _greatest(func.coalesce(Car.quantity, 0) - peak, 0).label("available")
+    query = (
+        query.add_columns(available)
+        .outerjoin(
+            CarOccupancy,
+            (CarOccupancy.car_id == Car.id) & (CarOccupancy.day >= first) & (CarOccupancy.day < last),
+        )
+        .group_by(*order_by, Car.id)
+    )
+    return query, available
+
+
+def fleet_availability_query(start_date, end_date, category=None, car_id=None):
+    """Select (id, name, model, category, quantity, available) for every matching car"""
+    peak = peak_bookings(start_date, end_date, car_id=car_id)
+    quantity = func.coalesce(Car.quantity, 0)
+    available = _greatest(quantity - func.coalesce(peak.c.booked, 0), 0)
+
+    query = (
+        select(
+            Car.id,
+            Car.name,
+            Car.model,
+            Car.category,
+            quantity.label("quantity"),
+            available.label("available"),
+        )
+        .outerjoin(peak, peak.c.car_id == Car.id)
+        .order_by(Car.id)
+    )
+    if category:
+        query = query.where(Car.category == category)
+    if car_id is not None:
+        query = query.where(Car.id == car_id)
+    return query
+
+
+def fleet_availability(start_date, end_date, category=None, car_id=None):
+    """Rows of (id, name, model, category, quantity, available) for every matching car"""
+    return db.session.execute(fleet_availability_query(start_date, end_date, category, car_id)).all()
+
+
+def units_free(car_id, start_date, end_date):
+    """How many units of one car are free for the whole window"""
+    rows = fleet_availability(start_date, end_date, car_id=car_id)
+    return rows[0].available if rows else 0
+
+
+def units_free_by_category(start_date, end_date):
+    """{category: free units} across the fleet for the window"""
+    totals = {}
+    for row in fleet_availability(start_date, end_date):
+        totals[row.category] = totals.get(row.category, 0) + row.available
+    return totals
+
+
+def category_stats_query(day):
+    """Select each category's columns plus car_count, total_units and units free on `day`.
+
+    One GROUP BY over categories left-joined to their cars (by category_id)
+    and to each car's occupancy row for the day (a primary-key lookup).
+    """
+    quantity = func.coalesce(Car.quantity, 0)
+    free = _greatest(quantity - func.coalesce(CarOccupancy.booked, 0), 0)
+    return (
+        select(
+            CarCategory.id,
+            CarCategory.title,
+            CarCategory.image,
+            CarCategory.description,
+            CarCategory.rate,
+            func.count(Car.id).label("car_count"),
+            func.coalesce(func.sum(quantity), 0).label("total_units"),
+            func.coalesce(func.sum(free), 0).label("free_today"),
+        )
+        .outerjoin(Car, Car.category_id == CarCategory.id)
+        .outerjoin(CarOccupancy, (CarOccupancy.car_id == Car.id) & (CarOccupancy.day == day))
+        .group_by(CarCategory.id, CarCategory.title, CarCategory.image, CarCategory.description, CarCategory.rate)
+        .order_by(CarCategory.id)
+    )
@@ -0,0 +1,100 @@
+"""
+Throughput of POST /reservations/batch against N individual POST /reservations.
+
+Books the same N reservations (spread over a few cars and date windows)
+both ways on a fresh database and reports wall time, bookings/sec and SQL
+statements per booking for each.
+
+Usage:
+    python benchmarks/bench_batch_reservations.py [--bookings 200] [--cars 5] [--rounds 3]
+        [--database-url postgresql+psycopg2://.../scratch]
+"""
+
+import argparse
+import logging
+import time
+from datetime import date, timedelta
+
+import load_test
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bookings", type=int, default=200)
+    parser.add_argument("--cars", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=3)
+    load_test.add_database_argument(parser)
+    args = parser.parse_args()
+
+    temporary = load_test.use_database(args)
+
+    logging.disable(logging.CRITICAL)
+
+    from create_app import create_app
+    from extensions import db
+    from models import Car
+    from sql_profiler import count_queries
+
+    app = create_app()
+    client = app.test_client()
+
+    def reset():
+        db.drop_all()
+        db.create_all()
+        db.session.add_all(
+            Car(name=f"Bench car {n}", model="2023", category="Economy", price_per_day=70, quantity=args.bookings)
+            for n in range(args.cars)
+        )
+        db.session.commit()
+        return [c.id for c in Car.query.all()]
+
+    def bookings(car_ids):
+        first = date(2027, 5, 1)
+        return [
+            {
+                "car_id": car_ids[n % len(car_ids)],
+                "firstname": "Bench",
+                "lastname": f"Client {n}",
+                "email": f"client{n}@example.com",
+                "start_date": (first + timedelta(days=n % 14)).isoformat(),
+                "end_date": (first + timedelta(days=n % 14 + 3)).isoformat(),
+            }
+            for n in range(args.bookings)
+        ]
+
+    def individual(payload):
+        for booking in payload:
+            assert client.post("/reservations", json=booking).status_code == 201
+
+    def batched(payload):
+        response = client.post("/reservations/batch", json={"reservations": payload})
+        assert response.status_code == 201, response.get_json()
+
+    results = {}
+    with app.app_context():
+        for label, run in (("individual", individual), ("batch", batched)):
+            timings, statements = [], 0
+            for _ in range(args.rounds):
+                payload = bookings(reset())
+                with count_queries() as log:
+                    start = time.perf_counter()
+                    run(payload)
+                    timings.append(time.perf_counter() - start)
+                statements = log.count
+            results[label] = (min(timings), statements)
+        engine = db.engine.url.get_backend_name()
+        if not temporary:
+            db.drop_all()
+
+    print(f"engine       {engine}")
+    print(f"bookings     {args.bookings} over {args.cars} cars (best of {args.rounds})")
+    for label, (elapsed, statements) in results.items():
+        print(
+            f"{label:<12} {elapsed * 1000:8.1f} ms  {args.bookings / elapsed:8.0f} bookings/s"
+            f"  {statements / args.bookings:5.1f} statements/booking"
+        )
+    print(f"speedup      {results['individual'][0] / results['batch'][0]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
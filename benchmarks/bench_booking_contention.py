@@ -0,0 +1,113 @@
+"""
+Contention benchmark for POST /reservations.
+
+Many threads try to book the same few cars for the same dates, so every
+booking races for the last units. Reports requests/sec, bookings/sec and
+the outcome mix, then checks the database for oversells: more reservations
+for a car than units it owns, or occupancy counts that disagree with the
+reservations table.
+
+Usage:
+    python benchmarks/bench_booking_contention.py [--threads 16] [--requests 800]
+        [--cars 3] [--units 5] [--database-url postgresql+psycopg2://.../scratch]
+"""
+
+import argparse
+import logging
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+import load_test
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=800)
+    parser.add_argument("--cars", type=int, default=3)
+    parser.add_argument("--units", type=int, default=5)
+    load_test.add_database_argument(parser)
+    args = parser.parse_args()
+
+    temporary = load_test.use_database(args)
+
+    logging.disable(logging.CRITICAL)
+
+    from sqlalchemy import func, select
+    from create_app import create_app
+    from extensions import db
+    from models import Car, CarOccupancy, Reservation
+
+    app = create_app()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add_all(
+            Car(name=f"Bench car {n}", model="2023", category="Luxury", price_per_day=165, quantity=args.units)
+            for n in range(args.cars)
+        )
+        db.session.commit()
+        car_ids = [c.id for c in Car.query.all()]
+
+    outcomes = Counter()
+    outcomes_lock = threading.Lock()
+    per_thread = args.requests // args.threads
+
+    def client_loop():
+        client = app.test_client()
+        local = Counter()
+        for n in range(per_thread):
+            response = client.post("/reservations", json={
+                "car_id": random.choice(car_ids),
+                "firstname": "Bench",
+                "lastname": f"Client {n}",
+                "email": "bench@example.com",
+                "start_date": "2027-07-01",
+                "end_date": "2027-07-05",
+            })
+            local[response.status_code] += 1
+        with outcomes_lock:
+            outcomes.update(local)
+
+    threads = [threading.Thread(target=client_loop) for _ in range(args.threads)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    with app.app_context():
+        booked = dict(db.session.execute(
+            select(Reservation.car_id, func.count()).group_by(Reservation.car_id)
+        ).all())
+        occupancy = dict(db.session.execute(
+            select(CarOccupancy.car_id, func.max(CarOccupancy.booked)).group_by(CarOccupancy.car_id)
+        ).all())
+        engine = db.engine.url.get_backend_name()
+        if not temporary:
+            db.drop_all()
+
+    total = sum(outcomes.values())
+    bookings = outcomes[201]
+    oversells = sum(max(count - args.units, 0) for count in booked.values())
+    mismatches = sum(1 for car_id in car_ids if booked.get(car_id, 0) != occupancy.get(car_id, 0))
+
+    print(f"engine            {engine}")
+    print(f"threads           {args.threads}")
+    print(f"requests          {total} in {elapsed:.2f}s ({total / elapsed:.1f} req/s)")
+    print(f"bookings          {bookings} ({bookings / elapsed:.1f} bookings/s), capacity {args.cars * args.units}")
+    print(f"rejected (400)    {outcomes[400]}")
+    print(f"errors (5xx)      {sum(v for k, v in outcomes.items() if k >= 500)}")
+    print(f"oversells         {oversells}")
+    print(f"occupancy drift   {mismatches}")
+
+    if oversells or mismatches or bookings != min(args.cars * args.units, total):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+GET /cars/search against fetching the whole fleet and filtering client-side.
+
+Seeds a large fleet with booking history, then answers the storefront's
+question "cars in one category, under a price, free for a window, cheapest
+first" two ways: GET /cars plus GET /availability for the window, filtered
+and sorted in Python as the browser does today, and one GET /cars/search.
+Reports wall time, bytes transferred and SQL statements per question,
+best of --rounds, and checks both give the same cars.
+
+Usage:
+    python benchmarks/bench_car_search.py [--cars 2000] [--reservations 20000] [--rounds 5]
+        [--database-url postgresql+psycopg2://.../scratch]
+"""
+
+import argparse
+import logging
+import random
+import time
+from datetime import date, timedelta
+
+import load_test
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cars", type=int, default=2000)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--reservations", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    load_test.add_database_argument(parser)
+    args = parser.parse_args()
+
+    load_test.use_database(args)
+
+    logging.disable(logging.CRITICAL)
+
+    from create_app import create_app
+    from extensions import db
+    from models import Car, CarCategory, CarOccupancy, Reservation
+    from sql_profiler import count_queries
+
+    app = create_app()
+    with app.app_context():
+        load_test.seed(db, (Car, CarCategory, CarOccupancy, Reservation), args, random.Random(args.seed))
+
+    # The seeded history is in the past; look at a window inside it so occupancy matters
+    start = date.today() - timedelta(days=200)
+    end = start + timedelta(days=7)
+    category, max_price = "Category 1", 100
+
+    client = app.test_client()
+
+    def client_side():
+        cars = client.get("/cars")
+        free = client.get(f"/availability?start={start}&end={end}")
+        available = {row["car_id"]: row["available"] for row in free.get_json()}
+        matches = [
+            car for car in cars.get_json()
+            if car["category"] == category and car["price_per_day"] <= max_price and available.get(car["id"], 0) >= 1
+        ]
+        matches.sort(key=lambda car: (car["price_per_day"], car["id"]))
+        return [car["id"] for car in matches], len(cars.get_data()) + len(free.get_data())
+
+    def server_side():
+        response = client.get(
+            f"/cars/search?category={category.replace(' ', '+')}&max_price={max_price}"
+            f"&start={start}&end={end}&sort=price&limit=1000"
+        )
+        return [car["id"] for car in response.get_json()], len(response.get_data())
+
+    results = {}
+    with app.app_context():
+        for name, run in (("/cars + /availability", client_side), ("/cars/search", server_side)):
+            best = None
+            for _ in range(args.rounds):
+                with count_queries() as log:
+                    started = time.perf_counter()
+                    ids, size = run()
+                    elapsed = time.perf_counter() - started
+                if best is None or elapsed < best[0]:
+                    best = (elapsed, size, log.count, ids)
+            results[name] = best
+
+    print(f"{args.cars} cars, {args.reservations} reservations, best of {args.rounds}; "
+          f"{len(results['/cars/search'][3])} cars match")
+    print(f"  {'approach':<22} {'ms':>8} {'bytes':>9} {'statements':>11}")
+    for name, (elapsed, size, statements, _) in results.items():
+        print(f"  {name:<22} {elapsed * 1000:>8.2f} {size:>9} {statements:>11}")
+    if results["/cars + /availability"][3] != results["/cars/search"][3]:
+        print("  the two approaches returned different cars")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Bytes on the wire and CPU cost of response compression.
+
+Seeds a fleet and reservation history, then requests GET /cars,
+GET /car-categories, GET /reservations and GET /reservations/export
+(NDJSON) with no Accept-Encoding, with gzip and with br (when the brotli
+package is installed). For each it reports the body size sent, the ratio
+to the uncompressed body, CPU time per request (all of it, and the part
+spent compressing, as recorded for /metrics), and the time the body would
+take over a --link-kbps link. Catalog requests after the first hit the
+per-version cache of the compressed body, so their compression CPU is ~0.
+
+Usage:
+    python benchmarks/bench_compression.py [--requests 50] [--reservations 5000]
+        [--page-size 500] [--link-kbps 1000] [--database-url postgresql+psycopg2://.../scratch]
+"""
+
+import argparse
+import logging
+import random
+import time
+
+import load_test
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50, help="requests per endpoint and encoding")
+    parser.add_argument("--cars", type=int, default=50)
+    parser.add_argument("--categories", type=int, default=6)
+    parser.add_argument("--reservations", type=int, default=5000)
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--link-kbps", type=float, default=1000.0, help="link speed for the transfer estimate")
+    parser.add_argument("--seed", type=int, default=1)
+    load_test.add_database_argument(parser)
+    args = parser.parse_args()
+
+    load_test.use_database(args)
+
+    logging.disable(logging.CRITICAL)
+
+    import compression
+    import metrics
+    from create_app import create_app
+    from extensions import db
+    from models import Car, CarCategory, CarOccupancy, Reservation
+
+    app = create_app()
+    with app.app_context():
+        load_test.seed(db, (Car, CarCategory, CarOccupancy, Reservation), args, random.Random(args.seed))
+    client = app.test_client()
+
+    endpoints = [
+        ("/cars", "/cars"),
+        ("/car-categories", "/car-categories"),
+        ("/reservations", f"/reservations?_start=0&_end={args.page_size}"),
+        ("/reservations/export", "/reservations/export?format=ndjson"),
+    ]
+    encodings = ["identity", "gzip"] + (["br"] if compression.brotli is not None else [])
+
+    rows = []
+    for rule, path in endpoints:
+        for encoding in encodings:
+            headers = {"Accept-Encoding": encoding}
+            metrics.registry.reset()
+            sent = 0
+            cpu = time.process_time()
+            for _ in range(args.requests):
+                sent += len(client.get(path, headers=headers).get_data())
+            cpu = time.process_time() - cpu
+            key = (rule, "GET")
+            streamed = rule.endswith("/export")
+            rows.append({
+                "endpoint": rule,
+                "encoding": encoding,
+                "bytes": sent / args.requests,
+                "cpu_ms": cpu * 1000 / args.requests,
+                # Streamed bodies are compressed after the request hooks, outside the metrics
+                "compress_ms": None if streamed else metrics.registry.compression_seconds.get(key, 0.0) * 1000 / args.requests,
+            })
+
+    identity = {r["endpoint"]: r["bytes"] for r in rows if r["encoding"] == "identity"}
+    print(f"{args.requests} requests per row, {args.reservations} reservations, page size {args.page_size}, "
+          f"transfer estimated at {args.link_kbps:.0f} kbit/s")
+    if compression.brotli is None:
+        print("br skipped (pip install brotli)")
+    print(f"  {'endpoint':<22} {'encoding':<9} {'bytes':>9} {'ratio':>6} {'CPU ms':>7} "
+          f"{'compress ms':>12} {'transfer ms':>12}")
+    for r in rows:
+        ratio = r["bytes"] / identity[r["endpoint"]] if identity[r["endpoint"]] else 1.0
+        compress_ms = "streamed" if r["compress_ms"] is None else f"{r['compress_ms']:.3f}"
+        transfer_ms = r["bytes"] * 8 / args.link_kbps
+        print(f"  {r['endpoint']:<22} {r['encoding']:<9} {r['bytes']:>9.0f} {ratio:>6.2f} {r['cpu_ms']:>7.2f} "
+              f"{compress_ms:>12} {transfer_ms:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
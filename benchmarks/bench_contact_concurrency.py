@@ -0,0 +1,122 @@
+"""
+Concurrency capacity of POST /contact at a fixed gunicorn worker count.
+
+Starts gunicorn (sync workers by default) against a fake SMTP server that
+takes --smtp-latency-ms per message, fires --requests contact submissions
+from --clients concurrent clients, and reports throughput and latency. Runs
+once with EMAIL_DELIVERY=inline, where each request holds a worker for
+both SMTP sends, and once with EMAIL_DELIVERY=outbox, where the request
+only queues them. In outbox mode it then runs `flask email-worker --once`
+and reports how fast the queued emails drain.
+
+Usage:
+    python benchmarks/bench_contact_concurrency.py [--workers 2] [--worker-class sync]
+        [--clients 32] [--requests 200] [--smtp-latency-ms 100]
+        [--email-worker-concurrency 8] [--database-url postgresql+psycopg2://.../scratch]
+"""
+
+import argparse
+import logging
+import os
+import subprocess
+import sys
+import time
+
+import load_test
+
+ROOT = load_test.ROOT
+from bench_gunicorn_modes import wait_ready
+from fake_smtp import FakeSMTPServer
+
+
+def contact(rng):
+    return "/contact", {
+        "name": rng.choice(load_test.FIRST_NAMES),
+        "email": "loadtest@example.com",
+        "message": "Is the Wrangler free over Junkanoo?",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--worker-class", default="sync")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--smtp-latency-ms", type=float, default=100.0)
+    parser.add_argument("--email-worker-concurrency", type=int, default=8)
+    parser.add_argument("--port", type=int, default=8932)
+    load_test.add_database_argument(parser)
+    args = parser.parse_args()
+
+    load_test.use_database(args)
+
+    smtp = FakeSMTPServer(latency=args.smtp_latency_ms / 1000).start()
+    smtp_env = {
+        "SMTP_SERVER": "127.0.0.1",
+        "SMTP_PORT": str(smtp.port),
+        "SMTP_STARTTLS": "false",
+        "SMTP_USERNAME": "loadtest",
+        "SMTP_PASSWORD": "loadtest",
+        # One SMTP connection per concurrent sender, so the pool is not the limit
+        "SMTP_POOL_SIZE": str(max(args.email_worker_concurrency, 2)),
+    }
+
+    logging.disable(logging.CRITICAL)
+
+    from create_app import create_app
+    from extensions import db
+
+    app = create_app()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+    args.url = f"http://127.0.0.1:{args.port}"
+    rows = []
+    for mode in ("inline", "outbox"):
+        env = dict(os.environ, **smtp_env, EMAIL_DELIVERY=mode, PORT=str(args.port),
+                   WEB_CONCURRENCY=str(args.workers), GUNICORN_WORKER_CLASS=args.worker_class,
+                   GUNICORN_LOG_LEVEL="warning")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "--config", "gunicorn.conf.py", "app:app"],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            if not wait_ready(args.url):
+                print(f"{mode:<7} server did not become ready")
+                continue
+            latencies, statuses, elapsed = load_test.drive(args, None, "POST", contact, 1)
+            result = load_test.summarise(latencies, statuses, elapsed)
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+        if mode == "outbox":
+            sent_before = smtp.messages
+            started = time.perf_counter()
+            subprocess.run(
+                [sys.executable, "-m", "flask", "--app", "app", "email-worker", "--once",
+                 "--batch-size", "50", "--concurrency", str(args.email_worker_concurrency)],
+                cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            drain = time.perf_counter() - started
+            result["drained"] = smtp.messages - sent_before
+            result["drain_seconds"] = drain
+        rows.append((mode, result))
+
+    smtp.stop()
+
+    print(f"{args.workers} {args.worker_class} workers, {args.clients} clients, {args.requests} requests, "
+          f"SMTP latency {args.smtp_latency_ms:.0f} ms per message")
+    print(f"  {'mode':<7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>9} {'errors':>7}")
+    for mode, r in rows:
+        print(f"  {mode:<7} {r['throughput_rps']:>8.1f} {r['p50_ms']:>8.2f} {r['p99_ms']:>9.2f} {r['errors']:>7}")
+    for mode, r in rows:
+        if "drained" in r:
+            print(f"  email worker (concurrency {args.email_worker_concurrency}) sent {r['drained']} queued emails "
+                  f"in {r['drain_seconds']:.1f}s ({r['drained'] / r['drain_seconds']:.1f}/s, including startup)")
+
+
+if __name__ == "__main__":
+    main()
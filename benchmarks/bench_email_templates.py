@@ -0,0 +1,121 @@
+"""
+Micro-benchmark for email rendering.
+
+Times each EmailService.send_* method end to end (template rendering, MIME
+tree construction and serialisation) with SMTP replaced by an in-memory
+fake, and reports wall time and peak allocation per email.
+
+Usage:
+    python benchmarks/bench_email_templates.py [--iterations 2000]
+"""
+
+import argparse
+import os
+import smtplib
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("SMTP_USERNAME", "bench")
+os.environ.setdefault("SMTP_PASSWORD", "bench")
+
+
+class NullSMTP:
+    """Accepts and discards everything, but still flattens the message like a real send"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def starttls(self):
+        pass
+
+    def login(self, *args):
+        pass
+
+    def noop(self):
+        return (250, b"OK")
+
+    def send_message(self, msg, from_addr=None, to_addrs=None):
+        msg.as_bytes()
+
+    def sendmail(self, from_addr, to_addrs, msg):
+        pass
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+smtplib.SMTP = NullSMTP
+smtplib.SMTP_SSL = NullSMTP
+
+import logging
+logging.disable(logging.CRITICAL)
+
+from email_service import email_service
+
+RESERVATION = {
+    'id': 4821,
+    'firstname': 'Ada',
+    'lastname': 'Rolle',
+    'email': 'ada@example.com',
+    'home': '242-555-0100',
+    'cell': '242-555-0199',
+    'start_date': 'March 03, 2027',
+    'end_date': 'March 10, 2027',
+    'total_price': 1155.0
+}
+
+CAR = {'name': 'Audi Q7', 'model': '2023', 'category': 'Luxury', 'price_per_day': 165}
+
+CASES = {
+    "booking_confirmation": lambda: email_service.send_booking_confirmation(RESERVATION, CAR),
+    "contact_form_message": lambda: email_service.send_contact_form_message(
+        "Ada Rolle", "ada@example.com", "242-555-0199", "Do you deliver to Clarence Town?\nThanks!"),
+    "contact_confirmation": lambda: email_service.send_contact_confirmation("ada@example.com", "Ada Rolle"),
+    "admin_email": lambda: email_service.send_admin_email(
+        "ada@example.com", "Your rental", "Hi Ada,\nYour car is ready.", is_html=False),
+}
+
+
+def measure(fn, iterations):
+    for _ in range(50):
+        fn()
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - start
+
+    # Peak bytes allocated while building a single email, averaged over a sample
+    tracemalloc.start()
+    sample = max(iterations // 10, 1)
+    total_peak = 0
+    for _ in range(sample):
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        total_peak += peak - baseline
+    tracemalloc.stop()
+
+    return elapsed / iterations * 1e6, total_peak / sample
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'email':<24}{'us/email':>12}{'peak KiB/email':>16}")
+    for name, fn in CASES.items():
+        per_call_us, peak = measure(fn, args.iterations)
+        print(f"{name:<24}{per_call_us:>12.1f}{peak / 1024:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Compare gunicorn worker classes on the catalog and reservation endpoints.
+
+For each mode, starts gunicorn with gunicorn.conf.py on a local port,
+waits for GET /ready, then drives GET /cars, GET /car-categories,
+GET /reservations and POST /reservations over HTTP with concurrent clients
+(the same scenarios and seed data as load_test.py) and reports throughput
+and p50/p99 per endpoint.
+
+Usage:
+    python benchmarks/bench_gunicorn_modes.py [--modes sync,gthread,gevent]
+        [--workers 2] [--threads 4] [--clients 16] [--requests 400]
+        [--database-url postgresql+psycopg2://.../scratch]
+
+Modes whose worker class is not installed (gevent) are skipped. Without
+--database-url a temporary SQLite file is used, where concurrent bookings
+serialise on the file lock; use a scratch Postgres database for numbers
+that reflect production. A given database is dropped and recreated.
+"""
+
+import argparse
+import importlib.util
+import logging
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.request
+
+import load_test
+
+ROOT = load_test.ROOT
+
+ENDPOINTS = ("GET /cars", "GET /car-categories", "GET /reservations", "POST /reservations")
+
+MODES = {
+    "sync": {"GUNICORN_WORKER_CLASS": "sync"},
+    "gthread": {"GUNICORN_WORKER_CLASS": "gthread"},
+    "gevent": {"GUNICORN_WORKER_CLASS": "gevent"},
+}
+
+
+def wait_ready(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{url}/ready", timeout=2) as response:
+                if response.status == 200:
+                    return True
+        except OSError:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="sync,gthread,gevent")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=400, help="requests per endpoint")
+    parser.add_argument("--cars", type=int, default=50)
+    parser.add_argument("--categories", type=int, default=6)
+    parser.add_argument("--reservations", type=int, default=5000)
+    parser.add_argument("--port", type=int, default=8931)
+    parser.add_argument("--seed", type=int, default=1)
+    load_test.add_database_argument(parser)
+    args = parser.parse_args()
+
+    load_test.use_database(args)
+
+    logging.disable(logging.CRITICAL)
+
+    from create_app import create_app
+    from extensions import db
+    from models import Car, CarCategory, CarOccupancy, Reservation
+
+    app = create_app()
+    with app.app_context():
+        load_test.seed(db, (Car, CarCategory, CarOccupancy, Reservation), args, random.Random(args.seed))
+
+    args.url = f"http://127.0.0.1:{args.port}"
+    scenarios = [s for s in load_test.scenarios(args) if s[0] in ENDPOINTS]
+    results = {}
+
+    for mode in [m.strip() for m in args.modes.split(",")]:
+        if mode == "gevent" and importlib.util.find_spec("gevent") is None:
+            print("gevent      skipped (pip install gevent psycogreen)")
+            continue
+
+        env = dict(os.environ, **MODES[mode], PORT=str(args.port), WEB_CONCURRENCY=str(args.workers),
+                   GUNICORN_THREADS=str(args.threads), GUNICORN_LOG_LEVEL="warning")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "--config", "gunicorn.conf.py", "app:app"],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            if not wait_ready(args.url):
+                print(f"{mode:<11} server did not become ready")
+                continue
+            results[mode] = {}
+            for n, (name, method, make_request) in enumerate(scenarios):
+                results[mode][name] = load_test.summarise(
+                    *load_test.drive(args, None, method, make_request, args.seed + n)
+                )
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    engine = args.database_url.split(":", 1)[0]
+    print(f"engine {engine}, {args.workers} workers, {args.threads} threads (gthread), "
+          f"{args.clients} clients, {args.requests} requests per endpoint")
+    print(f"  {'mode':<9} {'endpoint':<22} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for mode, endpoints in results.items():
+        for name, r in endpoints.items():
+            print(f"  {mode:<9} {name:<22} {r['throughput_rps']:>8.1f} {r['p50_ms']:>8.2f} "
+                  f"{r['p99_ms']:>8.2f} {r['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
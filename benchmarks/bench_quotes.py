@@ -0,0 +1,101 @@
+"""
+POST /quotes: one batched request against one request per quote.
+
+Seeds a fleet with a few seasons and weekly discounts, then prices every
+car over --windows rental windows (what the storefront needs when a
+customer changes dates) two ways: one POST /quotes per (car, window), and a
+single POST /quotes carrying all of them. Reports wall time, quotes/sec and
+SQL statements for each, best of --rounds, and checks both return the same
+prices.
+
+Usage:
+    python benchmarks/bench_quotes.py [--cars 50] [--windows 20] [--rounds 3]
+        [--database-url postgresql+psycopg2://.../scratch]
+"""
+
+import argparse
+import logging
+import random
+import time
+from datetime import date, timedelta
+
+import load_test
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cars", type=int, default=50)
+    parser.add_argument("--categories", type=int, default=6)
+    parser.add_argument("--windows", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    load_test.add_database_argument(parser)
+    args = parser.parse_args()
+    args.reservations = 0
+
+    load_test.use_database(args)
+
+    logging.disable(logging.CRITICAL)
+
+    from create_app import create_app
+    from extensions import db
+    from models import Car, CarCategory, CarOccupancy, Reservation, SeasonalRate, WeeklyDiscount
+    from sql_profiler import count_queries
+
+    app = create_app()
+    rng = random.Random(args.seed)
+    today = date.today()
+    with app.app_context():
+        load_test.seed(db, (Car, CarCategory, CarOccupancy, Reservation), args, rng)
+        db.session.add_all([
+            SeasonalRate(name="Holidays", start_date=date(today.year, 12, 15), end_date=date(today.year + 1, 1, 5),
+                         multiplier=1.5),
+            SeasonalRate(name="Spring break", start_date=date(today.year + 1, 3, 1), end_date=date(today.year + 1, 4, 15),
+                         multiplier=1.25),
+            SeasonalRate(name="Category 0 summer", category="Category 0", start_date=date(today.year + 1, 6, 1),
+                         end_date=date(today.year + 1, 8, 31), multiplier=1.3),
+            WeeklyDiscount(min_days=7, percent_off=10),
+            WeeklyDiscount(min_days=28, percent_off=20),
+        ])
+        db.session.commit()
+
+    windows = []
+    for _ in range(args.windows):
+        start = today + timedelta(days=rng.randint(1, 365))
+        windows.append((start.isoformat(), (start + timedelta(days=rng.randint(1, 30))).isoformat()))
+    items = [
+        {"car_id": car_id, "start_date": start, "end_date": end}
+        for start, end in windows for car_id in range(1, args.cars + 1)
+    ]
+
+    client = app.test_client()
+
+    def one_per_quote():
+        return [client.post("/quotes", json={"quotes": [item]}).get_json()["quotes"][0] for item in items]
+
+    def batched():
+        return client.post("/quotes", json={"quotes": items}).get_json()["quotes"]
+
+    results = {}
+    with app.app_context():
+        for name, run in (("one per quote", one_per_quote), ("batched", batched)):
+            best = None
+            for _ in range(args.rounds):
+                with count_queries() as counter:
+                    started = time.perf_counter()
+                    quotes = run()
+                    elapsed = time.perf_counter() - started
+                if best is None or elapsed < best[0]:
+                    best = (elapsed, counter.count, quotes)
+            results[name] = best
+
+    print(f"{len(items)} quotes ({args.cars} cars x {args.windows} windows), best of {args.rounds}")
+    print(f"  {'mode':<14} {'ms':>9} {'quotes/s':>10} {'statements':>11}")
+    for name, (elapsed, statements, _) in results.items():
+        print(f"  {name:<14} {elapsed * 1000:>9.1f} {len(items) / elapsed:>10.0f} {statements:>11}")
+    if results["one per quote"][2] != results["batched"][2]:
+        print("  batched prices differ from single-quote prices")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Serialization cost of a large reservation listing.
+
+Seeds N reservations (10k by default) and builds the GET /reservations
+JSON body for all of them several ways:
+
+    orm      Reservation instances + Car.name, dict built per object, stdlib json
+    rows     RESERVATION_LIST_COLUMNS Row tuples, hand-written dict, stdlib json
+    compiled Row tuples through serializers.serialize_reservation, stdlib json
+    provider Row tuples through serialize_reservation, serializers.JSONProvider
+             (orjson when installed)
+
+For each it reports the time to fetch and build the dicts, the time to
+encode them, the body size, and the peak traced memory (tracemalloc) of the
+whole fetch + build + encode, best of --rounds.
+
+Usage:
+    python benchmarks/bench_serialization.py [--reservations 10000] [--rounds 3]
+        [--database-url postgresql+psycopg2://.../scratch]
+"""
+
+import argparse
+import gc
+import logging
+import random
+import sys
+import time
+import tracemalloc
+
+import load_test
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reservations", type=int, default=10000)
+    parser.add_argument("--cars", type=int, default=50)
+    parser.add_argument("--categories", type=int, default=6)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    load_test.add_database_argument(parser)
+    args = parser.parse_args()
+
+    load_test.use_database(args)
+
+    logging.disable(logging.CRITICAL)
+
+    from flask.json.provider import DefaultJSONProvider
+    from sqlalchemy import select
+
+    from create_app import create_app
+    from extensions import db
+    from models import Car, CarCategory, CarOccupancy, Reservation
+    from serializers import RESERVATION_LIST_COLUMNS, orjson, serialize_reservation
+
+    app = create_app()
+    stdlib = DefaultJSONProvider(app)
+
+    def orm_dict(reservation, car_name):
+        return {
+            "id": reservation.id,
+            "firstname": reservation.firstname,
+            "lastname": reservation.lastname,
+            "email": reservation.email,
+            "home": reservation.home,
+            "cell": reservation.cell,
+            "car_name": car_name or "Unknown",
+            "start_date": reservation.start_date.isoformat(),
+            "end_date": reservation.end_date.isoformat(),
+            "total_price": reservation.total_price,
+            "created_at": reservation.created_at.isoformat() if reservation.created_at else None,
+        }
+
+    def row_dict(r):
+        return {
+            "id": r.id,
+            "firstname": r.firstname,
+            "lastname": r.lastname,
+            "email": r.email,
+            "home": r.home,
+            "cell": r.cell,
+            "car_name": r.car_name,
+            "start_date": r.start_date.isoformat(),
+            "end_date": r.end_date.isoformat(),
+            "total_price": r.total_price,
+            "created_at": r.created_at.isoformat() if r.created_at else None,
+        }
+
+    def fetch_orm():
+        rows = db.session.execute(
+            select(Reservation, Car.name).outerjoin(Car, Reservation.car_id == Car.id).order_by(Reservation.id)
+        ).all()
+        return [orm_dict(reservation, car_name) for reservation, car_name in rows]
+
+    def fetch_rows(serialize):
+        def fetch():
+            rows = db.session.execute(
+                select(*RESERVATION_LIST_COLUMNS).outerjoin(Car, Reservation.car_id == Car.id).order_by(Reservation.id)
+            ).all()
+            return [serialize(r) for r in rows]
+        return fetch
+
+    variants = [
+        ("orm", fetch_orm, stdlib.dumps),
+        ("rows", fetch_rows(row_dict), stdlib.dumps),
+        ("compiled", fetch_rows(serialize_reservation), stdlib.dumps),
+        ("provider", fetch_rows(serialize_reservation), app.json.dumps),
+    ]
+
+    with app.app_context():
+        load_test.seed(db, (Car, CarCategory, CarOccupancy, Reservation), args, random.Random(args.seed))
+
+        results = {}
+        bodies = {}
+        for name, fetch, encode in variants:
+            best = None
+            for _ in range(args.rounds):
+                db.session.expunge_all()
+                gc.collect()
+                tracemalloc.start()
+                started = time.perf_counter()
+                items = fetch()
+                built = time.perf_counter()
+                body = encode(items)
+                encoded = time.perf_counter()
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                db.session.rollback()
+                run = {"build": built - started, "encode": encoded - built, "peak": peak, "bytes": len(body)}
+                if best is None or run["build"] + run["encode"] < best["build"] + best["encode"]:
+                    best = run
+                bodies[name] = body
+                del items, body
+            results[name] = best
+
+        # Every variant must produce the same document
+        reference = stdlib.loads(bodies["orm"])
+        mismatched = [name for name, body in bodies.items() if stdlib.loads(body) != reference]
+
+        # Untraced timings: tracemalloc slows allocation-heavy code considerably
+        for name, fetch, encode in variants:
+            timings = []
+            for _ in range(args.rounds):
+                db.session.expunge_all()
+                gc.collect()
+                started = time.perf_counter()
+                items = fetch()
+                built = time.perf_counter()
+                encode(items)
+                timings.append((built - started, time.perf_counter() - built))
+                db.session.rollback()
+            results[name]["build"], results[name]["encode"] = min(timings, key=sum)
+
+    engine = args.database_url.split(":", 1)[0]
+    print(f"engine {engine}, {args.reservations} reservations, encoder {'orjson' if orjson else 'stdlib'} "
+          f"for 'provider', best of {args.rounds}")
+    print(f"  {'variant':<9} {'build ms':>9} {'encode ms':>10} {'total ms':>9} {'peak MiB':>9} {'body KiB':>9}")
+    for name, r in results.items():
+        print(f"  {name:<9} {r['build'] * 1000:>9.1f} {r['encode'] * 1000:>10.1f} "
+              f"{(r['build'] + r['encode']) * 1000:>9.1f} {r['peak'] / 2**20:>9.1f} {r['bytes'] / 1024:>9.0f}")
+    if mismatched:
+        print(f"  output differs from 'orm' for: {', '.join(mismatched)}")
+
+    if mismatched:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
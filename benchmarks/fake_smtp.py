@@ -0,0 +1,93 @@
+"""
+Minimal in-process SMTP server for benchmarks.
+
+Speaks just enough SMTP for smtplib and EmailService: EHLO/HELO, AUTH
+(any credentials), MAIL, RCPT, DATA, RSET, NOOP and QUIT. No STARTTLS, so
+point the app at it with SMTP_STARTTLS=false. Messages are counted and
+dropped. An optional per-message delay stands in for a remote server's
+latency.
+
+    server = FakeSMTPServer(latency=0.005)
+    server.start()          # server.port is the bound port
+    ...
+    server.stop()
+"""
+
+import socketserver
+import threading
+import time
+
+
+class _Session(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply("220 fake-smtp ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("ascii", "replace").strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self.wfile.write(b"250-fake-smtp\r\n250-AUTH PLAIN LOGIN\r\n250-8BITMIME\r\n250 SIZE 10485760\r\n")
+            elif verb == "HELO":
+                self.reply("250 fake-smtp")
+            elif verb == "AUTH":
+                args = command.split()
+                if len(args) > 1 and args[1].upper() == "LOGIN":
+                    if len(args) < 3:
+                        self.reply("334 VXNlcm5hbWU6")  # "Username:"
+                        self.rfile.readline()
+                    self.reply("334 UGFzc3dvcmQ6")  # "Password:"
+                    self.rfile.readline()
+                self.reply("235 Authentication successful")
+            elif verb in ("MAIL", "RCPT", "RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                size = 0
+                for data in self.rfile:
+                    if data == b".\r\n":
+                        break
+                    size += len(data)
+                if server.latency:
+                    time.sleep(server.latency)
+                with server.lock:
+                    server.messages += 1
+                    server.bytes += size
+                self.reply("250 OK queued")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class FakeSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0):
+        super().__init__((host, port), _Session)
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = 0
+        self.bytes = 0
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
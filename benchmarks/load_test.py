@@ -0,0 +1,457 @@
+"""
+Load test for the API.
+
+Seeds a synthetic fleet and reservation history, then drives each endpoint
+with concurrent clients and reports throughput and latency percentiles:
+
+    GET  /cars, /car-categories, /reservations, /health
+    POST /reservations, /contact
+
+SMTP goes to an in-process fake server (benchmarks/fake_smtp.py). With
+--email-delivery inline (the default, and what the first baselines
+measured) each /contact request sends its two emails itself, so it
+measures the app's email path without a real mail provider. With
+--email-delivery outbox, the app's production default, /contact only
+queues the emails and an email worker thread drains the outbox to the
+fake server during the run; compare outbox runs only with outbox
+baselines (the mode is recorded in the results).
+Results are written as JSON and, given a baseline from an earlier run,
+compared against it endpoint by endpoint.
+
+Usage:
+    python benchmarks/load_test.py [--clients 8] [--requests 400] [--cars 50]
+        [--categories 6] [--reservations 5000] [--smtp-latency-ms 0] [--seed 1]
+        [--email-delivery inline|outbox]
+        [--only /cars,/health] [--database-url postgresql+psycopg2://.../scratch]
+        [--url http://127.0.0.1:8000]
+        [--output benchmarks/results/latest.json]
+        [--baseline benchmarks/results/baseline.json] [--save-baseline]
+        [--tolerance 0.15] [--fail-on-regression]
+
+By default requests go through Flask's test client in this process, which
+measures the app and database without HTTP overhead. With --url they go
+over HTTP to a running server instead (e.g. gunicorn started with the same
+DATABASE_URL and SMTP settings printed by this script); the database is
+still seeded from here, so --database-url is required with --url.
+
+Without --database-url a temporary SQLite file is used. A given database
+must be a scratch one: all tables are dropped and recreated. The other
+benchmarks take --database-url the same way, through
+add_database_argument() and use_database().
+
+A run regresses when an endpoint's throughput drops, or its p99 latency
+rises, by more than --tolerance relative to the baseline.
+"""
+
+import argparse
+import atexit
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_smtp import FakeSMTPServer
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+FIRST_NAMES = ["Ava", "Liam", "Maya", "Noah", "Zoe", "Eli", "Ruth", "Omar", "Ines", "Kofi"]
+LAST_NAMES = ["Rolle", "Knowles", "Ferguson", "Smith", "Bethel", "Moss", "Pinder", "Cartwright"]
+
+
+def add_database_argument(parser):
+    """--database-url, shared by the benchmarks; see use_database()"""
+    parser.add_argument(
+        "--database-url",
+        help="scratch database to run against, e.g. postgresql+psycopg2://.../scratch; all its tables are "
+             "dropped and recreated (default: a temporary SQLite file)",
+    )
+
+
+def use_database(args):
+    """Point DATABASE_URL at --database-url, or at a temporary SQLite file removed at exit.
+
+    Fills in args.database_url either way, and returns True when the
+    temporary file is used. A given database must be a scratch one: the
+    benchmarks drop and recreate all its tables.
+    """
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+        return False
+    scratch = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    scratch.close()
+    atexit.register(os.unlink, scratch.name)
+    args.database_url = f"sqlite:///{scratch.name}"
+    os.environ["DATABASE_URL"] = args.database_url
+    return True
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def seed(db, models, args, rng):
+    """Create a fleet and a reservation history in the past, with matching occupancy"""
+    from catalog_cache import bump_catalog_version
+
+    Car, CarCategory, CarOccupancy, Reservation = models
+    db.drop_all()
+    db.create_all()
+
+    categories = [f"Category {n}" for n in range(args.categories)]
+    db.session.execute(
+        CarCategory.__table__.insert(),
+        [{"title": title, "rate": 60 + 15 * n, "description": f"{title} vehicles"} for n, title in enumerate(categories)],
+    )
+    db.session.execute(
+        Car.__table__.insert(),
+        [
+            {
+                "name": f"Car {n}",
+                "model": str(2018 + n % 7),
+                "category": categories[n % len(categories)],
+                "category_id": n % len(categories) + 1,  # categories were inserted first, ids 1..N
+                "price_per_day": 60 + 15 * (n % len(categories)),
+                # Plenty of units so POST /reservations measures booking, not rejection
+                "quantity": 100000,
+            }
+            for n in range(args.cars)
+        ],
+    )
+
+    today = date.today()
+    occupancy = Counter()
+    rows = []
+    for n in range(args.reservations):
+        car_id = rng.randint(1, args.cars)
+        start = today - timedelta(days=rng.randint(30, 720))
+        end = start + timedelta(days=rng.randint(1, 14))
+        occupancy.update((car_id, start + timedelta(days=d)) for d in range((end - start).days))
+        rows.append({
+            "firstname": rng.choice(FIRST_NAMES),
+            "lastname": rng.choice(LAST_NAMES),
+            "email": f"customer{n}@example.com",
+            "cell": f"242-555-{n % 10000:04d}",
+            "car_id": car_id,
+            "start_date": start,
+            "end_date": end,
+            "total_price": 75.0 * (end - start).days,
+            "created_at": datetime.combine(start, datetime.min.time()) - timedelta(days=rng.randint(1, 60)),
+        })
+    for chunk in range(0, len(rows), 5000):
+        db.session.execute(Reservation.__table__.insert(), rows[chunk:chunk + 5000])
+    occupancy_rows = [{"car_id": c, "day": d, "booked": b} for (c, d), b in occupancy.items()]
+    for chunk in range(0, len(occupancy_rows), 5000):
+        db.session.execute(CarOccupancy.__table__.insert(), occupancy_rows[chunk:chunk + 5000])
+    bump_catalog_version()
+    db.session.commit()
+
+
+def scenarios(args):
+    """(name, method, make_request) per endpoint; make_request(rng) -> (path, json body)"""
+    today = date.today()
+
+    def booking(rng):
+        start = today + timedelta(days=rng.randint(1, 365))
+        return "/reservations", {
+            "car_id": rng.randint(1, args.cars),
+            "firstname": rng.choice(FIRST_NAMES),
+            "lastname": rng.choice(LAST_NAMES),
+            "email": "loadtest@example.com",
+            "cell": "242-555-0100",
+            "start_date": start.isoformat(),
+            "end_date": (start + timedelta(days=rng.randint(1, 7))).isoformat(),
+        }
+
+    def page(rng):
+        start = rng.randint(0, 20) * 50
+        return f"/reservations?_start={start}&_end={start + 50}", None
+
+    def contact(rng):
+        return "/contact", {
+            "name": rng.choice(FIRST_NAMES),
+            "email": "loadtest@example.com",
+            "subject": "Availability question",
+            "message": "Do you have a jeep free next weekend?",
+        }
+
+    return [
+        ("GET /health", "GET", lambda rng: ("/health", None)),
+        ("GET /cars", "GET", lambda rng: ("/cars", None)),
+        ("GET /car-categories", "GET", lambda rng: ("/car-categories", None)),
+        ("GET /reservations", "GET", page),
+        ("POST /reservations", "POST", booking),
+        ("POST /contact", "POST", contact),
+    ]
+
+
+def make_client(args, app):
+    """A per-thread callable (method, path, body) -> status code"""
+    if not args.url:
+        client = app.test_client()
+        return lambda method, path, body: client.open(path, method=method, json=body).status_code
+
+    import requests
+
+    session = requests.Session()
+    base = args.url.rstrip("/")
+    return lambda method, path, body: session.request(method, base + path, json=body).status_code
+
+
+def drive(args, app, method, make_request, thread_seed):
+    """Run args.requests requests split over args.clients threads; returns (latencies, statuses, elapsed)"""
+    latencies, statuses = [], Counter()
+    lock = threading.Lock()
+    per_client = max(1, args.requests // args.clients)
+
+    def client_loop(index):
+        rng = random.Random(thread_seed * 1000 + index)
+        send = make_client(args, app)
+        local_latencies, local_statuses = [], Counter()
+        for _ in range(per_client):
+            path, body = make_request(rng)
+            started = time.perf_counter()
+            try:
+                status = send(method, path, body)
+            except Exception:
+                status = "error"
+            local_latencies.append(time.perf_counter() - started)
+            local_statuses[status] += 1
+        with lock:
+            latencies.extend(local_latencies)
+            statuses.update(local_statuses)
+
+    threads = [threading.Thread(target=client_loop, args=(n,)) for n in range(args.clients)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, statuses, time.perf_counter() - started
+
+
+def summarise(latencies, statuses, elapsed):
+    latencies = sorted(latencies)
+    total = len(latencies)
+    ok = sum(count for status, count in statuses.items() if isinstance(status, int) and status < 400)
+    return {
+        "requests": total,
+        "errors": total - ok,
+        "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+        "throughput_rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(1000 * sum(latencies) / total, 2) if total else 0.0,
+        "p50_ms": round(1000 * percentile(latencies, 0.50), 2),
+        "p99_ms": round(1000 * percentile(latencies, 0.99), 2),
+        "max_ms": round(1000 * latencies[-1], 2) if latencies else 0.0,
+    }
+
+
+class EmailWorkerThread:
+    """`flask email-worker` in a background thread; stop() drains what is left"""
+
+    def __init__(self, app, poll_interval=0.05):
+        self.app = app
+        self.poll_interval = poll_interval
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _run(self):
+        from email_outbox import deliver_pending
+        from extensions import db
+
+        with self.app.app_context():
+            while True:
+                stopping = self.stopping.is_set()
+                try:
+                    processed = deliver_pending(batch_size=50, max_attempts=1)
+                except Exception:
+                    db.session.rollback()
+                    processed = 0
+                if not processed:
+                    if stopping:
+                        break
+                    time.sleep(self.poll_interval)
+            db.session.remove()
+
+    def stop(self):
+        self.stopping.set()
+        self.thread.join()
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """Lines describing each endpoint against the baseline, and whether any regressed"""
+    lines, regressed = [], False
+    for name, current in results.items():
+        before = baseline.get("results", {}).get(name)
+        if not before:
+            lines.append(f"  {name:<22} (not in baseline)")
+            continue
+        rps_change = (current["throughput_rps"] - before["throughput_rps"]) / before["throughput_rps"] if before["throughput_rps"] else 0.0
+        p99_change = (current["p99_ms"] - before["p99_ms"]) / before["p99_ms"] if before["p99_ms"] else 0.0
+        bad = rps_change < -tolerance or p99_change > tolerance
+        regressed |= bad
+        lines.append(
+            f"  {name:<22} throughput {rps_change:+7.1%}  p99 {p99_change:+7.1%}"
+            + ("  REGRESSION" if bad else "")
+        )
+    return lines, regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=400, help="requests per endpoint")
+    parser.add_argument("--cars", type=int, default=50)
+    parser.add_argument("--categories", type=int, default=6)
+    parser.add_argument("--reservations", type=int, default=5000)
+    parser.add_argument("--smtp-latency-ms", type=float, default=0.0)
+    parser.add_argument("--email-delivery", choices=["inline", "outbox"], default="inline",
+                        help="how /contact sends email (EMAIL_DELIVERY)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--only", help="comma-separated endpoint names or paths to run")
+    add_database_argument(parser)
+    parser.add_argument("--url", help="drive a running server over HTTP instead of the in-process app")
+    parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "latest.json"))
+    parser.add_argument("--baseline", default=os.path.join(RESULTS_DIR, "baseline.json"))
+    parser.add_argument("--save-baseline", action="store_true", help="also write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+    if args.url and not args.database_url:
+        parser.error("--url needs --database-url, the database the server uses")
+
+    use_database(args)
+
+    smtp = FakeSMTPServer(latency=args.smtp_latency_ms / 1000).start()
+    os.environ.update({
+        "SMTP_SERVER": "127.0.0.1",
+        "SMTP_PORT": str(smtp.port),
+        "SMTP_STARTTLS": "false",
+        "SMTP_USERNAME": "loadtest",
+        "SMTP_PASSWORD": "loadtest",
+        "EMAIL_DELIVERY": args.email_delivery,
+    })
+    if args.url:
+        print(f"Fake SMTP server on 127.0.0.1:{smtp.port}; start the server with "
+              f"SMTP_SERVER=127.0.0.1 SMTP_PORT={smtp.port} SMTP_STARTTLS=false "
+              f"SMTP_USERNAME=loadtest SMTP_PASSWORD=loadtest EMAIL_DELIVERY={args.email_delivery}"
+              + (" and run flask email-worker beside it" if args.email_delivery == "outbox" else ""))
+
+    logging.disable(logging.CRITICAL)
+
+    from create_app import create_app
+    from extensions import db
+    from models import Car, CarCategory, CarOccupancy, Reservation
+
+    app = create_app()
+    rng = random.Random(args.seed)
+    with app.app_context():
+        started = time.perf_counter()
+        seed(db, (Car, CarCategory, CarOccupancy, Reservation), args, rng)
+        seed_seconds = time.perf_counter() - started
+        engine = db.engine.url.get_backend_name()
+
+    selected = scenarios(args)
+    if args.only:
+        wanted = {w.strip() for w in args.only.split(",")}
+        selected = [s for s in selected if s[0] in wanted or s[0].split(" ", 1)[1] in wanted]
+
+    # In outbox mode an email worker runs beside the in-process app, as in production
+    worker = None
+    if args.email_delivery == "outbox" and not args.url:
+        worker = EmailWorkerThread(app).start()
+
+    results = {}
+    ctx = app.app_context()
+    ctx.push()
+    try:
+        for n, (name, method, make_request) in enumerate(selected):
+            # Warm up caches and pools so the numbers describe steady state
+            warm = make_client(args, app)
+            for _ in range(min(20, args.requests)):
+                warm(method, *make_request(rng))
+            results[name] = summarise(*drive(args, app, method, make_request, args.seed + n))
+    finally:
+        ctx.pop()
+        if worker is not None:
+            worker.stop()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "engine": engine,
+            "target": args.url or "in-process",
+            "clients": args.clients,
+            "requests_per_endpoint": args.requests,
+            "fleet": {"cars": args.cars, "categories": args.categories, "reservations": args.reservations},
+            "seed": args.seed,
+            "seed_seconds": round(seed_seconds, 2),
+            "smtp_latency_ms": args.smtp_latency_ms,
+            "email_delivery": args.email_delivery,
+            "smtp_messages": smtp.messages,
+            "smtp_connections": smtp.connections,
+        },
+        "results": results,
+    }
+    smtp.stop()
+
+    print(f"engine {engine}, {args.clients} clients, {args.requests} requests per endpoint, "
+          f"{args.cars} cars / {args.reservations} reservations seeded in {seed_seconds:.1f}s")
+    print(f"  {'endpoint':<22} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for name, r in results.items():
+        print(f"  {name:<22} {r['throughput_rps']:>8.1f} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['errors']:>7}")
+    print(f"  fake SMTP: {smtp.messages} messages over {smtp.connections} connections")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    regressed = False
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"Compared with baseline {baseline['meta'].get('git_revision')} ({baseline['meta'].get('timestamp')}):")
+        lines, regressed = compare(results, baseline, args.tolerance)
+        print("\n".join(lines))
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+
+    if args.fail_on_regression and regressed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Catalog version stamp and payload cache.
+
+`catalog_version` holds a single row whose version is bumped in the same
+transaction as any change to Car or CarCategory rows, or to the pricing
+tables (SeasonalRate, WeeklyDiscount). The catalog
+endpoints use it as their ETag, so clients and CDNs can revalidate with a
+304 instead of re-downloading the catalog.
+
+Each process remembers the version it last read for CATALOG_VERSION_TTL
+seconds, so most conditional requests are answered without touching the
+database; a commit that bumps the version clears the memo in its own
+process immediately, other processes see it within the TTL.
+
+Serialised catalog bodies are cached per process under the version they
+were built for. Because every gunicorn worker checks the same version row,
+a catalog edit committed by any worker invalidates all of them. Refills
+are single-flight: when a version changes under load, one thread per
+process queries the database and the concurrent requests wait for its
+result instead of each running the query.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import Car, CarCategory, CatalogVersion, SeasonalRate, WeeklyDiscount
+
+CATALOG_VERSION_ID = 1
+CATALOG_VERSION_TTL = float(os.getenv("CATALOG_VERSION_TTL", "1"))
+
+# Changes to any of these bump the catalog version
+CATALOG_MODELS = (Car, CarCategory, SeasonalRate, WeeklyDiscount)
+
+_lock = threading.Lock()
+_memo = {"version": None, "updated_at": None, "expires": 0.0}
+
+
+def bump_catalog_version(session=None):
+    """Increment the catalog version as part of the session's transaction"""
+    session = session or db.session
+    result = session.execute(
+        update(CatalogVersion)
+        .where(CatalogVersion.id == CATALOG_VERSION_ID)
+        .values(version=CatalogVersion.version + 1, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        session.execute(
+            CatalogVersion.__table__.insert().values(
+                id=CATALOG_VERSION_ID, version=1, updated_at=datetime.utcnow()
+            )
+        )
+    session.info["catalog_changed"] = True
+
+
+def current_catalog_version():
+    """(version, updated_at) of the catalog, re-read at most every CATALOG_VERSION_TTL seconds"""
+    now = time.monotonic()
+    with _lock:
+        if now < _memo["expires"]:
+            return _memo["version"], _memo["updated_at"]
+
+    row = db.session.execute(
+        select(CatalogVersion.version, CatalogVersion.updated_at)
+        .where(CatalogVersion.id == CATALOG_VERSION_ID)
+    ).first()
+    version, updated_at = row if row else (0, datetime(1970, 1, 1))
+
+    with _lock:
+        _memo.update(version=version, updated_at=updated_at, expires=now + CATALOG_VERSION_TTL)
+    return version, updated_at
+
+
+class _Flight:
+    """A refill in progress that other threads can wait on"""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._value = None
+        self._error = None
+
+    def finish(self, value=None, error=None):
+        self._value, self._error = value, error
+        self._done.set()
+
+    def wait(self):
+        self._done.wait()
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+
+class CatalogCache:
+    """Per-process cache of catalog payloads keyed by catalog version"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # name -> (version, value)
+        self._flights = {}  # (name, version) -> _Flight
+
+    def get(self, name, version, build):
+        """Return the cached value of `name` for `version`, calling build() once on a miss"""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry[0] == version:
+                return entry[1]
+            flight = self._flights.get((name, version))
+            leader = flight is None
+            if leader:
+                flight = self._flights[(name, version)] = _Flight()
+
+        if not leader:
+            return flight.wait()
+
+        try:
+            value = build()
+        except Exception as e:
+            with self._lock:
+                del self._flights[(name, version)]
+            flight.finish(error=e)
+            raise
+
+        with self._lock:
+            del self._flights[(name, version)]
+            current = self._entries.get(name)
+            if current is None or current[0] <= version:
+                self._entries[name] = (version, value)
+        flight.finish(value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+catalog_cache = CatalogCache()
+
+
+def _expire_memo():
+    with _lock:
+        _memo["expires"] = 0.0
+
+
+@event.listens_for(Session, "before_flush")
+def _bump_on_catalog_change(session, flush_context, instances):
+    changed = (
+        any(isinstance(obj, CATALOG_MODELS) for obj in session.new)
+        or any(isinstance(obj, CATALOG_MODELS) for obj in session.deleted)
+        or any(
+            isinstance(obj, CATALOG_MODELS) and session.is_modified(obj)
+            for obj in session.dirty
+        )
+    )
+    if changed and not session.info.get("catalog_changed"):
+        bump_catalog_version(session)
+
+
+@event.listens_for(Session, "after_commit")
+def _expire_on_commit(session):
+    if session.info.pop("catalog_changed", False):
+        _expire_memo()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_on_rollback(session):
+    session.info.pop("catalog_changed", None)
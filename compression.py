@@ -0,0 +1,155 @@
+"""
+Response compression negotiated from Accept-Encoding.
+
+init_compression(app) compresses responses whose content type is text,
+JSON, NDJSON or CSV:
+
+- the encoding is chosen from the request's Accept-Encoding: brotli ("br")
+  when the brotli package is installed, else gzip, honouring q-values
+  (q=0 refuses an encoding); with neither acceptable the body goes out as is
+- bodies shorter than COMPRESS_MIN_SIZE bytes (default 1024) are left
+  alone, as are responses that already have a Content-Encoding, partial
+  content, and Cache-Control: no-transform
+- every compressible response gets Vary: Accept-Encoding, so shared caches
+  keep the encodings apart, and a strong ETag becomes weak once the body is
+  encoded (the bytes differ, the resource does not)
+- streamed responses (the reservation export) are compressed chunk by
+  chunk, flushing after each chunk so the download still streams
+
+COMPRESS_GZIP_LEVEL (default 6) and COMPRESS_BROTLI_QUALITY (default 4)
+set the per-request effort. Catalog bodies are compressed once per catalog
+version at the highest settings and cached (see routes.catalog_response),
+so they cost no compression CPU on a hit.
+
+CPU time spent compressing and the uncompressed size are kept on `g` for
+metrics, which reports bytes on the wire per endpoint and encoding.
+"""
+
+import gzip
+import os
+import time
+import zlib
+
+from flask import g, has_request_context, request
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only
+    brotli = None
+
+MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "4"))
+
+# Settings for bodies compressed once and cached
+CACHED_GZIP_LEVEL = 9
+CACHED_BROTLI_QUALITY = 11
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+# Server preference when the client rates encodings equally
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def is_compressible(mimetype):
+    return bool(mimetype) and mimetype.startswith(COMPRESSIBLE_TYPES)
+
+
+def negotiate_encoding(size=None):
+    """The best encoding the client accepts for a body of `size` bytes, or None"""
+    if size is not None and size < MIN_SIZE:
+        return None
+    accept = request.accept_encodings
+    best, best_quality = None, 0
+    for encoding in ENCODINGS:
+        quality = accept[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data, encoding, cached=False):
+    """Compress `data` (bytes); the CPU time is added to the request's compression time"""
+    started = time.thread_time()
+    if encoding == "br":
+        body = brotli.compress(data, quality=CACHED_BROTLI_QUALITY if cached else BROTLI_QUALITY)
+    else:
+        body = gzip.compress(data, compresslevel=CACHED_GZIP_LEVEL if cached else GZIP_LEVEL, mtime=0)
+    if has_request_context():
+        g.compression_seconds = g.get("compression_seconds", 0.0) + time.thread_time() - started
+    return body
+
+
+def set_encoded_body(response, body, encoding, uncompressed_size):
+    """Give `response` an already compressed body and the matching headers"""
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    g.response_uncompressed_bytes = uncompressed_size
+
+
+def _compressor(encoding):
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        return compressor.process, compressor.flush, compressor.finish
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+
+def _compress_stream(chunks, encoding):
+    process, flush, finish = _compressor(encoding)
+    for chunk in chunks:
+        body = process(chunk) + flush()
+        if body:
+            yield body
+    yield finish()
+
+
+def _before_request():
+    g.compression_seconds = 0.0
+    g.pop("response_uncompressed_bytes", None)
+
+
+def _after_request(response):
+    if not is_compressible(response.mimetype):
+        return response
+    response.vary.add("Accept-Encoding")
+
+    if (
+        response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or "Content-Encoding" in response.headers
+        or "no-transform" in response.headers.get("Cache-Control", "")
+        or response.direct_passthrough
+    ):
+        return response
+
+    if response.is_streamed:
+        encoding = negotiate_encoding()
+        if encoding is None:
+            return response
+        original = response.response
+        response.response = _compress_stream(response.iter_encoded(), encoding)
+        if hasattr(original, "close"):
+            response.call_on_close(original.close)
+        response.headers.pop("Content-Length", None)
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+    data = response.get_data()
+    encoding = negotiate_encoding(len(data))
+    if encoding is not None:
+        set_encoded_body(response, compress(data, encoding), encoding, len(data))
+    return response
+
+
+def init_compression(app):
+    """Compress the responses of `app`; register after init_metrics so metrics sees the encoded size"""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
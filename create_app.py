@@ -1,6 +1,4 @@
 import os
-import time
-from sqlalchemy import exc, text
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
@@ -9,9 +7,18 @@ from flask_migrate import Migrate
 from extensions import db
 from models import Reservation, Car, CarCategory
 from routes import bp
+from email_outbox import email_worker_command
+from idempotency import idempotency_cli
+from archive import reservations_cli
+from metrics import init_metrics
+from compression import init_compression
+from sql_profiler import init_sql_profiler
+from readiness import init_readiness
+from serializers import JSONProvider
 
 def create_app():
     app = Flask(__name__)
+    app.json = JSONProvider(app)
 
     # Handle database URL properly for both development and production
     database_url = os.getenv("DATABASE_URL")
@@ -20,6 +27,7 @@ def create_app():
     
     app.config["SQLALCHEMY_DATABASE_URI"] = database_url
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {"pool_pre_ping": True}
     app.config["SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", "fallback-secret-key")
 
     db.init_app(app)
@@ -42,22 +50,20 @@ def create_app():
          origins=cors_origins,
          supports_credentials=True,
          methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-         allow_headers=["Content-Type", "Authorization", "Range", "X-Requested-With"],
-         expose_headers=["Content-Range", "X-Total-Count"])
-
-    # Database connection retry logic
-    for _ in range(3):
-        try:
-            with app.app_context():
-                db.session.execute(text("SELECT 1"))
-            break
-        except exc.OperationalError as e:
-            print(f"Database connection failed: {e}. Retrying...")
-            time.sleep(2)
-    else:
-        print("Warning: Failed to connect to database after retries")
+         allow_headers=["Content-Type", "Authorization", "Range", "X-Requested-With", "Idempotency-Key"],
+         expose_headers=["Content-Range", "X-Total-Count", "X-Next-Cursor", "Idempotent-Replayed"])
 
+    # No database round trip here: connections are opened on first use and
+    # pre-pinged, so a slow or restarting database delays /ready, not boot
     from routes import bp
     app.register_blueprint(bp)
+    init_sql_profiler(app)
+    init_metrics(app)
+    # After init_metrics: after_request hooks run in reverse, so metrics sees the encoded body
+    init_compression(app)
+    app.cli.add_command(email_worker_command)
+    app.cli.add_command(idempotency_cli)
+    app.cli.add_command(reservations_cli)
+    init_readiness(app)
 
     return app
\ No newline at end of file
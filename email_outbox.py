@@ -0,0 +1,241 @@
+"""
+Transactional outbox for outgoing email.
+
+Request handlers write an EmailOutbox row in the same transaction as the
+data the email describes, so a booking is never committed without its
+confirmation being recorded (and vice versa). Contact form and admin
+emails are queued the same way, so no request waits on SMTP. The
+`flask email-worker` process drains the table, sending several messages at
+once over the SMTP connection pool and retrying failed sends with
+exponential backoff.
+Delivery is at-least-once: a worker that dies mid-batch will resend the
+messages it had not yet marked as sent.
+"""
+
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import insert
+
+from extensions import db
+from models import EmailOutbox
+from email_service import booking_reference, email_service
+
+logger = logging.getLogger(__name__)
+
+BOOKING_CONFIRMATION = "booking_confirmation"
+CONTACT_FORM_MESSAGE = "contact_form_message"
+CONTACT_CONFIRMATION = "contact_confirmation"
+ADMIN_MESSAGE = "admin_message"
+
+MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "8"))
+BASE_RETRY_DELAY = float(os.getenv("EMAIL_OUTBOX_BASE_DELAY", "30"))
+MAX_RETRY_DELAY = float(os.getenv("EMAIL_OUTBOX_MAX_DELAY", "3600"))
+
+
+# Senders raise on failure, so last_error records the actual SMTP error
+
+def _send_booking_confirmation(payload):
+    return email_service.send_booking_confirmation(payload["reservation"], payload["car"], raise_errors=True)
+
+
+def _send_contact_form_message(payload):
+    return email_service.send_contact_form_message(**payload, raise_errors=True)
+
+
+def _send_contact_confirmation(payload):
+    return email_service.send_contact_confirmation(**payload, raise_errors=True)
+
+
+def _send_admin_message(payload):
+    return email_service.send_admin_email(**payload, raise_errors=True)
+
+
+# Maps an outbox `kind` to the EmailService call that delivers it
+SENDERS = {
+    BOOKING_CONFIRMATION: _send_booking_confirmation,
+    CONTACT_FORM_MESSAGE: _send_contact_form_message,
+    CONTACT_CONFIRMATION: _send_contact_confirmation,
+    ADMIN_MESSAGE: _send_admin_message,
+}
+
+WORKER_CONCURRENCY = int(os.getenv("EMAIL_WORKER_CONCURRENCY", os.getenv("SMTP_POOL_SIZE", "2")))
+
+
+def enqueue_email(kind, to_email, payload):
+    """Add a message to the outbox; it is committed with the caller's transaction"""
+    message = EmailOutbox(kind=kind, to_email=to_email, payload=json.dumps(payload))
+    db.session.add(message)
+    return message
+
+
+def enqueue_booking_confirmation(reservation, car):
+    """Queue the confirmation email for a flushed (id-bearing) reservation"""
+    return enqueue_email(BOOKING_CONFIRMATION, reservation.email, booking_confirmation_payload(reservation, car))
+
+
+def enqueue_booking_confirmations(bookings):
+    """Queue confirmations for many (reservation, car) pairs with one executemany INSERT"""
+    rows = [
+        {
+            "kind": BOOKING_CONFIRMATION,
+            "to_email": reservation.email,
+            "payload": json.dumps(booking_confirmation_payload(reservation, car)),
+        }
+        for reservation, car in bookings
+    ]
+    if rows:
+        db.session.execute(insert(EmailOutbox), rows)
+    return len(rows)
+
+
+def booking_confirmation_payload(reservation, car):
+    """Outbox payload for a booking; `reservation` is a model or a row with the same attributes.
+
+    The booking reference is built here, from created_at, so it carries
+    the booking date however late or often the email is sent.
+    """
+    car_data = {
+        'name': car.name,
+        'model': car.model,
+        'category': car.category,
+        'price_per_day': car.price_per_day
+    }
+
+    reservation_data = {
+        'id': reservation.id,
+        'firstname': reservation.firstname,
+        'lastname': reservation.lastname,
+        'email': reservation.email,
+        'home': reservation.home,
+        'cell': reservation.cell,
+        'start_date': reservation.start_date.strftime('%B %d, %Y'),
+        'end_date': reservation.end_date.strftime('%B %d, %Y'),
+        'total_price': reservation.total_price,
+        'booking_ref': booking_reference(reservation.id, reservation.created_at or datetime.utcnow()),
+    }
+
+    return {'reservation': reservation_data, 'car': car_data}
+
+
+def enqueue_contact_message(name, email, phone, message):
+    """Queue a contact form submission for the admin and the sender's confirmation"""
+    enqueue_email(
+        CONTACT_FORM_MESSAGE,
+        email_service.admin_email,
+        {'name': name, 'email': email, 'phone': phone, 'message': message}
+    )
+    return enqueue_email(CONTACT_CONFIRMATION, email, {'to_email': email, 'name': name})
+
+
+def enqueue_admin_email(to_email, subject, message, is_html=False):
+    """Queue an email written in the admin panel"""
+    return enqueue_email(
+        ADMIN_MESSAGE,
+        to_email,
+        {'to_email': to_email, 'subject': subject, 'message': message, 'is_html': is_html}
+    )
+
+
+def retry_delay(attempts):
+    """Seconds to wait before the next attempt after `attempts` failures"""
+    return min(BASE_RETRY_DELAY * (2 ** (attempts - 1)), MAX_RETRY_DELAY)
+
+
+def _deliver(kind, payload):
+    sender = SENDERS.get(kind)
+    if sender is None:
+        raise ValueError(f"Unknown outbox message kind: {kind}")
+    if not sender(json.loads(payload)):
+        raise RuntimeError("Email service reported a failed send")
+
+
+def _try_deliver(kind, payload):
+    """Send one message; returns the error, or None on success"""
+    try:
+        _deliver(kind, payload)
+    except Exception as e:
+        return e
+    return None
+
+
+def deliver_pending(batch_size=10, max_attempts=MAX_ATTEMPTS, concurrency=1):
+    """Send one batch of due messages, up to `concurrency` at a time.
+
+    Returns the number of messages processed.
+    """
+    now = datetime.utcnow()
+    query = (
+        EmailOutbox.query
+        .filter(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now)
+        .order_by(EmailOutbox.id)
+        .limit(batch_size)
+    )
+    # Let several workers drain the table without picking up the same rows
+    if db.engine.dialect.name == "postgresql":
+        query = query.with_for_update(skip_locked=True)
+
+    messages = query.all()
+    # SMTP sends only need the payload, so they can overlap on the connection
+    # pool; the rows are updated afterwards on this thread's session
+    jobs = [(message.kind, message.payload) for message in messages]
+    if concurrency > 1 and len(jobs) > 1:
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(jobs))) as pool:
+            errors = list(pool.map(lambda job: _try_deliver(*job), jobs))
+    else:
+        errors = [_try_deliver(*job) for job in jobs]
+
+    for message, e in zip(messages, errors):
+        message.attempts += 1
+        if e is not None:
+            message.last_error = str(e)
+            if message.attempts >= max_attempts:
+                message.status = "failed"
+                logger.error(f"Giving up on outbox message {message.id} after {message.attempts} attempts: {e}")
+            else:
+                delay = retry_delay(message.attempts)
+                message.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+                logger.warning(f"Outbox message {message.id} failed (attempt {message.attempts}), retrying in {delay:.0f}s: {e}")
+        else:
+            message.status = "sent"
+            message.sent_at = datetime.utcnow()
+            message.last_error = None
+            logger.info(f"Outbox message {message.id} sent to {message.to_email}")
+
+    db.session.commit()
+    return len(messages)
+
+
+@click.command("email-worker")
+@click.option("--once", is_flag=True, help="Send everything currently due, then exit.")
+@click.option("--batch-size", default=10, show_default=True, help="Messages claimed per transaction.")
+@click.option("--poll-interval", default=5.0, show_default=True, help="Seconds to sleep when the outbox is empty.")
+@click.option("--concurrency", default=WORKER_CONCURRENCY, show_default=True, help="Messages sent in parallel.")
+@with_appcontext
+def email_worker_command(once, batch_size, poll_interval, concurrency):
+    """Drain the email outbox, retrying failed sends with backoff."""
+    logger.info("Email worker started")
+    try:
+        while True:
+            try:
+                processed = deliver_pending(batch_size=batch_size, concurrency=concurrency)
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Email worker batch failed: {e}", exc_info=True)
+                processed = 0
+
+            if processed < batch_size:
+                if once:
+                    break
+                time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        db.session.remove()
+        logger.info("Email worker stopped")
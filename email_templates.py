@@ -0,0 +1,36 @@
+"""
+Email bodies, rendered from Jinja templates in templates/email/.
+
+Each template is parsed and compiled to Python code the first time it is
+used and cached for the life of the process, so a render only fills in the
+per-message fields. HTML templates are autoescaped; the .txt variants are
+not.
+"""
+
+import os
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates", "email")
+
+_env = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    autoescape=select_autoescape(["html"]),
+    auto_reload=False,
+)
+
+_templates = {}
+
+
+def _get_template(name):
+    template = _templates.get(name)
+    if template is None:
+        template = _templates[name] = _env.get_template(name)
+    return template
+
+
+def render_email(template_name, **context):
+    """Render the HTML and plain-text bodies of the `template_name` email"""
+    html_content = _get_template(f"{template_name}.html").render(context)
+    text_content = _get_template(f"{template_name}.txt").render(context)
+    return html_content, text_content
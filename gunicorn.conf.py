@@ -0,0 +1,103 @@
+"""
+Gunicorn settings, driven by environment variables.
+
+    gunicorn --config gunicorn.conf.py app:app
+
+PORT                        port to bind on 0.0.0.0 (default 5001)
+WEB_CONCURRENCY             worker processes (default 2 x CPUs + 1, capped at
+                            GUNICORN_MAX_WORKERS, default 8)
+GUNICORN_WORKER_CLASS       gthread (default), sync or gevent
+GUNICORN_THREADS            threads per gthread worker (default 4)
+GUNICORN_WORKER_CONNECTIONS concurrent requests per gevent worker (default 100)
+GUNICORN_PRELOAD            import the app once in the master before forking
+                            (default on, except with gevent)
+GUNICORN_TIMEOUT            seconds before a silent worker is killed (default 60;
+                            longer than SMTP_TIMEOUT so a slow mail server does
+                            not get workers killed mid-send)
+GUNICORN_GRACEFUL_TIMEOUT   seconds to finish in-flight requests on restart (default 30)
+GUNICORN_KEEPALIVE          seconds to hold idle keep-alive connections open (default 5)
+GUNICORN_MAX_REQUESTS       recycle a worker after this many requests (default 0, off)
+
+With preload, the master imports the app once and workers share that
+memory copy-on-write. The SQLAlchemy pool is created in the master, so
+post_fork discards it in each worker (without closing the master's
+connections) and every worker opens its own; the same goes for pooled SMTP
+connections.
+
+gevent needs `pip install gevent` (and psycogreen, so psycopg2 yields to
+other greenlets while waiting on Postgres). It patches the standard library
+when the worker starts, which is too late for modules the master already
+imported, so preload is off by default for it.
+
+With METRICS_DIR set, child_exit folds each exited worker's metrics
+snapshot into METRICS_DIR/retired.json, so restarts and max_requests
+recycling do not leave one file per dead worker behind.
+
+benchmarks/bench_gunicorn_modes.py compares the worker classes on the
+catalog and reservation endpoints.
+"""
+
+import multiprocessing
+import os
+
+
+def _flag(name, default):
+    return os.getenv(name, str(default)).lower() in ("1", "true", "yes", "on")
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5001')}"
+
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.getenv(
+    "WEB_CONCURRENCY",
+    min(multiprocessing.cpu_count() * 2 + 1, int(os.getenv("GUNICORN_MAX_WORKERS", "8")))
+))
+threads = int(os.getenv("GUNICORN_THREADS", "4")) if worker_class == "gthread" else 1
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "100"))
+
+preload_app = _flag("GUNICORN_PRELOAD", worker_class != "gevent")
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG") or None
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+
+def post_fork(server, worker):
+    """Give each worker its own database and SMTP connections"""
+    if worker_class == "gevent":
+        try:
+            from psycogreen.gevent import patch_psycopg
+            patch_psycopg()
+        except ImportError:
+            server.log.warning("psycogreen is not installed; Postgres queries will block the gevent worker")
+
+    if not preload_app:
+        return
+
+    from extensions import db
+    from email_service import get_email_service
+
+    app = server.app.wsgi()
+    with app.app_context():
+        for engine in db.engines.values():
+            # close=False: the sockets belong to the master too, only forget them here
+            engine.dispose(close=False)
+
+    service = get_email_service(create=False)
+    if service is not None:
+        service._pool.forget_all()
+
+
+def child_exit(server, worker):
+    """Fold an exited worker's request metrics into METRICS_DIR/retired.json"""
+    if not os.getenv("METRICS_DIR"):
+        return
+    from metrics import retire
+    retire(worker.pid)
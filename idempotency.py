@@ -0,0 +1,109 @@
+"""
+Idempotency-Key support for POST endpoints.
+
+A client that retries a request with the same Idempotency-Key gets the
+response of the first successful attempt back, instead of the request
+being applied twice. The key row is inserted in the same transaction as
+the work it guards, first, so when two copies of a request race, the loser
+fails on the primary key before it has touched anything and then replays
+the winner's stored response.
+
+Keys live for IDEMPOTENCY_KEY_TTL_HOURS; `flask idempotency-keys purge`
+deletes expired ones.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app, request
+from flask.cli import AppGroup
+
+from extensions import db
+from models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+KEY_TTL = timedelta(hours=float(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24")))
+
+
+def request_fingerprint(data):
+    """Hash of the method, path and JSON body a key was first used with"""
+    canonical = json.dumps([request.method, request.path, data], sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def lookup(key):
+    """The live stored response for `key`, or None. Expired keys are deleted."""
+    stored = db.session.get(IdempotencyKey, key)
+    if stored is not None and stored.expires_at <= datetime.utcnow():
+        db.session.delete(stored)
+        db.session.commit()
+        return None
+    return stored
+
+
+def claim(key, fingerprint):
+    """Insert the key row in the current transaction, before any other writes.
+
+    Raises IntegrityError (from the flush) if another request holds the key.
+    """
+    entry = IdempotencyKey(
+        key=key,
+        request_hash=fingerprint,
+        status_code=0,
+        response_body="",
+        expires_at=datetime.utcnow() + KEY_TTL
+    )
+    db.session.add(entry)
+    db.session.flush()
+    return entry
+
+
+def remember(entry, status_code, body):
+    """Record the response to replay for a claimed key"""
+    entry.status_code = status_code
+    entry.response_body = json.dumps(body)
+
+
+def replay(stored, fingerprint):
+    """Response for a repeated key: the stored one, or 422 if the request differs"""
+    if stored.request_hash != fingerprint:
+        body = {"error": f"{HEADER} was already used for a different request"}
+        return current_app.response_class(json.dumps(body), status=422, mimetype="application/json")
+    response = current_app.response_class(stored.response_body, status=stored.status_code, mimetype="application/json")
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+def purge_expired(batch_size=1000):
+    """Delete expired keys in batches; returns the number removed"""
+    removed = 0
+    while True:
+        expired = [
+            key for (key,) in db.session.query(IdempotencyKey.key)
+            .filter(IdempotencyKey.expires_at <= datetime.utcnow())
+            .limit(batch_size)
+        ]
+        if not expired:
+            return removed
+        db.session.query(IdempotencyKey).filter(IdempotencyKey.key.in_(expired)).delete(synchronize_session=False)
+        db.session.commit()
+        removed += len(expired)
+
+
+idempotency_cli = AppGroup("idempotency-keys", help="Manage stored Idempotency-Key responses.")
+
+
+@idempotency_cli.command("purge")
+@click.option("--batch-size", default=1000, show_default=True)
+def purge_command(batch_size):
+    """Delete expired idempotency keys."""
+    removed = purge_expired(batch_size=batch_size)
+    logger.info(f"Purged {removed} expired idempotency keys")
+    click.echo(f"Purged {removed} expired idempotency keys")
@@ -0,0 +1,436 @@
+"""
+Request metrics in Prometheus text format.
+
+init_metrics(app) instruments every request and serves GET /metrics:
+
+- http_requests_total: requests by endpoint, method and status
+- http_request_duration_seconds: latency histogram per endpoint, plus
+  p50/p95/p99 estimated from it (http_request_duration_quantile_seconds)
+- http_requests_in_flight: requests currently being handled
+- http_request_db_seconds_total / http_request_smtp_seconds_total: time
+  spent in SQL statements (as counted by sql_profiler) and SMTP sends
+  while handling each endpoint
+- http_response_bytes_total: body bytes sent, by endpoint and
+  Content-Encoding, next to http_response_uncompressed_bytes_total and
+  http_response_compression_seconds_total (CPU time spent compressing)
+- db_pool_* and smtp_pool_*: connection pool usage, per process
+
+Endpoints are labelled by URL rule ("/reservations/<int:reservation_id>")
+rather than path, so label cardinality stays bounded. Latency is measured
+up to the response headers; streamed bodies are not included in latency
+or byte counts.
+
+Each process counts in memory. With METRICS_DIR set (one directory shared
+by all gunicorn workers and the email worker, emptied on deploy), every
+process also writes a snapshot to METRICS_DIR/<pid>.json at most every
+METRICS_FLUSH_INTERVAL seconds, and /metrics merges them: counters and
+histograms are summed across all processes, including exited ones;
+gauges come from live processes only. When gunicorn reaps a worker, its
+child_exit hook calls retire(pid), which folds the worker's counters into
+METRICS_DIR/retired.json and removes its snapshot, so the directory holds
+one file per live process plus that one.
+"""
+
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+
+from flask import Response, g, has_request_context, request
+
+from extensions import db
+from sql_profiler import request_db_stats
+
+METRICS_DIR = os.getenv("METRICS_DIR")
+FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "1"))
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Counters of exited processes, summed; see retire()
+RETIRED_FILE = "retired.json"
+
+
+class Registry:
+    """This process's counters, keyed by label tuples"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = {}      # (endpoint, method, status) -> count
+            self.durations = {}     # (endpoint, method) -> [bucket counts..., +Inf count, sum]
+            self.in_flight = {}     # (endpoint, method) -> current
+            self.db_seconds = {}    # (endpoint, method) -> seconds
+            self.db_statements = {}  # (endpoint, method) -> statements
+            self.smtp_seconds = {}  # (endpoint, method) -> seconds
+            self.smtp_sends = {}    # (result,) -> count
+            self.smtp_send_seconds = {}  # () -> seconds
+            self.response_bytes = {}  # (endpoint, method, encoding) -> bytes sent
+            self.uncompressed_bytes = {}  # (endpoint, method) -> bytes before encoding
+            self.compression_seconds = {}  # (endpoint, method) -> CPU seconds
+
+    def start(self, key):
+        with self._lock:
+            self.in_flight[key] = self.in_flight.get(key, 0) + 1
+
+    def finish(self, key):
+        with self._lock:
+            self.in_flight[key] = self.in_flight.get(key, 0) - 1
+
+    def observe(self, key, status, seconds, db_seconds, db_statements, smtp_seconds):
+        with self._lock:
+            status_key = key + (str(status),)
+            self.requests[status_key] = self.requests.get(status_key, 0) + 1
+            histogram = self.durations.setdefault(key, [0] * (len(BUCKETS) + 1) + [0.0])
+            histogram[_bucket_index(seconds)] += 1
+            histogram[-1] += seconds
+            self.db_seconds[key] = self.db_seconds.get(key, 0.0) + db_seconds
+            self.db_statements[key] = self.db_statements.get(key, 0) + db_statements
+            self.smtp_seconds[key] = self.smtp_seconds.get(key, 0.0) + smtp_seconds
+
+    def observe_body(self, key, encoding, sent, uncompressed, compression_seconds):
+        with self._lock:
+            encoding_key = key + (encoding,)
+            self.response_bytes[encoding_key] = self.response_bytes.get(encoding_key, 0) + sent
+            self.uncompressed_bytes[key] = self.uncompressed_bytes.get(key, 0) + uncompressed
+            self.compression_seconds[key] = self.compression_seconds.get(key, 0.0) + compression_seconds
+
+    def observe_smtp(self, seconds, ok):
+        with self._lock:
+            result = ("ok" if ok else "error",)
+            self.smtp_sends[result] = self.smtp_sends.get(result, 0) + 1
+            self.smtp_send_seconds[()] = self.smtp_send_seconds.get((), 0.0) + seconds
+
+    def snapshot(self):
+        """JSON-able copy of the counters plus this process's pool gauges"""
+        with self._lock:
+            counters = {
+                name: [list(key) + [value] for key, value in getattr(self, name).items()]
+                for name in ("requests", "db_seconds", "db_statements", "smtp_seconds",
+                             "smtp_sends", "smtp_send_seconds", "response_bytes",
+                             "uncompressed_bytes", "compression_seconds")
+            }
+            counters["durations"] = [list(key) + [list(value)] for key, value in self.durations.items()]
+            in_flight = [list(key) + [value] for key, value in self.in_flight.items()]
+        return {"pid": os.getpid(), "counters": counters, "in_flight": in_flight, "pools": _pool_stats()}
+
+    def maybe_flush(self):
+        """Write this process's snapshot to METRICS_DIR if the last write is old enough"""
+        if not METRICS_DIR:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_flush < FLUSH_INTERVAL:
+                return
+            self._last_flush = now
+        self.flush()
+
+    def flush(self):
+        if not METRICS_DIR:
+            return
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        _write_json(os.path.join(METRICS_DIR, f"{os.getpid()}.json"), self.snapshot())
+
+
+registry = Registry()
+atexit.register(registry.flush)
+
+
+def _write_json(path, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _bucket_index(seconds):
+    for i, bound in enumerate(BUCKETS):
+        if seconds <= bound:
+            return i
+    return len(BUCKETS)
+
+
+def _pool_stats():
+    stats = {}
+    try:
+        pool = db.engine.pool
+        if hasattr(pool, "checkedout"):
+            stats["db"] = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "overflow": max(pool.overflow(), 0),
+            }
+    except RuntimeError:
+        pass  # no app context, e.g. at interpreter exit
+    from email_service import get_email_service
+    service = get_email_service(create=False)
+    if service is not None:
+        stats["smtp"] = service._pool.stats()
+    return stats
+
+
+def observe_smtp(seconds, ok):
+    """Record one SMTP send; inside a request it also counts toward the request's SMTP time"""
+    registry.observe_smtp(seconds, ok)
+    if has_request_context() and "metrics_smtp_seconds" in g:
+        g.metrics_smtp_seconds += seconds
+    registry.maybe_flush()
+
+
+def _endpoint_key():
+    rule = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    return rule, request.method
+
+
+def _before_request():
+    g.metrics_key = _endpoint_key()
+    g.metrics_started = time.perf_counter()
+    g.metrics_smtp_seconds = 0.0
+    registry.start(g.metrics_key)
+
+
+def _after_request(response):
+    if "metrics_started" in g:
+        db_statements, db_seconds = request_db_stats()
+        registry.observe(
+            g.metrics_key,
+            response.status_code,
+            time.perf_counter() - g.metrics_started,
+            db_seconds,
+            db_statements,
+            g.metrics_smtp_seconds,
+        )
+        if not response.is_streamed:
+            sent = response.calculate_content_length() or 0
+            registry.observe_body(
+                g.metrics_key,
+                response.headers.get("Content-Encoding", "identity"),
+                sent,
+                g.get("response_uncompressed_bytes", sent),
+                g.get("compression_seconds", 0.0),
+            )
+    return response
+
+
+def _teardown_request(error):
+    if "metrics_key" in g:
+        registry.finish(g.metrics_key)
+        registry.maybe_flush()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def collect():
+    """Snapshots of every process: this one live, the others from METRICS_DIR"""
+    snapshots = [registry.snapshot()]
+    if METRICS_DIR:
+        own = f"{os.getpid()}.json"
+        # retired.json last: a worker being retired is listed there before its own file goes
+        paths = sorted(
+            glob.glob(os.path.join(METRICS_DIR, "*.json")),
+            key=lambda path: os.path.basename(path) == RETIRED_FILE,
+        )
+        for path in paths:
+            if os.path.basename(path) == own:
+                continue
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # being replaced or truncated; picked up next scrape
+        folded = {pid for snapshot in snapshots for pid in snapshot.get("retired", ())}
+        snapshots = [s for s in snapshots if s.get("retired") is not None or s["pid"] not in folded]
+    return snapshots
+
+
+def retire(pid):
+    """Fold an exited process's counters into METRICS_DIR/retired.json and remove its snapshot.
+
+    Called by gunicorn's child_exit hook in the master, one worker at a
+    time. retired.json is rewritten listing the pid before the pid's file is
+    removed, and collect() skips listed pids, so a scrape in between counts
+    the worker exactly once.
+    """
+    if not METRICS_DIR:
+        return
+    path = os.path.join(METRICS_DIR, f"{pid}.json")
+    retired_path = os.path.join(METRICS_DIR, RETIRED_FILE)
+    try:
+        with open(path) as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return
+    except ValueError:
+        os.remove(path)  # torn by a crash mid-write; nothing to fold
+        return
+    try:
+        with open(retired_path) as f:
+            retired = json.load(f)
+    except (FileNotFoundError, ValueError):
+        retired = {"pid": None, "counters": {}, "in_flight": [], "pools": {}}
+
+    merged = merge([retired, snapshot])
+    counters = {
+        name: [list(key) + [value] for key, value in merged[name].items()]
+        for name in merged if name not in ("in_flight", "pools")
+    }
+    retired.update(counters=counters, retired=[pid])
+    _write_json(retired_path, retired)
+    os.remove(path)
+    retired["retired"] = []
+    _write_json(retired_path, retired)
+
+
+def merge(snapshots):
+    """Sum counters over all snapshots; keep gauges of live processes only"""
+    merged = {name: {} for name in ("requests", "db_seconds", "db_statements", "smtp_seconds",
+                                    "smtp_sends", "smtp_send_seconds", "durations", "response_bytes",
+                                    "uncompressed_bytes", "compression_seconds")}
+    in_flight = {}
+    pools = {}
+    own_pid = os.getpid()
+    for snapshot in snapshots:
+        for name, rows in snapshot["counters"].items():
+            target = merged[name]
+            for row in rows:
+                key, value = tuple(row[:-1]), row[-1]
+                if name == "durations":
+                    current = target.setdefault(key, [0] * len(value))
+                    target[key] = [a + b for a, b in zip(current, value)]
+                else:
+                    target[key] = target.get(key, 0) + value
+        if snapshot["pid"] is None:
+            continue  # retired.json: counters only
+        if snapshot["pid"] == own_pid or _pid_alive(snapshot["pid"]):
+            for row in snapshot["in_flight"]:
+                key = tuple(row[:-1])
+                in_flight[key] = in_flight.get(key, 0) + row[-1]
+            pools[snapshot["pid"]] = snapshot["pools"]
+    merged["in_flight"] = in_flight
+    merged["pools"] = pools
+    return merged
+
+
+def estimate_quantile(q, histogram):
+    """histogram_quantile()-style estimate from [bucket counts..., +Inf count, sum]"""
+    counts = histogram[:-1]
+    total = sum(counts)
+    if not total:
+        return 0.0
+    rank = q * total
+    cumulative = 0
+    for i, count in enumerate(counts):
+        if cumulative + count >= rank and count:
+            if i == len(BUCKETS):
+                return BUCKETS[-1]
+            lower = BUCKETS[i - 1] if i else 0.0
+            return lower + (BUCKETS[i] - lower) * (rank - cumulative) / count
+        cumulative += count
+    return BUCKETS[-1]
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _family(lines, name, kind, help_text):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def render(merged):
+    """Prometheus text exposition of merged metrics"""
+    lines = []
+
+    _family(lines, "http_requests_total", "counter", "Requests handled, by endpoint, method and status.")
+    for (endpoint, method, status), value in sorted(merged["requests"].items()):
+        lines.append(f"http_requests_total{_labels(endpoint=endpoint, method=method, status=status)} {value}")
+
+    _family(lines, "http_request_duration_seconds", "histogram", "Time to produce the response headers.")
+    for (endpoint, method), histogram in sorted(merged["durations"].items()):
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ("+Inf",), histogram[:-1]):
+            cumulative += count
+            lines.append(
+                f"http_request_duration_seconds_bucket{_labels(endpoint=endpoint, method=method, le=bound)} {cumulative}"
+            )
+        labels = _labels(endpoint=endpoint, method=method)
+        lines.append(f"http_request_duration_seconds_sum{labels} {histogram[-1]}")
+        lines.append(f"http_request_duration_seconds_count{labels} {cumulative}")
+
+    _family(lines, "http_request_duration_quantile_seconds", "gauge",
+            "Latency quantiles estimated from http_request_duration_seconds.")
+    for (endpoint, method), histogram in sorted(merged["durations"].items()):
+        for q in QUANTILES:
+            lines.append(
+                f"http_request_duration_quantile_seconds{_labels(endpoint=endpoint, method=method, quantile=q)}"
+                f" {estimate_quantile(q, histogram):.6f}"
+            )
+
+    _family(lines, "http_requests_in_flight", "gauge", "Requests currently being handled.")
+    for (endpoint, method), value in sorted(merged["in_flight"].items()):
+        lines.append(f"http_requests_in_flight{_labels(endpoint=endpoint, method=method)} {value}")
+
+    for name, source, help_text in (
+        ("http_request_db_seconds_total", "db_seconds", "Time spent in SQL statements while handling requests."),
+        ("http_request_db_statements_total", "db_statements", "SQL statements executed while handling requests."),
+        ("http_request_smtp_seconds_total", "smtp_seconds", "Time spent sending email while handling requests."),
+        ("http_response_uncompressed_bytes_total", "uncompressed_bytes", "Response body bytes before compression."),
+        ("http_response_compression_seconds_total", "compression_seconds", "CPU time spent compressing responses."),
+    ):
+        _family(lines, name, "counter", help_text)
+        for (endpoint, method), value in sorted(merged[source].items()):
+            lines.append(f"{name}{_labels(endpoint=endpoint, method=method)} {value}")
+
+    _family(lines, "http_response_bytes_total", "counter", "Response body bytes sent, by Content-Encoding.")
+    for (endpoint, method, encoding), value in sorted(merged["response_bytes"].items()):
+        lines.append(f"http_response_bytes_total{_labels(endpoint=endpoint, method=method, encoding=encoding)} {value}")
+
+    _family(lines, "smtp_sends_total", "counter", "Emails sent, by result.")
+    for (result,), value in sorted(merged["smtp_sends"].items()):
+        lines.append(f"smtp_sends_total{_labels(result=result)} {value}")
+    _family(lines, "smtp_send_seconds_total", "counter", "Time spent in SMTP sends.")
+    lines.append(f"smtp_send_seconds_total {merged['smtp_send_seconds'].get((), 0.0)}")
+
+    for pool, fields in (("db", ("size", "checked_out", "overflow")), ("smtp", ("size", "in_use", "idle"))):
+        for field in fields:
+            name = f"{pool}_pool_{field}"
+            _family(lines, name, "gauge", f"{pool.upper()} connection pool {field.replace('_', ' ')}, per process.")
+            for pid, stats in sorted(merged["pools"].items()):
+                if pool in stats:
+                    lines.append(f"{name}{_labels(pid=pid)} {stats[pool][field]}")
+
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view():
+    registry.maybe_flush()
+    return Response(render(merge(collect())), content_type=CONTENT_TYPE)
+
+
+def init_metrics(app):
+    """Instrument every request of `app` and serve GET /metrics"""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule("/metrics", "metrics", metrics_view, methods=["GET"])
@@ -0,0 +1,25 @@
+"""Add car search indexes
+
+Revision ID: 4f6a1c9e8b27
+Revises: b2d84f7c1e36
+Create Date: 2026-10-17 21:12:47.903551
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '4f6a1c9e8b27'
+down_revision = 'b2d84f7c1e36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_cars_category_price_per_day', 'cars', ['category', 'price_per_day'])
+    op.create_index('ix_cars_price_per_day', 'cars', ['price_per_day'])
+
+
+def downgrade():
+    op.drop_index('ix_cars_price_per_day', table_name='cars')
+    op.drop_index('ix_cars_category_price_per_day', table_name='cars')
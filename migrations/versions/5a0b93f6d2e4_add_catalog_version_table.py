@@ -0,0 +1,34 @@
+"""Add catalog version stamp
+
+Revision ID: 5a0b93f6d2e4
+Revises: c41d6a0e7f28
+Create Date: 2026-10-17 14:22:18.640385
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a0b93f6d2e4'
+down_revision = 'c41d6a0e7f28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    catalog_version = op.create_table(
+        'catalog_version',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+    )
+    op.bulk_insert(catalog_version, [
+        {'id': 1, 'version': 1, 'updated_at': datetime.utcnow()}
+    ])
+
+
+def downgrade():
+    op.drop_table('catalog_version')
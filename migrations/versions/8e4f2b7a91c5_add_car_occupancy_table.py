@@ -0,0 +1,63 @@
+"""Add car occupancy table for date-range availability
+
+Revision ID: 8e4f2b7a91c5
+Revises: 3c9a7e1d4b62
+Create Date: 2026-10-17 11:40:03.527961
+
+"""
+from collections import Counter
+from datetime import timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e4f2b7a91c5'
+down_revision = '3c9a7e1d4b62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    car_occupancy = op.create_table(
+        'car_occupancy',
+        sa.Column('car_id', sa.Integer(), sa.ForeignKey('cars.id'), primary_key=True),
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('booked', sa.Integer(), nullable=False, server_default='0'),
+    )
+    op.create_index('ix_car_occupancy_day_car_id', 'car_occupancy', ['day', 'car_id'])
+
+    # Backfill occupancy from existing bookings: each occupies [start_date, end_date),
+    # with same-day rentals occupying their start day
+    conn = op.get_bind()
+    booked = Counter()
+    reservations = sa.text(
+        "SELECT car_id, start_date, end_date FROM reservations"
+    ).columns(car_id=sa.Integer, start_date=sa.Date, end_date=sa.Date)
+    for car_id, start_date, end_date in conn.execute(reservations):
+        days = max((end_date - start_date).days, 1)
+        for n in range(days):
+            booked[(car_id, start_date + timedelta(days=n))] += 1
+
+    if booked:
+        op.bulk_insert(car_occupancy, [
+            {'car_id': car_id, 'day': day, 'booked': count}
+            for (car_id, day), count in booked.items()
+        ])
+
+    # cars.quantity used to be decremented per booking; it now counts owned
+    # units, so give back the units held by existing reservations
+    op.execute(
+        "UPDATE cars SET quantity = COALESCE(quantity, 0) + "
+        "(SELECT COUNT(*) FROM reservations WHERE reservations.car_id = cars.id)"
+    )
+
+
+def downgrade():
+    op.execute(
+        "UPDATE cars SET quantity = COALESCE(quantity, 0) - "
+        "(SELECT COUNT(*) FROM reservations WHERE reservations.car_id = cars.id)"
+    )
+    op.drop_index('ix_car_occupancy_day_car_id', table_name='car_occupancy')
+    op.drop_table('car_occupancy')
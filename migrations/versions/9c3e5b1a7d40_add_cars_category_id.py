@@ -0,0 +1,37 @@
+"""Add cars.category_id referencing car_categories
+
+Revision ID: 9c3e5b1a7d40
+Revises: 4f6a1c9e8b27
+Create Date: 2026-10-17 21:48:05.331872
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c3e5b1a7d40'
+down_revision = '4f6a1c9e8b27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('cars') as batch_op:
+        batch_op.add_column(sa.Column('category_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_cars_category_id_car_categories', 'car_categories', ['category_id'], ['id'])
+        batch_op.create_index('ix_cars_category_id', ['category_id'])
+
+    # Cars whose category matches no title keep a NULL category_id
+    op.execute(
+        "UPDATE cars SET category_id = ("
+        " SELECT MIN(car_categories.id) FROM car_categories WHERE car_categories.title = cars.category"
+        ")"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('cars') as batch_op:
+        batch_op.drop_index('ix_cars_category_id')
+        batch_op.drop_constraint('fk_cars_category_id_car_categories', type_='foreignkey')
+        batch_op.drop_column('category_id')
@@ -0,0 +1,32 @@
+"""Backfill reservations.created_at and make it NOT NULL
+
+Revision ID: a3f8c2d6e915
+Revises: d5a17e3c92f8
+Create Date: 2026-10-17 23:41:12.508316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3f8c2d6e915'
+down_revision = 'd5a17e3c92f8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Legacy rows without a booking time get midnight of their start date
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute("UPDATE reservations SET created_at = start_date || ' 00:00:00' WHERE created_at IS NULL")
+    else:
+        op.execute("UPDATE reservations SET created_at = CAST(start_date AS TIMESTAMP) WHERE created_at IS NULL")
+
+    with op.batch_alter_table('reservations') as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('reservations') as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=True)
@@ -0,0 +1,40 @@
+"""Add seasonal rate and weekly discount tables
+
+Revision ID: b2d84f7c1e36
+Revises: e7c15d38a9b0
+Create Date: 2026-10-17 20:34:12.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2d84f7c1e36'
+down_revision = 'e7c15d38a9b0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'seasonal_rates',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('name', sa.String(100), nullable=False),
+        sa.Column('category', sa.String(50), nullable=True),
+        sa.Column('start_date', sa.Date(), nullable=False),
+        sa.Column('end_date', sa.Date(), nullable=False),
+        sa.Column('multiplier', sa.Float(), nullable=False),
+    )
+    op.create_table(
+        'weekly_discounts',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('category', sa.String(50), nullable=True),
+        sa.Column('min_days', sa.Integer(), nullable=False, server_default='7'),
+        sa.Column('percent_off', sa.Float(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table('weekly_discounts')
+    op.drop_table('seasonal_rates')
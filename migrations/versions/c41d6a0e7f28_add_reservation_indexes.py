@@ -0,0 +1,35 @@
+"""Add indexes to reservations
+
+Revision ID: c41d6a0e7f28
+Revises: 8e4f2b7a91c5
+Create Date: 2026-10-17 13:05:47.902114
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41d6a0e7f28'
+down_revision = '8e4f2b7a91c5'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_reservations_car_id_start_date_end_date', ['car_id', 'start_date', 'end_date']),
+    ('ix_reservations_email', ['email']),
+    ('ix_reservations_created_at_id', ['created_at', 'id']),
+]
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction on Postgres,
+    # but it lets bookings keep writing to the table while the index builds
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES:
+            op.create_index(name, 'reservations', columns, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(INDEXES):
+            op.drop_index(name, table_name='reservations', postgresql_concurrently=True)
@@ -0,0 +1,86 @@
+"""Add reservations archive table and an end_date index for archiving
+
+Revision ID: d5a17e3c92f8
+Revises: 9c3e5b1a7d40
+Create Date: 2026-10-17 22:20:41.776301
+
+On Postgres, with RESERVATIONS_ARCHIVE_PARTITIONED=true in the environment
+when this runs, the table is range-partitioned by start_date. Yearly
+partitions are created by `flask reservations archive` as it needs them;
+rows outside every partition land in reservations_archive_default.
+"""
+import os
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a17e3c92f8'
+down_revision = '9c3e5b1a7d40'
+branch_labels = None
+depends_on = None
+
+
+def _partitioned():
+    return (
+        op.get_bind().dialect.name == 'postgresql'
+        and os.getenv('RESERVATIONS_ARCHIVE_PARTITIONED', 'false').lower() in ('1', 'true', 'yes', 'on')
+    )
+
+
+def upgrade():
+    if _partitioned():
+        # The partition key has to be part of the primary key
+        op.execute("""
+            CREATE TABLE reservations_archive (
+                id INTEGER NOT NULL,
+                firstname VARCHAR(50) NOT NULL,
+                lastname VARCHAR(50) NOT NULL,
+                email VARCHAR(100) NOT NULL,
+                home VARCHAR(20),
+                cell VARCHAR(20),
+                car_id INTEGER NOT NULL,
+                start_date DATE NOT NULL,
+                end_date DATE NOT NULL,
+                total_price FLOAT NOT NULL,
+                created_at TIMESTAMP WITHOUT TIME ZONE,
+                archived_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+                PRIMARY KEY (id, start_date)
+            ) PARTITION BY RANGE (start_date)
+        """)
+        op.execute("CREATE TABLE reservations_archive_default PARTITION OF reservations_archive DEFAULT")
+    else:
+        op.create_table(
+            'reservations_archive',
+            sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+            sa.Column('firstname', sa.String(50), nullable=False),
+            sa.Column('lastname', sa.String(50), nullable=False),
+            sa.Column('email', sa.String(100), nullable=False),
+            sa.Column('home', sa.String(20), nullable=True),
+            sa.Column('cell', sa.String(20), nullable=True),
+            sa.Column('car_id', sa.Integer(), nullable=False),
+            sa.Column('start_date', sa.Date(), nullable=False),
+            sa.Column('end_date', sa.Date(), nullable=False),
+            sa.Column('total_price', sa.Float(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('archived_at', sa.DateTime(), nullable=False),
+            # Same key as the partitioned table, which must include the partition key
+            sa.PrimaryKeyConstraint('id', 'start_date'),
+        )
+    op.create_index('ix_reservations_archive_start_date', 'reservations_archive', ['start_date'])
+    op.create_index('ix_reservations_archive_email', 'reservations_archive', ['email'])
+
+    # Lets each archive batch find completed rentals without scanning the table.
+    # Built concurrently, outside a transaction, so bookings keep writing meanwhile
+    with op.get_context().autocommit_block():
+        op.create_index('ix_reservations_end_date', 'reservations', ['end_date'], postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_reservations_end_date', table_name='reservations', postgresql_concurrently=True)
+    op.drop_index('ix_reservations_archive_email', table_name='reservations_archive')
+    op.drop_index('ix_reservations_archive_start_date', table_name='reservations_archive')
+    # Dropping a partitioned table drops its partitions too
+    op.drop_table('reservations_archive')
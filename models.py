@@ -1,5 +1,7 @@
 from extensions import db
 from datetime import datetime
+from sqlalchemy import event, select
+from sqlalchemy.orm import attributes
 
 class Reservation(db.Model):
     __tablename__ = "reservations"
@@ -14,10 +16,44 @@ class Reservation(db.Model):
     start_date = db.Column(db.Date, nullable=False)
     end_date = db.Column(db.Date, nullable=False)
     total_price = db.Column(db.Float, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # NOT NULL: the (created_at, id) keyset cursor of GET /reservations relies on it
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
     car = db.relationship("Car")
 
+    __table_args__ = (
+        db.Index("ix_reservations_car_id_start_date_end_date", "car_id", "start_date", "end_date"),
+        db.Index("ix_reservations_email", "email"),
+        db.Index("ix_reservations_created_at_id", "created_at", "id"),
+        db.Index("ix_reservations_end_date", "end_date"),
+    )
+
+class ReservationArchive(db.Model):
+    """A completed reservation moved out of `reservations` by `flask reservations archive`.
+
+    Keyed by (id, start_date) because a partitioned archive table needs its
+    partition key in the primary key; id alone is still unique.
+    """
+    __tablename__ = "reservations_archive"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    firstname = db.Column(db.String(50), nullable=False)
+    lastname = db.Column(db.String(50), nullable=False)
+    email = db.Column(db.String(100), nullable=False)
+    home = db.Column(db.String(20))
+    cell = db.Column(db.String(20))
+    car_id = db.Column(db.Integer, nullable=False)
+    start_date = db.Column(db.Date, primary_key=True)
+    end_date = db.Column(db.Date, nullable=False)
+    total_price = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index("ix_reservations_archive_start_date", "start_date"),
+        db.Index("ix_reservations_archive_email", "email"),
+    )
+
 class CarCategory(db.Model):
     __tablename__ = "car_categories"
     id = db.Column(db.Integer, primary_key=True)
@@ -32,5 +68,140 @@ class Car(db.Model):
     name = db.Column(db.String(100), nullable=False)
     model = db.Column(db.String(50))
     category = db.Column(db.String(50), nullable=False)
+    # The CarCategory whose title is `category`; set from the title on flush
+    category_id = db.Column(db.Integer, db.ForeignKey('car_categories.id'), index=True)
     price_per_day = db.Column(db.Float)
-    quantity = db.Column(db.Integer, default=1)
\ No newline at end of file
+    quantity = db.Column(db.Integer, default=1)
+
+    __table_args__ = (
+        db.Index("ix_cars_category_price_per_day", "category", "price_per_day"),
+        db.Index("ix_cars_price_per_day", "price_per_day"),
+    )
+
+
+def category_id_for(title):
+    """Scalar subquery: id of the CarCategory titled `title` (a value or a column)"""
+    return (
+        select(CarCategory.id)
+        .where(CarCategory.title == title)
+        .order_by(CarCategory.id)
+        .limit(1)
+        .scalar_subquery()
+    )
+
+
+@event.listens_for(Car, "before_insert")
+@event.listens_for(Car, "before_update")
+def _link_category(mapper, connection, car):
+    # Resolved inside the INSERT/UPDATE itself, so no extra round trip
+    category_changed = attributes.get_history(car, "category").has_changes()
+    id_changed = attributes.get_history(car, "category_id").has_changes()
+    if (car.category_id is None or category_changed) and not id_changed:
+        car.category_id = category_id_for(car.category)
+
+
+@event.listens_for(CarCategory, "after_insert")
+def _link_waiting_cars(mapper, connection, category):
+    # Cars saved before their category existed
+    connection.execute(
+        Car.__table__.update()
+        .where(Car.category == category.title, Car.category_id.is_(None))
+        .values(category_id=category.id)
+    )
+
+
+@event.listens_for(CarCategory, "before_update")
+def _rename_category(mapper, connection, category):
+    # Car.category and the pricing rules hold the title, so a rename carries over to them
+    history = attributes.get_history(category, "title")
+    if not history.deleted or not history.added:
+        return
+    old_title, new_title = history.deleted[0], history.added[0]
+    connection.execute(
+        Car.__table__.update()
+        .where((Car.category_id == category.id) | ((Car.category == old_title) & Car.category_id.is_(None)))
+        .values(category=new_title, category_id=category.id)
+    )
+    still_used = connection.execute(
+        select(CarCategory.id).where(CarCategory.title == old_title, CarCategory.id != category.id).limit(1)
+    ).first()
+    if still_used is None:
+        for rules in (SeasonalRate, WeeklyDiscount):
+            connection.execute(
+                rules.__table__.update().where(rules.category == old_title).values(category=new_title)
+            )
+
+
+class EmailOutbox(db.Model):
+    __tablename__ = "email_outbox"
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    to_email = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="pending")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+
+class CarOccupancy(db.Model):
+    """Units of a car booked on a given day, maintained alongside reservations"""
+    __tablename__ = "car_occupancy"
+
+    car_id = db.Column(db.Integer, db.ForeignKey('cars.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    booked = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index("ix_car_occupancy_day_car_id", "day", "car_id"),
+    )
+
+
+class CatalogVersion(db.Model):
+    """Single-row stamp bumped whenever the car catalog changes"""
+    __tablename__ = "catalog_version"
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=1)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class IdempotencyKey(db.Model):
+    """Stored response for a client-supplied Idempotency-Key"""
+    __tablename__ = "idempotency_keys"
+
+    key = db.Column(db.String(255), primary_key=True)
+    request_hash = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer, nullable=False)
+    response_body = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class SeasonalRate(db.Model):
+    """Multiplier on the daily rate for the days of a season, fleet-wide or for one category"""
+    __tablename__ = "seasonal_rates"
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    category = db.Column(db.String(50))
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date, nullable=False)
+    multiplier = db.Column(db.Float, nullable=False)
+
+
+class WeeklyDiscount(db.Model):
+    """Percentage off a rental of at least min_days days, fleet-wide or for one category"""
+    __tablename__ = "weekly_discounts"
+
+    id = db.Column(db.Integer, primary_key=True)
+    category = db.Column(db.String(50))
+    min_days = db.Column(db.Integer, nullable=False, default=7)
+    percent_off = db.Column(db.Float, nullable=False)
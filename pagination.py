@@ -0,0 +1,100 @@
+"""
+Request parsing for paginated list endpoints.
+
+Understands the conventions of the react-admin data providers that talk to
+this API: a `Range: <unit>=0-24` header, json-server style `_start`/`_end`/
+`_sort`/`_order` parameters, and simple-rest style `range`/`sort`/`filter`
+JSON parameters. Keyset cursors are opaque tokens encoding the sort key of
+the last row of a page.
+"""
+
+import base64
+import json
+import os
+from datetime import datetime
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
+
+
+def _json_arg(args, name):
+    try:
+        return json.loads(args[name])
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid {name} parameter")
+
+
+def parse_window(args, headers):
+    """Return (offset, limit) for the requested page, capped at MAX_PAGE_SIZE"""
+    try:
+        range_header = headers.get("Range")
+        if range_header:
+            _, _, spec = range_header.partition("=")
+            first, _, last = spec.partition("-")
+            start, end = int(first), int(last) + 1
+        elif "_start" in args or "_end" in args:
+            start = int(args.get("_start", 0))
+            end = int(args.get("_end", start + DEFAULT_PAGE_SIZE))
+        elif "range" in args:
+            first, last = _json_arg(args, "range")
+            start, end = int(first), int(last) + 1
+        else:
+            start, end = 0, DEFAULT_PAGE_SIZE
+    except (TypeError, ValueError):
+        raise ValueError("Invalid range")
+
+    if start < 0 or end <= start:
+        raise ValueError("Invalid range")
+    return start, min(end - start, MAX_PAGE_SIZE)
+
+
+def parse_sort(args, allowed, default):
+    """Return (field, descending) from _sort/_order or sort=["field","ASC"]"""
+    if "_sort" in args:
+        field, order = args["_sort"], args.get("_order", "ASC")
+    elif "sort" in args:
+        try:
+            field, order = _json_arg(args, "sort")
+        except (TypeError, ValueError):
+            raise ValueError("Invalid sort parameter")
+    else:
+        return default
+
+    if field not in allowed:
+        raise ValueError(f"Cannot sort by {field}")
+    if str(order).upper() not in ("ASC", "DESC"):
+        raise ValueError(f"Invalid sort order: {order}")
+    return field, str(order).upper() == "DESC"
+
+
+def parse_filters(args, allowed):
+    """Merge the simple-rest `filter` JSON object with plain query parameters.
+
+    Plain parameters not in `allowed` are ignored (cache busters, extra
+    client state); an unknown key inside `filter` is a ValueError.
+    """
+    filters = {k: v for k, v in args.items() if k in allowed}
+    if "filter" in args:
+        extra = _json_arg(args, "filter")
+        if not isinstance(extra, dict):
+            raise ValueError("Invalid filter parameter")
+        for key in extra:
+            if key not in allowed:
+                raise ValueError(f"Cannot filter by {key}")
+        filters.update(extra)
+    return filters
+
+
+def encode_cursor(created_at, id):
+    raw = json.dumps([created_at.isoformat(), id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError for a malformed token"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(id)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid cursor")
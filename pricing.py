@@ -0,0 +1,184 @@
+"""
+Rental pricing.
+
+A rental is billed per occupied day (see availability.occupied_range: a
+same-day rental is one day). Each day costs the car's daily rate,
+Car.price_per_day or, when that is unset, the rate of its category
+(CarCategory.rate), times that day's seasonal multiplier:
+
+- seasonal_rates rows cover start_date..end_date inclusive, fleet-wide
+  (category NULL) or for one category. A category's own season wins over a
+  fleet-wide one on the same day; among overlapping seasons of the same
+  kind the highest multiplier applies. Days outside every season are x1.
+- weekly_discounts rows take percent_off off the whole rental when it is at
+  least min_days long; the best discount the rental qualifies for applies,
+  fleet-wide or for the car's category.
+
+quote_many() prices any number of (car_id, start_date, end_date) requests
+in one pass: the rule tables are read once per catalog version (they are
+part of the catalog; see catalog_cache), each category's season calendar
+is built once over the span of all requests as prefix sums of the daily
+multipliers, and each quote is then two lookups into it.
+
+Booking uses the same engine, so the stored total_price is the server's.
+"""
+
+from collections import namedtuple
+from datetime import timedelta
+
+from sqlalchemy import select
+
+from availability import occupied_range
+from catalog_cache import catalog_cache, current_catalog_version
+from extensions import db
+from models import Car, CarCategory, SeasonalRate, WeeklyDiscount
+
+Season = namedtuple("Season", "category start_date end_date multiplier")
+Discount = namedtuple("Discount", "category min_days percent_off")
+
+
+def _money(value):
+    return round(value, 2)
+
+
+class PricingRules:
+    """Category rates, seasons and discounts as of one catalog version"""
+
+    def __init__(self, category_rates, seasons, discounts):
+        self.category_rates = category_rates
+        self.seasons = seasons
+        self.discounts = discounts
+
+    def daily_rate(self, price_per_day, category):
+        """The car's own rate, else its category's; None when neither is set"""
+        rate = price_per_day if price_per_day else self.category_rates.get(category)
+        return rate if rate and rate > 0 else None
+
+    def discount(self, category, days):
+        """Best percent_off a rental of `days` days in `category` qualifies for"""
+        return max(
+            (d.percent_off for d in self.discounts
+             if d.min_days <= days and d.category in (None, category)),
+            default=0.0,
+        )
+
+    def calendar(self, category, first, days):
+        """Prefix sums of the daily multipliers for `category` over `days` days from `first`.
+
+        The multiplier total for [start, end) is sums[end - first] - sums[start - first].
+        """
+        own = [None] * days
+        fleet = [None] * days
+        last = first + timedelta(days=days - 1)
+        for season in self.seasons:
+            if season.category is None:
+                target = fleet
+            elif season.category == category:
+                target = own
+            else:
+                continue
+            if season.end_date < first or season.start_date > last:
+                continue
+            lo = max((season.start_date - first).days, 0)
+            hi = min((season.end_date - first).days, days - 1)
+            for i in range(lo, hi + 1):
+                if target[i] is None or season.multiplier > target[i]:
+                    target[i] = season.multiplier
+
+        sums = [0.0] * (days + 1)
+        total = 0.0
+        for i in range(days):
+            multiplier = own[i] if own[i] is not None else fleet[i] if fleet[i] is not None else 1.0
+            total += multiplier
+            sums[i + 1] = total
+        return sums
+
+    def quote_many(self, requests, cars):
+        """Price (car_id, start_date, end_date) requests; `cars` maps car_id to (price_per_day, category).
+
+        Returns one quote dict per request, or None where the car is unknown
+        or has no rate.
+        """
+        windows = [occupied_range(start_date, end_date) for _, start_date, end_date in requests]
+        if not windows:
+            return []
+        first = min(w[0] for w in windows)
+        span = (max(w[1] for w in windows) - first).days
+
+        calendars = {}
+        quotes = []
+        for (car_id, start_date, end_date), (occupied_from, occupied_to) in zip(requests, windows):
+            car = cars.get(car_id)
+            rate = self.daily_rate(*car) if car is not None else None
+            if rate is None:
+                quotes.append(None)
+                continue
+            category = car[1]
+            sums = calendars.get(category)
+            if sums is None:
+                sums = calendars[category] = self.calendar(category, first, span)
+
+            days = (occupied_to - occupied_from).days
+            lo = (occupied_from - first).days
+            subtotal = _money(rate * (sums[lo + days] - sums[lo]))
+            discount = _money(subtotal * self.discount(category, days) / 100)
+            quotes.append({
+                "car_id": car_id,
+                "start_date": start_date.isoformat(),
+                "end_date": end_date.isoformat(),
+                "days": days,
+                "daily_rate": rate,
+                "subtotal": subtotal,
+                "discount": discount,
+                "total_price": _money(subtotal - discount),
+            })
+        return quotes
+
+
+def load_rules():
+    category_rates = {}
+    for title, rate in db.session.execute(select(CarCategory.title, CarCategory.rate)):
+        category_rates.setdefault(title, rate)
+    seasons = [
+        Season(*row) for row in db.session.execute(
+            select(SeasonalRate.category, SeasonalRate.start_date, SeasonalRate.end_date, SeasonalRate.multiplier)
+        )
+    ]
+    discounts = [
+        Discount(*row) for row in db.session.execute(
+            select(WeeklyDiscount.category, WeeklyDiscount.min_days, WeeklyDiscount.percent_off)
+        )
+    ]
+    return PricingRules(category_rates, seasons, discounts)
+
+
+def _load_fleet():
+    return {
+        car_id: (price_per_day, category)
+        for car_id, price_per_day, category in db.session.execute(select(Car.id, Car.price_per_day, Car.category))
+    }
+
+
+def current_rules():
+    """PricingRules for the current catalog version, loaded once per version per process"""
+    version, _ = current_catalog_version()
+    return catalog_cache.get("pricing-rules", version, load_rules)
+
+
+def fleet():
+    """{car_id: (price_per_day, category)} for the current catalog version, cached like the rules"""
+    version, _ = current_catalog_version()
+    return catalog_cache.get("pricing-fleet", version, _load_fleet)
+
+
+def quote_many(requests, cars=None):
+    """Quotes for (car_id, start_date, end_date) requests, see PricingRules.quote_many.
+
+    Without `cars`, car rates come from fleet().
+    """
+    return current_rules().quote_many(requests, fleet() if cars is None else cars)
+
+
+def quote(car, start_date, end_date):
+    """Quote for one booking of a loaded Car (or row with id, price_per_day and category)"""
+    return quote_many([(car.id, start_date, end_date)], {car.id: (car.price_per_day, car.category)})[0]
@@ -0,0 +1,84 @@
+"""
+Readiness, tracked separately from process start.
+
+create_app does no I/O, so a worker can accept connections as soon as it
+has imported; the database is first touched by a request. GET /ready tells
+a load balancer or deploy check whether this process can actually serve
+traffic: it answers 503 until the database responds, and reports how long
+the process took to boot and to become ready.
+
+Database checks are cached for READINESS_CHECK_INTERVAL seconds so a
+frequently polled /ready does not add a query per probe.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from flask import current_app, jsonify
+from sqlalchemy import text
+
+from extensions import db
+
+logger = logging.getLogger(__name__)
+
+CHECK_INTERVAL = float(os.getenv("READINESS_CHECK_INTERVAL", "5"))
+
+# Close enough to process start for boot timings: this module is imported by create_app
+PROCESS_STARTED = time.monotonic()
+
+
+class Readiness:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.booted_at = time.monotonic()
+        self.ready_at = None
+        self._checked_at = None
+        self._database_ok = False
+        self._error = None
+
+    def check(self):
+        """(database_ok, error) using a cached result when it is fresh enough"""
+        now = time.monotonic()
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < CHECK_INTERVAL:
+                return self._database_ok, self._error
+
+        try:
+            db.session.execute(text("SELECT 1"))
+            ok, error = True, None
+        except Exception as e:
+            db.session.rollback()
+            ok, error = False, str(e).splitlines()[0]
+            logger.warning(f"Readiness check failed: {error}")
+
+        with self._lock:
+            self._checked_at, self._database_ok, self._error = time.monotonic(), ok, error
+            if ok and self.ready_at is None:
+                self.ready_at = self._checked_at
+        return ok, error
+
+    def report(self):
+        ok, error = self.check()
+        body = {
+            "status": "ready" if ok else "not_ready",
+            "database": "connected" if ok else "unavailable",
+            "uptime_seconds": round(time.monotonic() - PROCESS_STARTED, 3),
+            "boot_seconds": round(self.booted_at - PROCESS_STARTED, 3),
+            "ready_after_seconds": round(self.ready_at - PROCESS_STARTED, 3) if self.ready_at else None,
+        }
+        if error:
+            body["error"] = error
+        return body, 200 if ok else 503
+
+
+def ready_view():
+    body, status = current_app.extensions["readiness"].report()
+    return jsonify(body), status
+
+
+def init_readiness(app):
+    """Serve GET /ready for `app`; call last in create_app so boot_seconds covers the factory"""
+    app.extensions["readiness"] = Readiness()
+    app.add_url_rule("/ready", "ready", ready_view, methods=["GET"])
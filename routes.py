@@ -1,9 +1,42 @@
-from flask import Blueprint, jsonify, request, make_response
-from models import Reservation, Car, CarCategory
+from flask import Blueprint, Response, current_app, jsonify, request, make_response, stream_with_context
+from models import Reservation, Car
 from extensions import db
 from email_service import email_service
+from email_outbox import (
+    enqueue_admin_email,
+    enqueue_booking_confirmation,
+    enqueue_booking_confirmations,
+    enqueue_contact_message,
+)
+import archive
+import availability
+import pricing
+from catalog_cache import catalog_cache, current_catalog_version
+from compression import compress, negotiate_encoding, set_encoded_body
+from transactions import run_with_retry
+import idempotency
+import serializers
+from serializers import (
+    CAR_CATEGORY_COLUMNS,
+    CAR_COLUMNS,
+    RESERVATION_LIST_COLUMNS,
+    reservation_list_columns,
+    serialize_availability,
+    serialize_car,
+    serialize_car_category,
+    serialize_car_category_stats,
+    serialize_car_search,
+    serialize_reservation,
+)
+from pagination import MAX_PAGE_SIZE, parse_window, parse_sort, parse_filters, encode_cursor, decode_cursor
+from sqlalchemy import func, insert, or_, select, tuple_
+from sqlalchemy.exc import IntegrityError
+import csv
+import io
 import logging
-from datetime import datetime
+import math
+import os
+from datetime import date, datetime
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -16,17 +49,66 @@ def handle_error(error):
     logger.error(f"Unhandled error: {error}")
     return jsonify({"error": "Internal server error"}), 500
 
+CATALOG_MAX_AGE = int(os.getenv("CATALOG_MAX_AGE", "60"))
+
+def catalog_response(name, build):
+    """Serve a catalog listing with validators, answering revalidation with 304.
+
+    The ETag is derived from the catalog version stamp alone, so a matching
+    If-None-Match is answered without querying the catalog tables, and the
+    serialised body, and each compressed encoding of it, is reused until the
+    version changes.
+    """
+    version, updated_at = current_catalog_version()
+    etag = f"{name}-v{version}"
+
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains_weak(etag)
+    else:
+        not_modified = (
+            request.if_modified_since is not None
+            and request.if_modified_since.replace(tzinfo=None) >= updated_at.replace(microsecond=0)
+        )
+
+    if not_modified:
+        response = make_response("", 304)
+    else:
+        body = catalog_cache.get(name, version, lambda: (current_app.json.dumps(build()) + "\n").encode())
+        response = current_app.response_class(body, mimetype="application/json")
+        encoding = negotiate_encoding(len(body))
+        if encoding is not None:
+            encoded = catalog_cache.get(
+                f"{name}.{encoding}", version, lambda: compress(body, encoding, cached=True)
+            )
+            set_encoded_body(response, encoded, encoding, len(body))
+    response.vary.add("Accept-Encoding")
+    # Weak once encoded: the bytes differ per encoding, the catalog does not
+    response.set_etag(etag, weak="Content-Encoding" in response.headers)
+    response.last_modified = updated_at
+    response.cache_control.public = True
+    response.cache_control.max_age = CATALOG_MAX_AGE
+    return response
+
+def _car_categories():
+    rows = db.session.execute(select(*CAR_CATEGORY_COLUMNS)).all()
+    return [serialize_car_category(r) for r in rows]
+
+def _cars():
+    rows = db.session.execute(select(*CAR_COLUMNS)).all()
+    return [serialize_car(r) for r in rows]
+
 @bp.route("/car-categories", methods=["GET"])
 def get_car_categories():
+    """The category catalog; with include=stats, each category's car count,
+    total units and units free today (live, so not ETag-cached)"""
+    include = request.args.get("include")
+    if include not in (None, "", "stats"):
+        return jsonify({"error": "include must be stats"}), 400
     try:
-        categories = CarCategory.query.all()
-        return jsonify([{
-            "id": c.id,
-            "title": c.title,
-            "image": c.image,
-            "description": c.description,
-            "rate": float(c.rate) if c.rate else 0
-        } for c in categories])
+        if include == "stats":
+            rows = db.session.execute(availability.category_stats_query(date.today())).all()
+            return jsonify([serialize_car_category_stats(r) for r in rows])
+        return catalog_response("car-categories", _car_categories)
     except Exception as e:
         logger.error(f"Error fetching car categories: {e}")
         return jsonify({"error": "Failed to fetch car categories"}), 500
@@ -34,145 +116,679 @@ def get_car_categories():
 @bp.route("/cars", methods=["GET"])
 def get_cars():
     try:
-        cars = Car.query.all()
-        return jsonify([{
-            "id": c.id,
-            "name": c.name,
-            "model": c.model,
-            "category": c.category,
-            "price_per_day": float(c.price_per_day) if c.price_per_day else 0,
-            "quantity": c.quantity or 0
-        } for c in cars])
+        return catalog_response("cars", _cars)
     except Exception as e:
         logger.error(f"Error fetching cars: {e}")
         return jsonify({"error": "Failed to fetch cars"}), 500
     
+CAR_SEARCH_SORT_FIELDS = {
+    "id": Car.id,
+    "name": Car.name,
+    "price": Car.price_per_day,
+    "available": None,  # needs start and end
+}
+CAR_SEARCH_DEFAULT_LIMIT = int(os.getenv("CAR_SEARCH_DEFAULT_LIMIT", "50"))
+
+
+def _number_arg(args, name, convert=float, default=None):
+    value = args.get(name)
+    if value in (None, ""):
+        return default
+    try:
+        number = convert(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+    if not math.isfinite(number):
+        raise ValueError(f"{name} must be a finite number")
+    return number
+
+
+def car_search_query(args):
+    """Build the single SELECT behind GET /cars/search; raises ValueError for bad parameters"""
+    min_price, max_price = _number_arg(args, "min_price"), _number_arg(args, "max_price")
+
+    start, end = args.get("start"), args.get("end")
+    if bool(start) != bool(end):
+        raise ValueError("start and end must be given together")
+    window = None
+    if start:
+        window = parse_dates({"start_date": start, "end_date": end})
+
+    sort = args.get("sort") or "id"
+    if sort.startswith("["):
+        field, descending = parse_sort(args, CAR_SEARCH_SORT_FIELDS, default=("id", False))
+    else:
+        field, descending = sort.lstrip("-"), sort.startswith("-")
+        if field not in CAR_SEARCH_SORT_FIELDS:
+            raise ValueError(f"Cannot sort by {field}")
+    if field == "available" and window is None:
+        raise ValueError("Sorting by available needs start and end")
+
+    limit = _number_arg(args, "limit", int, CAR_SEARCH_DEFAULT_LIMIT)
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+
+    query = select(*CAR_COLUMNS)
+    if args.get("category"):
+        query = query.where(Car.category == args["category"])
+    if min_price is not None:
+        query = query.where(Car.price_per_day >= min_price)
+    if max_price is not None:
+        query = query.where(Car.price_per_day <= max_price)
+
+    if window is not None:
+        group_by = [] if field in ("id", "available") else [CAR_SEARCH_SORT_FIELDS[field]]
+        query, available = availability.with_free_units(query, *window, order_by=group_by)
+        min_available = _number_arg(args, "min_available", int, 1)
+        if min_available > 0:
+            query = query.having(available >= min_available)
+        sort_column = available if field == "available" else CAR_SEARCH_SORT_FIELDS[field]
+    else:
+        sort_column = CAR_SEARCH_SORT_FIELDS[field]
+
+    order = [sort_column.desc() if descending else sort_column.asc()]
+    if field != "id":
+        order.append(Car.id)
+    return query.order_by(*order).limit(min(limit, MAX_PAGE_SIZE)), window is not None
+
+
+@bp.route("/cars/search", methods=["GET"])
+def search_cars():
+    """Cars matching category, price and availability filters, sorted and limited in SQL.
+
+    Query parameters: category, min_price, max_price (on price_per_day),
+    start and end (YYYY-MM-DD; only cars with at least min_available free
+    units, default 1, and each car's free units as `available`), sort
+    (id, name, price or available, prefixed with - for descending) and
+    limit.
+    """
+    try:
+        query, with_window = car_search_query(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        rows = db.session.execute(query).all()
+        serialize = serialize_car_search if with_window else serialize_car
+        return jsonify([serialize(r) for r in rows])
+    except Exception as e:
+        logger.error(f"Error searching cars: {e}", exc_info=True)
+        return jsonify({"error": "Failed to search cars"}), 500
+
+@bp.route("/availability", methods=["GET"])
+def get_availability():
+    """Free units per car for a date window, optionally limited to one category"""
+    try:
+        start_date = datetime.strptime(request.args.get('start', ''), '%Y-%m-%d').date()
+        end_date = datetime.strptime(request.args.get('end', ''), '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({"error": "start and end are required as YYYY-MM-DD"}), 400
+
+    if end_date < start_date:
+        return jsonify({"error": "end must be on or after start"}), 400
+
+    try:
+        rows = availability.fleet_availability(start_date, end_date, category=request.args.get('category'))
+        return jsonify([serialize_availability(r) for r in rows])
+    except Exception as e:
+        logger.error(f"Error fetching availability: {e}")
+        return jsonify({"error": "Failed to fetch availability"}), 500
+    
+QUOTE_MAX_ITEMS = int(os.getenv("QUOTE_MAX_ITEMS", "1000"))
+QUOTE_MAX_SPAN_DAYS = int(os.getenv("QUOTE_MAX_SPAN_DAYS", "731"))
+
+
+@bp.route("/quotes", methods=["POST"])
+def create_quotes():
+    """Price many rentals in one pass.
+
+    Body: {"quotes": [{"car_id", "start_date", "end_date"}, ...]}, or
+    {"start_date", "end_date", "car_ids": [...]} for several cars over one
+    window (every car when car_ids is omitted). Each result is a quote, or
+    {"car_id", "error"} for an unknown car or one without a price.
+    """
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "Body must be a JSON object"}), 400
+    try:
+        if "quotes" in data:
+            items = data["quotes"]
+            if not isinstance(items, list) or not items:
+                raise ValueError("quotes must be a non-empty list")
+            requests = []
+            for index, item in enumerate(items):
+                if not isinstance(item, dict):
+                    raise ValueError(f"quotes[{index}] must be a JSON object")
+                try:
+                    car_id = int(item["car_id"])
+                except (KeyError, TypeError, ValueError):
+                    raise ValueError(f"quotes[{index}]: car_id must be a number")
+                try:
+                    requests.append((car_id, *parse_dates(item)))
+                except ValueError as e:
+                    raise ValueError(f"quotes[{index}]: {e}")
+        else:
+            start_date, end_date = parse_dates(data)
+            car_ids = data.get("car_ids")
+            if car_ids is None:
+                car_ids = sorted(pricing.fleet())
+            elif not isinstance(car_ids, list):
+                raise ValueError("car_ids must be a list")
+            try:
+                requests = [(int(car_id), start_date, end_date) for car_id in car_ids]
+            except (TypeError, ValueError):
+                raise ValueError("car_ids must be numbers")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if len(requests) > QUOTE_MAX_ITEMS:
+        return jsonify({"error": f"At most {QUOTE_MAX_ITEMS} quotes per request"}), 400
+    if requests:
+        span = (max(r[2] for r in requests) - min(r[1] for r in requests)).days
+        if span > QUOTE_MAX_SPAN_DAYS:
+            return jsonify({"error": f"Quotes may span at most {QUOTE_MAX_SPAN_DAYS} days"}), 400
+
+    try:
+        quotes = pricing.quote_many(requests)
+        return jsonify({"quotes": [
+            quote if quote is not None else {"car_id": car_id, "error": "Car not found or has no price"}
+            for (car_id, _, _), quote in zip(requests, quotes)
+        ]})
+    except Exception as e:
+        logger.error(f"Error pricing quotes: {e}", exc_info=True)
+        return jsonify({"error": "Failed to price quotes"}), 500
+
+
+BOOKING_REQUIRED_FIELDS = ['car_id', 'firstname', 'lastname', 'email', 'start_date', 'end_date']
+# Each booked day is a car_occupancy row, so a booking is capped like a quote span
+BOOKING_MAX_DAYS = int(os.getenv("BOOKING_MAX_DAYS", str(QUOTE_MAX_SPAN_DAYS)))
+
+
+def parse_dates(data):
+    """(start_date, end_date) from YYYY-MM-DD fields; raises ValueError"""
+    try:
+        start_date = datetime.strptime(data['start_date'], '%Y-%m-%d').date()
+        end_date = datetime.strptime(data['end_date'], '%Y-%m-%d').date()
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("Invalid date format. Use YYYY-MM-DD")
+    if end_date < start_date:
+        raise ValueError("end_date must be on or after start_date")
+    return start_date, end_date
+
+
+def stale_total(data, quote):
+    """Error message when a client-sent total_price differs from the quote, else None.
+
+    total_price is optional; a client that shows a price must book at that
+    price, so a stale one is rejected rather than silently replaced.
+    """
+    sent = data.get('total_price')
+    if sent is None:
+        return None
+    try:
+        sent = float(sent)
+    except (TypeError, ValueError):
+        return "total_price must be a number"
+    if abs(sent - quote['total_price']) > 0.005:
+        return f"total_price {sent:.2f} does not match the current price {quote['total_price']:.2f}"
+    return None
+
+
+def parse_booking(data):
+    """Validate one booking request; returns Reservation column values or raises ValueError.
+
+    total_price is not taken from the request: the caller prices the
+    booking with the pricing engine.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Booking must be a JSON object")
+    for field in BOOKING_REQUIRED_FIELDS:
+        if field not in data or not data[field]:
+            raise ValueError(f"Missing required field: {field}")
+
+    start_date, end_date = parse_dates(data)
+    if (end_date - start_date).days > BOOKING_MAX_DAYS:
+        raise ValueError(f"A booking may span at most {BOOKING_MAX_DAYS} days")
+
+    try:
+        car_id = int(data['car_id'])
+    except (TypeError, ValueError):
+        raise ValueError("car_id must be a number")
+
+    return {
+        'firstname': data['firstname'],
+        'lastname': data['lastname'],
+        'email': data['email'],
+        'home': data.get('home'),
+        'cell': data.get('cell'),
+        'car_id': car_id,
+        'start_date': start_date,
+        'end_date': end_date,
+    }
+
+
 @bp.route("/reservations", methods=["POST"])
 def create_reservation():    
     try:
         data = request.get_json()
         logger.info(f"Received reservation request: {data}")
+
+        # A retried request with a known Idempotency-Key gets the original
+        # response back, from one primary-key lookup
+        idempotency_key = request.headers.get(idempotency.HEADER)
+        if idempotency_key is not None:
+            if not idempotency_key or len(idempotency_key) > idempotency.MAX_KEY_LENGTH:
+                return jsonify({"error": f"{idempotency.HEADER} must be 1-{idempotency.MAX_KEY_LENGTH} characters"}), 400
+            fingerprint = idempotency.request_fingerprint(data)
+            stored = idempotency.lookup(idempotency_key)
+            if stored is not None:
+                return idempotency.replay(stored, fingerprint)
         
-        # Validate required fields
-        required_fields = ['car_id', 'firstname', 'lastname', 'email', 'start_date', 'end_date', 'total_price']
-        for field in required_fields:
-            if field not in data or not data[field]:
-                return jsonify({"error": f"Missing required field: {field}"}), 400
+        try:
+            booking = parse_booking(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-        car = Car.query.get(data['car_id'])
+        car = Car.query.get(booking['car_id'])
         if not car:
             return jsonify({"error": "Car not found"}), 404
-            
-        if car.quantity <= 0:
-            return jsonify({"error": "Car not available"}), 400
 
-        # Parse dates
-        try:
-            start_date = datetime.strptime(data['start_date'], '%Y-%m-%d').date()
-            end_date = datetime.strptime(data['end_date'], '%Y-%m-%d').date()
-        except ValueError:
-            return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
-
-        reservation = Reservation(
-            firstname=data['firstname'],
-            lastname=data['lastname'],
-            email=data['email'],
-            home=data.get('home'),
-            cell=data.get('cell'),
-            car_id=car.id,
-            start_date=start_date,
-            end_date=end_date,
-            total_price=float(data['total_price'])
-        )
+        quote = pricing.quote(car, booking['start_date'], booking['end_date'])
+        if quote is None:
+            return jsonify({"error": "No price is set for this car"}), 400
+        mismatch = stale_total(data, quote)
+        if mismatch:
+            return jsonify({"error": mismatch, "quote": quote}), 409
+        booking['total_price'] = quote['total_price']
 
-        # Decrease car availability
-        car.quantity -= 1
+        def book():
+            # Claim the key first: a concurrent duplicate fails here, before
+            # it has written anything
+            claimed = idempotency.claim(idempotency_key, fingerprint) if idempotency_key else None
 
-        db.session.add(reservation)
-        db.session.flush()  # Get the ID before commit
-        reservation_id = reservation.id
-        db.session.commit()
-        
-        logger.info(f"Reservation created: {reservation_id} for {reservation.email}")
-        
-        # Send confirmation email
-        email_sent = False
-        try:
-            car_data = {
-                'name': car.name,
-                'model': car.model,
-                'category': car.category,
-                'price_per_day': car.price_per_day
-            }
-            
-            reservation_data = {
-                'id': reservation_id,
-                'firstname': reservation.firstname,
-                'lastname': reservation.lastname,
-                'email': reservation.email,
-                'home': reservation.home,
-                'cell': reservation.cell,
-                'start_date': reservation.start_date.strftime('%B %d, %Y'),
-                'end_date': reservation.end_date.strftime('%B %d, %Y'),
-                'total_price': reservation.total_price
+            reservation = Reservation(**booking)
+
+            db.session.add(reservation)
+            db.session.flush()  # Get the ID before commit
+            reservation_id = reservation.id
+
+            # Queue the confirmation in the same transaction; the email worker sends it
+            enqueue_booking_confirmation(reservation, car)
+
+            # Check and take the unit last so the contended occupancy rows are
+            # locked only for the commit
+            if not availability.reserve(car.id, booking['start_date'], booking['end_date']):
+                db.session.rollback()
+                return None
+
+            body = {
+                "message": "Reservation successful", 
+                "reservation_id": reservation_id,
+                "total_price": booking['total_price'],
+                "email_sent": "queued"
             }
-            
-            logger.info(f"Sending email to {reservation.email}")
-            email_sent = email_service.send_booking_confirmation(reservation_data, car_data)
-            
-            if email_sent:
-                logger.info(f"Confirmation email sent successfully to {reservation.email}")
-            else:
-                logger.warning(f"Failed to send confirmation email to {reservation.email}")
-                
-        except Exception as email_error:
-            logger.error(f"Error sending confirmation email: {email_error}", exc_info=True)
-            # Don't fail the reservation if email fails
+            if claimed is not None:
+                idempotency.remember(claimed, 201, body)
+
+            db.session.commit()
+            return body
+
+        try:
+            body = run_with_retry(book)
+        except IntegrityError:
+            # Lost the race for the key to an identical request; replay its response
+            db.session.rollback()
+            stored = idempotency.lookup(idempotency_key) if idempotency_key else None
+            if stored is None:
+                raise
+            return idempotency.replay(stored, fingerprint)
+        if body is None:
+            return jsonify({"error": "Car not available"}), 400
         
-        return jsonify({
-            "message": "Reservation successful", 
-            "reservation_id": reservation_id,
-            "email_sent": email_sent
-        }), 201
+        logger.info(f"Reservation created: {body['reservation_id']} for {data['email']}")
+        
+        return jsonify(body), 201
         
     except Exception as e:
         db.session.rollback()
         logger.error(f"Error creating reservation: {e}", exc_info=True)
         return jsonify({"error": "Failed to create reservation"}), 500
     
+RESERVATION_BATCH_MAX_SIZE = int(os.getenv("RESERVATION_BATCH_MAX_SIZE", "200"))
+BATCH_MODES = ("all_or_nothing", "partial")
+
+# Columns read back from the batch INSERT, enough for the confirmation payloads
+RESERVATION_INSERT_RETURNING = (
+    Reservation.id,
+    Reservation.firstname,
+    Reservation.lastname,
+    Reservation.email,
+    Reservation.home,
+    Reservation.cell,
+    Reservation.start_date,
+    Reservation.end_date,
+    Reservation.total_price,
+    Reservation.created_at,
+)
+
+
+@bp.route("/reservations/batch", methods=["POST"])
+def create_reservations_batch():
+    """Create many reservations in one transaction.
+
+    Body: {"reservations": [...], "mode": "all_or_nothing" | "partial"}.
+    In all_or_nothing mode (the default) any invalid or unavailable booking
+    rejects the whole batch; in partial mode the bookings that fit are
+    created and the rest are reported per index.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({"error": "Body must be a JSON object with a reservations list"}), 400
+        items = data.get("reservations")
+        mode = data.get("mode", "all_or_nothing")
+        if mode not in BATCH_MODES:
+            return jsonify({"error": f"mode must be one of: {', '.join(BATCH_MODES)}"}), 400
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "reservations must be a non-empty list"}), 400
+        if len(items) > RESERVATION_BATCH_MAX_SIZE:
+            return jsonify({"error": f"At most {RESERVATION_BATCH_MAX_SIZE} reservations per batch"}), 400
+
+        results = {}
+        bookings = {}
+        for index, item in enumerate(items):
+            try:
+                bookings[index] = parse_booking(item)
+            except ValueError as e:
+                results[index] = {"index": index, "status": 400, "error": str(e)}
+
+        car_ids = {booking["car_id"] for booking in bookings.values()}
+        cars = {car.id: car for car in Car.query.filter(Car.id.in_(car_ids))} if car_ids else {}
+        for index in [i for i, booking in bookings.items() if booking["car_id"] not in cars]:
+            results[index] = {"index": index, "status": 404, "error": "Car not found"}
+            del bookings[index]
+
+        indices = list(bookings)
+        quotes = pricing.quote_many(
+            [(bookings[i]["car_id"], bookings[i]["start_date"], bookings[i]["end_date"]) for i in indices],
+            {car.id: (car.price_per_day, car.category) for car in cars.values()},
+        )
+        for index, quote in zip(indices, quotes):
+            if quote is None:
+                results[index] = {"index": index, "status": 400, "error": "No price is set for this car"}
+                del bookings[index]
+            elif stale_total(items[index], quote):
+                results[index] = {"index": index, "status": 409, "error": stale_total(items[index], quote),
+                                  "quote": quote}
+                del bookings[index]
+            else:
+                bookings[index]["total_price"] = quote["total_price"]
+
+        if mode == "all_or_nothing" and results:
+            return jsonify({"error": "Batch rejected", "results": sorted(results.values(), key=lambda r: r["index"])}), 400
+
+        by_car = {}
+        for index, booking in bookings.items():
+            by_car.setdefault(booking["car_id"], []).append(index)
+
+        def book():
+            booked, unavailable = [], []
+            # Lock cars in id order so concurrent batches cannot deadlock
+            for car_id in sorted(by_car):
+                indices = by_car[car_id]
+                windows = [(bookings[i]["start_date"], bookings[i]["end_date"]) for i in indices]
+                if mode == "all_or_nothing":
+                    if not availability.reserve_many(car_id, windows):
+                        db.session.rollback()
+                        return [], indices
+                    booked.extend(indices)
+                    continue
+
+                savepoint = db.session.begin_nested()
+                if availability.reserve_many(car_id, windows):
+                    savepoint.commit()
+                    booked.extend(indices)
+                    continue
+                savepoint.rollback()
+                # Not all of them fit: take what does, in submission order
+                for i, (start_date, end_date) in zip(indices, windows):
+                    savepoint = db.session.begin_nested()
+                    if availability.reserve(car_id, start_date, end_date):
+                        savepoint.commit()
+                        booked.append(i)
+                    else:
+                        savepoint.rollback()
+                        unavailable.append(i)
+
+            booked.sort()
+            created = {}
+            if booked:
+                rows = db.session.execute(
+                    insert(Reservation).returning(*RESERVATION_INSERT_RETURNING, sort_by_parameter_order=True),
+                    [bookings[i] for i in booked],
+                ).all()
+                enqueue_booking_confirmations((row, cars[bookings[i]["car_id"]]) for i, row in zip(booked, rows))
+                created = {i: row.id for i, row in zip(booked, rows)}
+            db.session.commit()
+            return created, unavailable
+
+        created, unavailable = run_with_retry(book)
+        for index in unavailable:
+            results[index] = {"index": index, "status": 400, "error": "Car not available"}
+
+        if mode == "all_or_nothing" and unavailable:
+            return jsonify({"error": "Batch rejected", "results": sorted(results.values(), key=lambda r: r["index"])}), 400
+
+        for index, reservation_id in created.items():
+            results[index] = {"index": index, "status": 201, "reservation_id": reservation_id,
+                              "total_price": bookings[index]["total_price"]}
+
+        logger.info(f"Batch reservation: {len(created)} of {len(items)} created ({mode})")
+
+        if not created:
+            status = 400
+        elif len(created) < len(items):
+            status = 207
+        else:
+            status = 201
+        return jsonify({
+            "created": len(created),
+            "failed": len(items) - len(created),
+            "results": [results[i] for i in range(len(items))],
+            "email_sent": "queued"
+        }), status
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error creating reservation batch: {e}", exc_info=True)
+        return jsonify({"error": "Failed to create reservations"}), 500
+
+
+RESERVATION_SORT_FIELDS = {
+    "id": Reservation.id,
+    "firstname": Reservation.firstname,
+    "lastname": Reservation.lastname,
+    "email": Reservation.email,
+    "car_id": Reservation.car_id,
+    "start_date": Reservation.start_date,
+    "end_date": Reservation.end_date,
+    "total_price": Reservation.total_price,
+    "created_at": Reservation.created_at,
+}
+
+RESERVATION_EXPORT_FIELDS = [
+    "id", "firstname", "lastname", "email", "home", "cell", "car_name",
+    "start_date", "end_date", "total_price", "created_at"
+]
+
+EXPORT_BATCH_SIZE = 1000
+
+RESERVATION_DATE_FILTERS = {
+    "start_date_gte": lambda d: Reservation.start_date >= d,
+    "start_date_lte": lambda d: Reservation.start_date <= d,
+    "end_date_gte": lambda d: Reservation.end_date >= d,
+    "end_date_lte": lambda d: Reservation.end_date <= d,
+}
+
+RESERVATION_FILTER_FIELDS = ("id", "car_id", "email", "q", *RESERVATION_DATE_FILTERS)
+
+def reservation_filters(filters):
+    """Translate list filters into SQL criteria; raises ValueError on bad input"""
+    criteria = []
+    for key, value in filters.items():
+        if value in (None, ""):
+            continue
+        if key == "id":
+            ids = value if isinstance(value, list) else [value]
+            try:
+                criteria.append(Reservation.id.in_([int(i) for i in ids]))
+            except (TypeError, ValueError):
+                raise ValueError("Invalid id filter")
+        elif key == "car_id":
+            try:
+                criteria.append(Reservation.car_id == int(value))
+            except (TypeError, ValueError):
+                raise ValueError("Invalid car_id filter")
+        elif key == "email":
+            # react-admin's getMany sends a list
+            emails = value if isinstance(value, list) else [value]
+            if not all(isinstance(email, str) for email in emails):
+                raise ValueError("Invalid email filter")
+            criteria.append(Reservation.email.in_(emails))
+        elif key == "q":
+            pattern = f"%{value}%"
+            criteria.append(or_(
+                Reservation.firstname.ilike(pattern),
+                Reservation.lastname.ilike(pattern),
+                Reservation.email.ilike(pattern)
+            ))
+        elif key in RESERVATION_DATE_FILTERS:
+            try:
+                day = datetime.strptime(value, '%Y-%m-%d').date()
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid {key} filter. Use YYYY-MM-DD")
+            criteria.append(RESERVATION_DATE_FILTERS[key](day))
+        else:
+            raise ValueError(f"Cannot filter by {key}")
+    return criteria
+
 @bp.route("/reservations", methods=["GET"])
 def get_reservations():
     try:
-        reservations = Reservation.query.all()
-        reservation_list = [{
-            "id": r.id,
-            "firstname": r.firstname,
-            "lastname": r.lastname,
-            "email": r.email,
-            "home": r.home,
-            "cell": r.cell,
-            "car_name": r.car.name if r.car else "Unknown",
-            "start_date": r.start_date.isoformat(),
-            "end_date": r.end_date.isoformat(),
-            "total_price": r.total_price,
-            "created_at": r.created_at.isoformat()
-        } for r in reservations]
+        offset, limit = parse_window(request.args, request.headers)
+        sort_field, descending = parse_sort(request.args, RESERVATION_SORT_FIELDS, default=("created_at", True))
+        criteria = reservation_filters(parse_filters(request.args, RESERVATION_FILTER_FIELDS))
+        cursor = request.args.get("cursor")
+        if cursor:
+            if sort_field != "created_at":
+                raise ValueError("cursor pagination requires sorting by created_at")
+            after = tuple_(*decode_cursor(cursor))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        total_count = db.session.scalar(
+            select(func.count()).select_from(Reservation).where(*criteria)
+        )
+
+        # One joined, column-projected query: no ORM objects and no per-row car lookup
+        query = (
+            select(*RESERVATION_LIST_COLUMNS)
+            .outerjoin(Car, Car.id == Reservation.car_id)
+            .where(*criteria)
+        )
+
+        # Keyset pagination on (created_at, id) when a cursor is given, offset otherwise
+        if cursor:
+            key = tuple_(Reservation.created_at, Reservation.id)
+            query = query.where(key < after if descending else key > after)
+            offset = 0
+
+        sort_column = RESERVATION_SORT_FIELDS[sort_field]
+        if descending:
+            query = query.order_by(sort_column.desc(), Reservation.id.desc())
+        else:
+            query = query.order_by(sort_column.asc(), Reservation.id.asc())
+
+        reservations = db.session.execute(query.offset(offset).limit(limit)).all()
+        reservation_list = [serialize_reservation(r) for r in reservations]
 
         response = make_response(jsonify(reservation_list))
-        total_count = len(reservation_list)
-        response.headers['Content-Range'] = f"reservations 0-{total_count - 1}/{total_count}"
+        if reservation_list and not cursor:
+            response.headers['Content-Range'] = f"reservations {offset}-{offset + len(reservation_list) - 1}/{total_count}"
+        else:
+            response.headers['Content-Range'] = f"reservations */{total_count}"
+        response.headers['X-Total-Count'] = str(total_count)
+        last = reservations[-1] if reservations else None
+        if sort_field == "created_at" and len(reservations) == limit and last.created_at is not None:
+            response.headers['X-Next-Cursor'] = encode_cursor(last.created_at, last.id)
         return response
     except Exception as e:
         logger.error(f"Error fetching reservations: {e}")
         return jsonify({"error": "Failed to fetch reservations"}), 500
 
+@bp.route("/reservations/export", methods=["GET"])
+def export_reservations():
+    """Stream every reservation as NDJSON or CSV without buffering the table.
+
+    Archived reservations are included with include_archived=true.
+    """
+    export_format = request.args.get("format", "ndjson")
+    if export_format not in ("ndjson", "csv"):
+        return jsonify({"error": "format must be ndjson or csv"}), 400
+
+    # include_archived=true adds reservations moved to the archive table
+    source = archive.all_reservations() if request.args.get("include_archived") == "true" else Reservation.__table__
+    query = (
+        select(*reservation_list_columns(source))
+        .outerjoin(Car, Car.id == source.c.car_id)
+        .order_by(source.c.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    if request.args.get("since"):
+        try:
+            since = datetime.fromisoformat(request.args["since"])
+        except ValueError:
+            return jsonify({"error": "Invalid since. Use YYYY-MM-DD or an ISO 8601 timestamp"}), 400
+        query = query.where(source.c.created_at >= since)
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if export_format == "csv":
+            writer.writerow(RESERVATION_EXPORT_FIELDS)
+            yield buffer.getvalue()
+
+        try:
+            # yield_per streams through a server-side cursor, one batch in memory at a time
+            for batch in db.session.execute(query).partitions():
+                buffer.seek(0)
+                buffer.truncate()
+                # Both formats go through serialize_reservation, so dates are ISO 8601 in each
+                if export_format == "csv":
+                    for r in batch:
+                        record = serialize_reservation(r)
+                        writer.writerow([record[field] for field in RESERVATION_EXPORT_FIELDS])
+                else:
+                    for r in batch:
+                        buffer.write(serializers.dumps(serialize_reservation(r)))
+                        buffer.write("\n")
+                yield buffer.getvalue()
+        except Exception as e:
+            # Headers are already sent, so the client sees a truncated body
+            logger.error(f"Error exporting reservations: {e}", exc_info=True)
+            raise
+
+    mimetype = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers["Content-Disposition"] = f"attachment; filename=reservations.{export_format}"
+    return response
+
 @bp.route("/reservations/<int:id>", methods=["DELETE"])
 def cancel_reservation(id):
     try:
         reservation = Reservation.query.get_or_404(id)
-        car = Car.query.get(reservation.car_id)
-        if car:
-            car.quantity += 1
+        availability.release(reservation.car_id, reservation.start_date, reservation.end_date)
         
         db.session.delete(reservation)
         db.session.commit()
@@ -184,6 +800,12 @@ def cancel_reservation(id):
         logger.error(f"Error canceling reservation {id}: {e}")
         return jsonify({"error": "Failed to cancel reservation"}), 500
 
+# "outbox": /contact and /admin/send-email queue their emails for the email
+# worker and answer 202 without waiting on SMTP. "inline": send during the
+# request, for deployments that run no email worker.
+EMAIL_DELIVERY = os.getenv("EMAIL_DELIVERY", "outbox")
+
+
 @bp.route("/contact", methods=["POST", "OPTIONS"])
 def send_contact_message():
     """Handle contact form submissions"""
@@ -204,6 +826,22 @@ def send_contact_message():
             if field not in data or not data[field]:
                 return jsonify({"error": f"Missing required field: {field}"}), 400
         
+        if EMAIL_DELIVERY == "outbox":
+            # The email worker sends both messages; this request only writes two rows
+            enqueue_contact_message(
+                name=data.get('name'),
+                email=data.get('email'),
+                phone=data.get('phone', 'Not provided'),
+                message=data.get('message')
+            )
+            db.session.commit()
+            logger.info("Contact form emails queued")
+            return jsonify({
+                "message": "Message received",
+                "success": True,
+                "email_sent": "queued"
+            }), 202
+
         # Send email to admin
         success = email_service.send_contact_form_message(
             name=data.get('name'),
@@ -232,6 +870,7 @@ def send_contact_message():
             }), 500
             
     except Exception as e:
+        db.session.rollback()
         logger.error(f"Error processing contact form: {e}", exc_info=True)
         return jsonify({"error": "Failed to process contact form"}), 500
 
@@ -254,6 +893,21 @@ def admin_send_email():
             if field not in data or not data[field]:
                 return jsonify({"error": f"Missing required field: {field}"}), 400
         
+        if EMAIL_DELIVERY == "outbox":
+            message = enqueue_admin_email(
+                to_email=data.get('to'),
+                subject=data.get('subject'),
+                message=data.get('message'),
+                is_html=data.get('is_html', False)
+            )
+            db.session.commit()
+            return jsonify({
+                "message": "Email queued",
+                "success": True,
+                "email_sent": "queued",
+                "outbox_id": message.id
+            }), 202
+
         success = email_service.send_admin_email(
             to_email=data.get('to'),
             subject=data.get('subject'),
@@ -273,6 +927,7 @@ def admin_send_email():
             }), 500
             
     except Exception as e:
+        db.session.rollback()
         logger.error(f"Error sending admin email: {e}")
         return jsonify({"error": "Failed to send email"}), 500
 
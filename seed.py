@@ -1,5 +1,7 @@
 from create_app import create_app, db
-from models import Car, CarCategory
+from sqlalchemy import update
+from models import Car, CarCategory, category_id_for
+from catalog_cache import bump_catalog_version
 
 app = create_app()
 with app.app_context():
@@ -38,6 +40,9 @@ with app.app_context():
         db.session.add(car_category)
 
     db.session.bulk_save_objects(cars)
+    # bulk saves also skip the hook that links each car to its category
+    db.session.execute(update(Car).values(category_id=category_id_for(Car.category)))
+    bump_catalog_version()  # bulk saves skip the flush hook that normally bumps it
     db.session.commit()
     print(f"Seeded database with {len(cars)} unique cars and categories")
     db.session.bulk_save_objects(cars)
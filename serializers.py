@@ -0,0 +1,173 @@
+"""
+JSON encoding and column-projected serializers for API responses.
+
+JSONProvider is registered in create_app. It encodes with orjson when that
+is installed and falls back to Flask's stdlib provider otherwise; output is
+the same JSON either way (sorted keys, dates via Flask's default hook).
+
+The *_COLUMNS tuples select exactly the columns a response needs, and the
+matching serialize_* functions are compiled once at import into a single
+dict display over the row's positions. Listing endpoints select these
+columns and serialize the Row tuples directly, so no ORM instances, identity
+map entries or per-field Python loops are involved.
+"""
+
+import json
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import func
+
+from models import Car, CarCategory, Reservation
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+
+class JSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that uses orjson when it is installed"""
+
+    def _encode(self, obj, pretty=False):
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        try:
+            return self._encode(obj).decode()
+        except TypeError:  # e.g. integers beyond 64 bits
+            return super().dumps(obj)
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = self.compact is False or (self.compact is None and self._app.debug)
+        try:
+            body = self._encode(obj, pretty) + b"\n"
+        except TypeError:
+            return super().response(obj)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def dumps(obj):
+    """Compact JSON for one streamed record (NDJSON line); key order as given"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=DefaultJSONProvider.default, option=orjson.OPT_PASSTHROUGH_DATETIME).decode()
+    return json.dumps(obj, default=DefaultJSONProvider.default)
+
+
+def row_serializer(fields, name="serialize_row"):
+    """Compile a function mapping a row (in `fields` order) to a dict.
+
+    Each field is a key, or a (key, converter) pair whose converter is
+    applied to the value.
+    """
+    namespace = {}
+    items = []
+    for index, field in enumerate(fields):
+        key, convert = (field, None) if isinstance(field, str) else field
+        if not key.isidentifier():
+            raise ValueError(f"Invalid field name: {key!r}")
+        if convert is None:
+            items.append(f"{key!r}: row[{index}]")
+        else:
+            namespace[f"_convert_{index}"] = convert
+            items.append(f"{key!r}: _convert_{index}(row[{index}])")
+    source = f"def {name}(row):\n    return {{{', '.join(items)}}}\n"
+    exec(compile(source, f"<serializer {name}>", "exec"), namespace)
+    return namespace[name]
+
+
+def _number_or_zero(value):
+    return float(value) if value else 0
+
+
+def _int_or_zero(value):
+    return value or 0
+
+
+def _isoformat(value):
+    return value.isoformat()
+
+
+def _isoformat_or_none(value):
+    return value.isoformat() if value else None
+
+
+CAR_COLUMNS = (Car.id, Car.name, Car.model, Car.category, Car.price_per_day, Car.quantity, Car.category_id)
+
+serialize_car = row_serializer(
+    ["id", "name", "model", "category", ("price_per_day", _number_or_zero), ("quantity", _int_or_zero),
+     "category_id"],
+    name="serialize_car",
+)
+
+# A car search result with the window's free units appended to CAR_COLUMNS
+serialize_car_search = row_serializer(
+    ["id", "name", "model", "category", ("price_per_day", _number_or_zero), ("quantity", _int_or_zero),
+     "category_id", "available"],
+    name="serialize_car_search",
+)
+
+CAR_CATEGORY_COLUMNS = (CarCategory.id, CarCategory.title, CarCategory.image, CarCategory.description, CarCategory.rate)
+
+serialize_car_category = row_serializer(
+    ["id", "title", "image", "description", ("rate", _number_or_zero)],
+    name="serialize_car_category",
+)
+
+# Rows from availability.category_stats_query()
+serialize_car_category_stats = row_serializer(
+    ["id", "title", "image", "description", ("rate", _number_or_zero), "car_count", "total_units", "free_today"],
+    name="serialize_car_category_stats",
+)
+
+# Reservation listing joined to its car's name; used by the list and export endpoints
+RESERVATION_LIST_COLUMNS = (
+    Reservation.id,
+    Reservation.firstname,
+    Reservation.lastname,
+    Reservation.email,
+    Reservation.home,
+    Reservation.cell,
+    func.coalesce(Car.name, "Unknown").label("car_name"),
+    Reservation.start_date,
+    Reservation.end_date,
+    Reservation.total_price,
+    Reservation.created_at,
+)
+
+
+def reservation_list_columns(source):
+    """RESERVATION_LIST_COLUMNS taken from another table or subquery with the reservation columns"""
+    c = source.c
+    return (
+        c.id, c.firstname, c.lastname, c.email, c.home, c.cell,
+        func.coalesce(Car.name, "Unknown").label("car_name"),
+        c.start_date, c.end_date, c.total_price, c.created_at,
+    )
+
+
+serialize_reservation = row_serializer(
+    ["id", "firstname", "lastname", "email", "home", "cell", "car_name",
+     ("start_date", _isoformat), ("end_date", _isoformat), "total_price", ("created_at", _isoformat_or_none)],
+    name="serialize_reservation",
+)
+
+# Rows from availability.fleet_availability()
+serialize_availability = row_serializer(
+    ["car_id", "name", "model", "category", "quantity", "available"],
+    name="serialize_availability",
+)
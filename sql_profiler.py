@@ -0,0 +1,168 @@
+"""
+SQL statement counting, timing and slow-query logging.
+
+count_queries() records every statement an engine executes inside a block;
+assert_max_queries() turns that into a check, so an N+1 pattern (one query
+per row of a listing) fails loudly instead of slowing down quietly.
+
+init_sql_profiler(app) counts statements and DB time for every request
+(request_db_stats()), logs statements slower than SLOW_QUERY_MS with their
+normalised SQL, parameters and route, and with SLOW_QUERY_EXPLAIN=1 also
+logs the query plan of slow SELECTs. In debug mode (or with
+SQL_PROFILE_HEADER=1) responses carry the request's statement count and DB
+time in X-DB-Query-Count and Server-Timing headers.
+"""
+
+import logging
+import os
+import re
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+from extensions import db
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "").lower() in ("1", "true", "yes")
+PROFILE_HEADER = os.getenv("SQL_PROFILE_HEADER", "").lower() in ("1", "true", "yes")
+MAX_LOGGED_PARAMS = 500
+
+
+class QueryLog:
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def __str__(self):
+        return "\n".join(f"  {n}. {sql}" for n, sql in enumerate(self.statements, 1))
+
+
+@contextmanager
+def count_queries(engine=None):
+    """Record the SQL executed on `engine` (default: db.engine) inside the block"""
+    engine = engine or db.engine
+    log = QueryLog()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        log.statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield log
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+@contextmanager
+def assert_max_queries(limit, engine=None):
+    """Fail if the block executes more than `limit` SQL statements"""
+    with count_queries(engine) as log:
+        yield log
+    if log.count > limit:
+        raise AssertionError(f"Expected at most {limit} queries, got {log.count}:\n{log}")
+
+
+def time_statements(engine, callback):
+    """Call callback(conn, statement, parameters, executemany, elapsed_seconds) after every statement"""
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("statement_started", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["statement_started"].pop()
+        callback(conn, statement, parameters, executemany, time.perf_counter() - started)
+
+    def handle_error(context):
+        started = context.connection.info.get("statement_started") if context.connection else None
+        if started:
+            started.pop()
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "handle_error", handle_error)
+
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%\(\w+\)s|(?<!:):\w+|\$\d+|\?")
+_IN_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+def normalise_sql(statement):
+    """Statement with whitespace collapsed and literals/placeholders replaced by ?"""
+    statement = " ".join(statement.split())
+    statement = _LITERALS.sub("?", statement)
+    return _IN_LISTS.sub("(?, ...)", statement)
+
+
+def request_db_stats():
+    """(statements, seconds) spent in SQL by the current request so far"""
+    if not has_request_context():
+        return 0, 0.0
+    return g.get("db_statements", 0), g.get("db_seconds", 0.0)
+
+
+def _route():
+    if not has_request_context():
+        return "-"
+    rule = request.url_rule.rule if request.url_rule is not None else request.path
+    return f"{request.method} {rule}"
+
+
+def _explain(conn, statement, parameters):
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    conn.info["explaining"] = True
+    try:
+        # In a savepoint: on Postgres a failed EXPLAIN would otherwise abort the request's transaction
+        with conn.begin_nested():
+            rows = conn.exec_driver_sql(prefix + statement, parameters).all()
+    except Exception as e:
+        return f"(EXPLAIN failed: {e})"
+    finally:
+        conn.info["explaining"] = False
+    return "\n".join("    " + " | ".join(str(col) for col in row) for row in rows)
+
+
+def _on_statement(conn, statement, parameters, executemany, elapsed):
+    if conn.info.get("explaining"):
+        return
+    if has_request_context():
+        g.db_statements = g.get("db_statements", 0) + 1
+        g.db_seconds = g.get("db_seconds", 0.0) + elapsed
+
+    elapsed_ms = elapsed * 1000
+    if elapsed_ms < SLOW_QUERY_MS:
+        return
+    params = repr(parameters)
+    if len(params) > MAX_LOGGED_PARAMS:
+        params = params[:MAX_LOGGED_PARAMS] + "..."
+    message = f"Slow query ({elapsed_ms:.1f} ms) in {_route()}: {normalise_sql(statement)} params={params}"
+    if SLOW_QUERY_EXPLAIN and not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        message += "\n" + _explain(conn, statement, parameters)
+    logger.warning(message)
+
+
+def _start_request():
+    g.db_statements = 0
+    g.db_seconds = 0.0
+
+
+def _add_profile_headers(response):
+    if current_app.debug or PROFILE_HEADER:
+        statements, seconds = request_db_stats()
+        response.headers["X-DB-Query-Count"] = str(statements)
+        response.headers["Server-Timing"] = f'db;dur={seconds * 1000:.1f};desc="{statements} queries"'
+    return response
+
+
+def init_sql_profiler(app):
+    """Count statements and DB time per request on db.engine and log slow ones"""
+    with app.app_context():
+        time_statements(db.engine, _on_statement)
+    app.before_request(_start_request)
+    app.after_request(_add_profile_headers)
@@ -0,0 +1,109 @@
+"""
+Checks for reservation archival.
+
+On an in-memory SQLite app with past and future bookings: an archive run
+stopped after one batch moves exactly that batch and leaves occupancy
+alone, rerunning finishes the job, future and in-progress rentals stay
+put, past occupancy rows are dropped, and the export only includes
+archived reservations when asked to and formats its CSV columns like
+its NDJSON ones.
+
+Run directly (python test_archive.py) or under pytest.
+"""
+
+import csv
+import io
+import json
+import os
+import sys
+from datetime import date, timedelta
+
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+
+from sqlalchemy import func, select
+
+import availability
+from create_app import create_app
+from extensions import db
+from models import Car, CarOccupancy, Reservation, ReservationArchive
+
+PAST = 25
+CURRENT_AND_FUTURE = 5
+
+
+def _count(model, *where):
+    return db.session.execute(select(func.count()).select_from(model).where(*where)).scalar()
+
+
+def build_app():
+    app = create_app()
+    today = date.today()
+    with app.app_context():
+        db.create_all()
+        db.session.add(Car(name="Jeep Wrangler", model="2023", category="SUV", price_per_day=90, quantity=100))
+        db.session.flush()
+        windows = [(today - timedelta(days=400 - 10 * n), today - timedelta(days=397 - 10 * n)) for n in range(PAST)]
+        windows.append((today - timedelta(days=2), today + timedelta(days=2)))  # in progress
+        windows += [(today + timedelta(days=10 * n), today + timedelta(days=10 * n + 3)) for n in range(1, CURRENT_AND_FUTURE)]
+        for n, (start, end) in enumerate(windows):
+            db.session.add(Reservation(
+                firstname="Test", lastname=f"User {n}", email=f"user{n}@example.com", car_id=1,
+                start_date=start, end_date=end, total_price=270,
+            ))
+            availability.reserve(1, start, end)
+        db.session.commit()
+    return app
+
+
+def check_archive():
+    app = build_app()
+    today = date.today()
+    runner = app.test_cli_runner()
+    client = app.test_client()
+    with app.app_context():
+        # Asking for a future date still only archives rentals that are over
+        before = (today + timedelta(days=30)).isoformat()
+        result = runner.invoke(args=["reservations", "archive", f"--before={before}", "--batch-size=10", "--max-batches=1"])
+        assert result.exit_code == 0, result.output
+        assert _count(ReservationArchive) == 10, "first batch did not move exactly one batch"
+        assert _count(Reservation) == PAST + CURRENT_AND_FUTURE - 10
+        assert _count(CarOccupancy, CarOccupancy.day < today) > 0, "occupancy purged before archiving finished"
+
+        result = runner.invoke(args=["reservations", "archive", f"--before={before}", "--batch-size=10"])
+        assert result.exit_code == 0, result.output
+        assert _count(ReservationArchive) == PAST
+        assert _count(Reservation) == CURRENT_AND_FUTURE
+        assert _count(Reservation, Reservation.end_date < today) == 0
+        assert _count(CarOccupancy, CarOccupancy.day < today) == 0, "past occupancy rows were kept"
+        assert _count(CarOccupancy, CarOccupancy.day >= today) > 0, "current occupancy rows were removed"
+        assert availability.units_free(1, today, today + timedelta(days=1)) == 99
+
+        archived_ids = set(db.session.execute(select(ReservationArchive.id)).scalars())
+        live_ids = set(db.session.execute(select(Reservation.id)).scalars())
+        assert not archived_ids & live_ids, "a reservation is in both tables"
+
+    live = client.get("/reservations/export").get_data(as_text=True).splitlines()
+    everything = client.get("/reservations/export?include_archived=true").get_data(as_text=True).splitlines()
+    assert len(live) == CURRENT_AND_FUTURE
+    assert len(everything) == PAST + CURRENT_AND_FUTURE
+    assert json.loads(everything[0])["car_name"] == "Jeep Wrangler"
+
+    # The CSV export formats every column as the NDJSON export does
+    rows = list(csv.DictReader(io.StringIO(client.get("/reservations/export?format=csv").get_data(as_text=True))))
+    assert len(rows) == CURRENT_AND_FUTURE
+    for row, line in zip(rows, live):
+        record = json.loads(line)
+        assert row == {field: "" if value is None else str(value) for field, value in record.items()}, row
+
+
+def test_archive():
+    check_archive()
+
+
+if __name__ == "__main__":
+    try:
+        check_archive()
+    except AssertionError as e:
+        print(f"FAIL {e}")
+        sys.exit(1)
+    print("Reservation archival OK")
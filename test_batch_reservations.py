@@ -0,0 +1,119 @@
+"""
+Checks for POST /reservations/batch.
+
+On an in-memory SQLite app with a two-unit and a one-unit car: in
+all_or_nothing mode an invalid item, or items that together exhaust a
+car's stock, reject the whole batch and leave no reservations or
+occupancy rows behind (even for a car that was already reserved); in
+partial mode duplicate items for one car are booked in submission order
+until its stock runs out, the rest are reported per index, and the
+response is 207.
+
+Run directly (python test_batch_reservations.py) or under pytest.
+"""
+
+import os
+import sys
+from datetime import date
+
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+
+from sqlalchemy import func, select
+
+from create_app import create_app
+from extensions import db
+from models import Car, CarOccupancy, EmailOutbox, Reservation
+
+PAIR, SINGLE = 1, 2
+
+
+def _booking(car_id, start="2027-06-01", end="2027-06-03"):
+    return {
+        "car_id": car_id, "firstname": "Ada", "lastname": "Rolle", "email": "ada@example.com",
+        "start_date": start, "end_date": end,
+    }
+
+
+def _count(model):
+    return db.session.execute(select(func.count()).select_from(model)).scalar()
+
+
+def build_app():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        db.session.add(Car(name="Ford Focus", model="2023", category="Economy", price_per_day=70, quantity=2))
+        db.session.add(Car(name="Jeep Wrangler", model="2023", category="SUV", price_per_day=90, quantity=1))
+        db.session.commit()
+    return app
+
+
+def _assert_nothing_booked(app, message):
+    with app.app_context():
+        assert _count(Reservation) == 0 and _count(CarOccupancy) == 0, message
+
+
+def check_all_or_nothing(app):
+    client = app.test_client()
+
+    response = client.post("/reservations/batch", json={"reservations": [_booking(PAIR), _booking(99)]})
+    assert response.status_code == 400, response.get_json()
+    assert [r["status"] for r in response.get_json()["results"]] == [404]
+    _assert_nothing_booked(app, "an invalid item left rows behind")
+
+    # The pair car is reserved first (cars are locked in id order), then the single car runs out
+    batch = [_booking(PAIR), _booking(SINGLE), _booking(SINGLE, "2027-06-02", "2027-06-04")]
+    response = client.post("/reservations/batch", json={"reservations": batch})
+    assert response.status_code == 400, response.get_json()
+    assert {r["error"] for r in response.get_json()["results"]} == {"Car not available"}
+    _assert_nothing_booked(app, "a rejected batch left rows behind")
+
+
+def check_partial(app):
+    client = app.test_client()
+    batch = [
+        _booking(SINGLE),
+        _booking(PAIR),
+        _booking(SINGLE, "2027-06-02", "2027-06-04"),  # shares 06-02 with the first
+        _booking(PAIR),
+        _booking(PAIR, "2027-06-02", "2027-06-02"),  # a third unit on 06-02
+        _booking(SINGLE, "2027-06-03", "2027-06-05"),
+        {"car_id": PAIR},
+    ]
+    response = client.post("/reservations/batch", json={"reservations": batch, "mode": "partial"})
+    assert response.status_code == 207, response.get_json()
+    body = response.get_json()
+    assert [r["status"] for r in body["results"]] == [201, 201, 400, 201, 400, 201, 400]
+    assert body["results"][2]["error"] == body["results"][4]["error"] == "Car not available"
+    assert body["created"] == 4 and body["failed"] == 3
+
+    with app.app_context():
+        assert _count(Reservation) == 4
+        assert _count(EmailOutbox) == 4
+        booked = dict(
+            db.session.execute(
+                select(CarOccupancy.day, CarOccupancy.booked).where(CarOccupancy.car_id == SINGLE)
+            ).all()
+        )
+        # end_date is exclusive: 06-01 and 06-02 from the first, 06-03 and 06-04 from the last
+        assert booked == {date(2027, 6, d): 1 for d in range(1, 5)}, booked
+        assert db.session.execute(select(func.max(CarOccupancy.booked))).scalar() == 2, "a car was overbooked"
+
+
+def check_batches():
+    app = build_app()
+    check_all_or_nothing(app)
+    check_partial(app)
+
+
+def test_batch_reservations():
+    check_batches()
+
+
+if __name__ == "__main__":
+    try:
+        check_batches()
+    except AssertionError as e:
+        print(f"FAIL {e}")
+        sys.exit(1)
+    print("Batch reservations OK")
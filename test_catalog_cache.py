@@ -0,0 +1,152 @@
+"""
+Checks for the catalog payload cache.
+
+Against a temporary SQLite file (so concurrent requests use separate
+connections): many threads requesting GET /cars at once load the catalog
+from the database once between them, and a committed catalog edit bumps
+the version stamp so the next burst loads it exactly once more and every
+thread gets the new body and ETag. A failed refill is raised in every
+waiting thread and is not cached.
+
+Run directly (python test_catalog_cache.py) or under pytest.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+
+from sqlalchemy import event
+
+import catalog_cache
+from create_app import create_app
+from extensions import db
+from models import Car
+
+THREADS = 8
+ROUNDS = 3
+# Held inside each catalog load so the other threads arrive while it runs
+LOAD_DELAY = 0.2
+
+
+def build_app(path):
+    previous = os.environ["DATABASE_URL"]
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    try:
+        app = create_app()
+    finally:
+        os.environ["DATABASE_URL"] = previous
+    with app.app_context():
+        db.create_all()
+        db.session.add(Car(name="Ford Focus", model="2023", category="Economy", price_per_day=70, quantity=2))
+        db.session.commit()
+    return app
+
+
+def _burst(app):
+    barrier = threading.Barrier(THREADS)
+    responses = [None] * THREADS
+
+    def fetch(index):
+        client = app.test_client()
+        barrier.wait()
+        responses[index] = client.get("/cars")
+
+    threads = [threading.Thread(target=fetch, args=(n,)) for n in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return responses
+
+
+def check_single_flight():
+    # Other tests in the same process may have cached a catalog under the same version
+    catalog_cache.catalog_cache.clear()
+    catalog_cache._expire_memo()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        app = build_app(os.path.join(scratch, "catalog.db"))
+        loads = []
+
+        def count_loads(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().startswith("SELECT") and statement.rstrip().endswith("FROM cars"):
+                loads.append(statement)
+                time.sleep(LOAD_DELAY)
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, "before_cursor_execute", count_loads)
+        try:
+            etags = set()
+            for round_ in range(ROUNDS):
+                del loads[:]
+                responses = _burst(app)
+                assert [r.status_code for r in responses] == [200] * THREADS
+                assert len(loads) == 1, f"round {round_}: {len(loads)} catalog loads for one version"
+
+                price = 70 + round_
+                assert {r.get_json()[0]["price_per_day"] for r in responses} == {price}, "a thread got a stale body"
+                round_etags = {r.get_etag()[0] for r in responses}
+                assert len(round_etags) == 1 and not round_etags & etags, round_etags
+                etags |= round_etags
+
+                with app.app_context():
+                    db.session.get(Car, 1).price_per_day = price + 1
+                    db.session.commit()
+        finally:
+            event.remove(engine, "before_cursor_execute", count_loads)
+            with app.app_context():
+                db.session.remove()
+                engine.dispose()
+
+
+def check_failed_refill():
+    cache = catalog_cache.CatalogCache()
+    barrier = threading.Barrier(THREADS)
+    builds = []
+    outcomes = [None] * THREADS
+
+    def build():
+        builds.append(1)
+        time.sleep(LOAD_DELAY)
+        raise RuntimeError("database went away")
+
+    def fetch(index):
+        barrier.wait()
+        try:
+            outcomes[index] = cache.get("cars", 1, build)
+        except RuntimeError as e:
+            outcomes[index] = e
+
+    threads = [threading.Thread(target=fetch, args=(n,)) for n in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(builds) == 1, f"{len(builds)} refills for one version"
+    assert all(isinstance(o, RuntimeError) for o in outcomes), outcomes
+    # Not cached: the next request tries again
+    assert cache.get("cars", 1, lambda: "rebuilt") == "rebuilt"
+
+
+def test_single_flight():
+    check_single_flight()
+
+
+def test_failed_refill():
+    check_failed_refill()
+
+
+if __name__ == "__main__":
+    try:
+        check_single_flight()
+        check_failed_refill()
+    except AssertionError as e:
+        print(f"FAIL {e}")
+        sys.exit(1)
+    print("Catalog cache OK")
@@ -0,0 +1,85 @@
+"""
+Checks for response compression.
+
+On an in-memory SQLite app: Accept-Encoding negotiation (including q=0),
+the minimum size, Vary and weak ETags on encoded catalog responses, 304
+revalidation with the weak ETag, chunked compression of the streamed
+export, and that the cached catalog encoding is not recompressed.
+
+Run directly (python test_compression.py) or under pytest.
+"""
+
+import gzip
+import os
+import sys
+
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+
+import catalog_cache
+import compression
+import metrics
+from test_query_counts import build_app
+
+
+def check_compression():
+    metrics.registry.reset()
+    # Other tests in the same process may have cached a catalog under the same version
+    catalog_cache.catalog_cache.clear()
+    catalog_cache._expire_memo()
+    app = build_app(cars=40, reservations=50)
+    client = app.test_client()
+
+    plain = client.get("/cars")
+    assert "Content-Encoding" not in plain.headers
+    assert "Accept-Encoding" in plain.headers.get("Vary", "")
+    assert len(plain.get_data()) >= compression.MIN_SIZE
+
+    encoded = client.get("/cars", headers={"Accept-Encoding": "gzip"})
+    assert encoded.headers.get("Content-Encoding") == "gzip"
+    assert "Accept-Encoding" in encoded.headers.get("Vary", "")
+    assert gzip.decompress(encoded.get_data()) == plain.get_data()
+    assert len(encoded.get_data()) < len(plain.get_data())
+    etag, weak = encoded.get_etag()
+    assert weak, "encoded catalog response kept a strong ETag"
+
+    revalidated = client.get("/cars", headers={"Accept-Encoding": "gzip", "If-None-Match": f'W/"{etag}"'})
+    assert revalidated.status_code == 304
+
+    refused = client.get("/cars", headers={"Accept-Encoding": "gzip;q=0, identity"})
+    assert "Content-Encoding" not in refused.headers
+
+    small = client.get("/car-categories", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in small.headers, "body under COMPRESS_MIN_SIZE was compressed"
+
+    listing = client.get("/reservations", headers={"Accept-Encoding": "gzip"})
+    assert listing.headers.get("Content-Encoding") == "gzip"
+    assert gzip.decompress(listing.get_data()).startswith(b"[")
+
+    export = client.get("/reservations/export?format=ndjson", headers={"Accept-Encoding": "gzip"})
+    assert export.headers.get("Content-Encoding") == "gzip"
+    assert "Content-Length" not in export.headers
+    assert len(gzip.decompress(export.get_data()).splitlines()) == 50
+
+    # A cached catalog encoding costs no compression CPU
+    with app.test_request_context("/cars", headers={"Accept-Encoding": "gzip"}):
+        app.preprocess_request()
+        app.dispatch_request()
+        from flask import g
+        assert g.compression_seconds == 0.0, "cached catalog body was compressed again"
+
+    text = client.get("/metrics").get_data(as_text=True)
+    assert 'http_response_bytes_total{endpoint="/cars",method="GET",encoding="gzip"}' in text
+    assert 'http_response_uncompressed_bytes_total{endpoint="/cars",method="GET"}' in text
+
+
+def test_compression():
+    check_compression()
+
+
+if __name__ == "__main__":
+    try:
+        check_compression()
+    except AssertionError as e:
+        print(f"FAIL {e}")
+        sys.exit(1)
+    print("Response compression OK")
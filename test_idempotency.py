@@ -0,0 +1,134 @@
+"""
+Checks for Idempotency-Key on POST /reservations.
+
+Against a temporary SQLite file (so concurrent requests use separate
+connections): a repeated key replays the first response without booking
+again, the same key with a different body is refused with 422, several
+copies of one request racing on a key book exactly once and all get the
+winner's response, and `flask idempotency-keys purge` removes only
+expired keys.
+
+Run directly (python test_idempotency.py) or under pytest.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+from datetime import date, datetime, timedelta
+
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+
+from sqlalchemy import func, select
+
+from create_app import create_app
+from extensions import db
+from models import Car, EmailOutbox, IdempotencyKey, Reservation
+
+RACERS = 8
+
+BOOKING = {
+    "car_id": 1, "firstname": "Ada", "lastname": "Rolle", "email": "ada@example.com",
+    "start_date": "2027-03-01", "end_date": "2027-03-04",
+}
+
+
+def _count(model, *where):
+    return db.session.execute(select(func.count()).select_from(model).where(*where)).scalar()
+
+
+def build_app(path):
+    previous = os.environ["DATABASE_URL"]
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    try:
+        app = create_app()
+    finally:
+        os.environ["DATABASE_URL"] = previous
+    with app.app_context():
+        db.create_all()
+        db.session.add(Car(name="Jeep Wrangler", model="2023", category="SUV", price_per_day=90, quantity=100))
+        db.session.commit()
+    return app
+
+
+def _post(client, key, body):
+    return client.post("/reservations", json=body, headers={"Idempotency-Key": key})
+
+
+def check_replay(app):
+    client = app.test_client()
+    first = _post(client, "replay-1", BOOKING)
+    assert first.status_code == 201, first.get_json()
+    again = _post(client, "replay-1", BOOKING)
+    assert again.status_code == 201
+    assert again.get_json() == first.get_json(), "replay returned a different body"
+    assert again.headers.get("Idempotent-Replayed") == "true"
+
+    different = _post(client, "replay-1", dict(BOOKING, end_date="2027-03-05"))
+    assert different.status_code == 422, different.get_json()
+
+    with app.app_context():
+        assert _count(Reservation) == 1, "a replayed key booked again"
+        assert _count(EmailOutbox) == 1, "a replayed key queued another confirmation"
+
+
+def check_concurrent_claim(app):
+    barrier = threading.Barrier(RACERS)
+    responses = [None] * RACERS
+
+    def race(index):
+        client = app.test_client()
+        barrier.wait()
+        responses[index] = _post(client, "race-1", dict(BOOKING, start_date="2027-04-01", end_date="2027-04-03"))
+
+    threads = [threading.Thread(target=race, args=(n,)) for n in range(RACERS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    statuses = [r.status_code for r in responses]
+    assert statuses == [201] * RACERS, statuses
+    ids = {r.get_json()["reservation_id"] for r in responses}
+    assert len(ids) == 1, f"racing copies of one request booked {len(ids)} reservations"
+    with app.app_context():
+        assert _count(Reservation, Reservation.start_date == date(2027, 4, 1)) == 1
+
+
+def check_purge(app):
+    client = app.test_client()
+    assert _post(client, "purge-old", dict(BOOKING, start_date="2027-05-01", end_date="2027-05-02")).status_code == 201
+    with app.app_context():
+        db.session.get(IdempotencyKey, "purge-old").expires_at = datetime.utcnow() - timedelta(minutes=1)
+        db.session.commit()
+        live = _count(IdempotencyKey) - 1
+
+        result = app.test_cli_runner().invoke(args=["idempotency-keys", "purge"])
+        assert result.exit_code == 0, result.output
+        assert "Purged 1 expired" in result.output, result.output
+        assert db.session.get(IdempotencyKey, "purge-old") is None
+        assert _count(IdempotencyKey) == live, "purge removed live keys"
+
+
+def check_idempotency():
+    with tempfile.TemporaryDirectory() as scratch:
+        app = build_app(os.path.join(scratch, "idempotency.db"))
+        check_replay(app)
+        check_concurrent_claim(app)
+        check_purge(app)
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+
+
+def test_idempotency():
+    check_idempotency()
+
+
+if __name__ == "__main__":
+    try:
+        check_idempotency()
+    except AssertionError as e:
+        print(f"FAIL {e}")
+        sys.exit(1)
+    print("Idempotency-Key OK")
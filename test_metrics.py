@@ -0,0 +1,126 @@
+"""
+Checks for the /metrics endpoint.
+
+Serves a few requests on an in-memory SQLite app, then verifies the
+Prometheus exposition: per-endpoint counters and histograms, DB time
+attribution, and that snapshots from other worker processes are merged
+(counters summed, gauges of exited workers dropped). Retiring exited
+workers folds their counters into retired.json and removes their
+snapshots without changing the merged totals.
+
+Run directly (python test_metrics.py) or under pytest.
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+
+import metrics
+from test_query_counts import build_app
+
+DEAD_PID = 2 ** 22 + 1  # above Linux's pid_max, so never a live process
+
+
+def _sample(text, name, **labels):
+    wanted = ",".join(f'{k}="{v}"' for k, v in labels.items())
+    for line in text.splitlines():
+        if line.startswith(f"{name}{{{wanted}}} "):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{name}{{{wanted}}} not found")
+
+
+def check_metrics():
+    metrics.registry.reset()
+    app = build_app(cars=2, reservations=20)
+    client = app.test_client()
+    for _ in range(3):
+        assert client.get("/cars").status_code == 200
+    assert client.get("/no-such-route").status_code == 404
+
+    text = client.get("/metrics").get_data(as_text=True)
+    assert _sample(text, "http_requests_total", endpoint="/cars", method="GET", status="200") == 3
+    assert _sample(text, "http_requests_total", endpoint="unmatched", method="GET", status="404") == 1
+    assert _sample(text, "http_request_duration_seconds_bucket", endpoint="/cars", method="GET", le="+Inf") == 3
+    assert _sample(text, "http_request_db_statements_total", endpoint="/cars", method="GET") >= 1
+    assert _sample(text, "http_requests_in_flight", endpoint="/cars", method="GET") == 0
+    _sample(text, "http_request_duration_quantile_seconds", endpoint="/cars", method="GET", quantile=0.99)
+
+    other = {
+        "pid": DEAD_PID,
+        "counters": {
+            "requests": [["/cars", "GET", "200", 7]],
+            "durations": [["/cars", "GET", [7] + [0] * len(metrics.BUCKETS) + [0.01]]],
+        },
+        "in_flight": [["/cars", "GET", 5]],
+        "pools": {},
+    }
+    merged = metrics.merge([metrics.registry.snapshot(), other])
+    assert merged["requests"][("/cars", "GET", "200")] == 10
+    assert merged["durations"][("/cars", "GET")][len(metrics.BUCKETS)] == 0
+    assert merged["in_flight"].get(("/cars", "GET"), 0) == 0, "gauge of an exited worker was kept"
+
+    histogram = [0] * (len(metrics.BUCKETS) + 1) + [0.0]
+    histogram[metrics.BUCKETS.index(0.1)] = 100
+    assert metrics.BUCKETS[3] <= metrics.estimate_quantile(0.5, histogram) <= 0.1
+
+
+def _write_snapshot(directory, pid, requests):
+    with open(os.path.join(directory, f"{pid}.json"), "w") as f:
+        json.dump({
+            "pid": pid,
+            "counters": {"requests": [["/cars", "GET", "200", requests]]},
+            "in_flight": [["/cars", "GET", 1]],
+            "pools": {},
+        }, f)
+
+
+def check_retire():
+    metrics.registry.reset()
+    previous = metrics.METRICS_DIR
+    with tempfile.TemporaryDirectory() as directory:
+        metrics.METRICS_DIR = directory
+        try:
+            _write_snapshot(directory, DEAD_PID, 7)
+            _write_snapshot(directory, DEAD_PID + 1, 5)
+            before = metrics.merge(metrics.collect())["requests"][("/cars", "GET", "200")]
+
+            metrics.retire(DEAD_PID)
+            metrics.retire(DEAD_PID + 1)
+            metrics.retire(DEAD_PID + 2)  # never wrote a snapshot
+            assert sorted(os.listdir(directory)) == [metrics.RETIRED_FILE], os.listdir(directory)
+            merged = metrics.merge(metrics.collect())
+            assert merged["requests"][("/cars", "GET", "200")] == before == 12, "retiring changed a counter"
+            assert list(merged["pools"]) == [os.getpid()]
+
+            # A scrape between rewriting retired.json and removing the snapshot counts it once
+            _write_snapshot(directory, DEAD_PID, 3)
+            with open(os.path.join(directory, metrics.RETIRED_FILE)) as f:
+                retired = json.load(f)
+            retired["counters"]["requests"][0][-1] += 3
+            retired["retired"] = [DEAD_PID]
+            with open(os.path.join(directory, metrics.RETIRED_FILE), "w") as f:
+                json.dump(retired, f)
+            assert metrics.merge(metrics.collect())["requests"][("/cars", "GET", "200")] == 15
+        finally:
+            metrics.METRICS_DIR = previous
+
+
+def test_metrics_exposition_and_merge():
+    check_metrics()
+
+
+def test_retire():
+    check_retire()
+
+
+if __name__ == "__main__":
+    try:
+        check_metrics()
+        check_retire()
+    except AssertionError as e:
+        print(f"FAIL {e}")
+        sys.exit(1)
+    print("Metrics exposition and cross-process merge OK")
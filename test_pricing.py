@@ -0,0 +1,150 @@
+"""
+Checks for the pricing engine and server-side booking prices.
+
+PricingRules is exercised directly: seasons that cover a rental fully,
+partly or overlap each other (a category's own season wins over a
+fleet-wide one, the highest multiplier wins among seasons of one kind),
+weekly discounts just below, at and above their min_days, and cars priced
+from their category's rate. Through the app: a booking is stored at the
+quoted price, a stale client total_price is rejected with 409 without
+booking anything, and an over-long booking is rejected with 400.
+
+Run directly (python test_pricing.py) or under pytest.
+"""
+
+import os
+import sys
+from datetime import date, timedelta
+
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+
+from sqlalchemy import func, select
+
+from create_app import create_app
+from extensions import db
+from models import Car, CarCategory, CarOccupancy, Reservation, SeasonalRate, WeeklyDiscount
+from pricing import Discount, PricingRules, Season
+
+ECONOMY, SUV, UNPRICED = 1, 2, 3
+CARS = {ECONOMY: (100.0, "Economy"), SUV: (None, "SUV"), UNPRICED: (None, "Vintage")}
+
+RULES = PricingRules(
+    {"Economy": 80.0, "SUV": 100.0},
+    [
+        Season(None, date(2027, 3, 1), date(2027, 3, 10), 1.5),
+        Season(None, date(2027, 3, 5), date(2027, 3, 6), 2.0),  # overlaps the fleet-wide season above
+        Season("SUV", date(2027, 3, 8), date(2027, 3, 20), 1.2),  # beats the fleet-wide 1.5 for SUVs
+    ],
+    [
+        Discount(None, 7, 10.0),
+        Discount("SUV", 8, 15.0),
+    ],
+)
+
+
+def _total(car_id, start, end):
+    quote = RULES.quote_many([(car_id, start, end)], CARS)[0]
+    return quote and quote["total_price"]
+
+
+def check_seasons():
+    # Starts before the season: two plain days, two at x1.5
+    assert _total(ECONOMY, date(2027, 2, 27), date(2027, 3, 3)) == 500.0
+    # Ends after the season: x1.5, x1.5, then two plain days
+    assert _total(ECONOMY, date(2027, 3, 9), date(2027, 3, 13)) == 500.0
+    # Overlapping fleet-wide seasons: the higher multiplier applies on the shared days
+    assert _total(ECONOMY, date(2027, 3, 4), date(2027, 3, 7)) == 550.0
+    # The SUV season replaces the fleet-wide one for SUVs only
+    assert _total(SUV, date(2027, 3, 9), date(2027, 3, 12)) == 360.0
+    assert _total(ECONOMY, date(2027, 3, 9), date(2027, 3, 12)) == 400.0
+    # Entirely outside every season, and a same-day rental is one day
+    assert _total(ECONOMY, date(2027, 5, 1), date(2027, 5, 3)) == 200.0
+    assert _total(ECONOMY, date(2027, 5, 1), date(2027, 5, 1)) == 100.0
+
+
+def check_discounts():
+    start = date(2027, 4, 1)
+    # Fleet-wide 10% from 7 days
+    assert _total(ECONOMY, start, start + timedelta(days=6)) == 600.0
+    assert _total(ECONOMY, start, start + timedelta(days=7)) == 630.0
+    assert _total(ECONOMY, start, start + timedelta(days=8)) == 720.0
+    # SUVs also get 15% from 8 days; the best discount applies
+    assert _total(SUV, start, start + timedelta(days=7)) == 630.0
+    assert _total(SUV, start, start + timedelta(days=8)) == 680.0
+
+
+def check_rates():
+    # SUV has no price_per_day, so its category rate is used
+    quote = RULES.quote_many([(SUV, date(2027, 5, 1), date(2027, 5, 2))], CARS)[0]
+    assert quote["daily_rate"] == 100.0
+    # No car price and no category rate, or an unknown car: no quote
+    assert RULES.quote_many([(UNPRICED, date(2027, 5, 1), date(2027, 5, 2))], CARS) == [None]
+    assert RULES.quote_many([(99, date(2027, 5, 1), date(2027, 5, 2))], CARS) == [None]
+
+
+def _count(model):
+    return db.session.execute(select(func.count()).select_from(model)).scalar()
+
+
+def check_booking_prices():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        db.session.add(CarCategory(title="Economy", rate=80))
+        db.session.add(Car(name="Ford Focus", model="2023", category="Economy", price_per_day=100, quantity=3))
+        db.session.add(SeasonalRate(name="Spring", start_date=date(2027, 3, 1), end_date=date(2027, 3, 10), multiplier=1.5))
+        db.session.add(WeeklyDiscount(min_days=7, percent_off=10))
+        db.session.commit()
+
+    client = app.test_client()
+    booking = {
+        "car_id": 1, "firstname": "Ada", "lastname": "Rolle", "email": "ada@example.com",
+        "start_date": "2027-03-08", "end_date": "2027-03-12",  # 1.5 + 1.5 + 1.5 + 1 days
+    }
+
+    response = client.post("/reservations", json=dict(booking, total_price=400))
+    assert response.status_code == 409, response.get_json()
+    assert response.get_json()["quote"]["total_price"] == 550.0
+    with app.app_context():
+        assert _count(Reservation) == 0 and _count(CarOccupancy) == 0, "a rejected booking left rows behind"
+
+    response = client.post("/reservations", json=dict(booking, total_price=550))
+    assert response.status_code == 201, response.get_json()
+    assert response.get_json()["total_price"] == 550.0
+
+    # total_price is optional; the server's price is stored
+    response = client.post("/reservations", json=booking)
+    assert response.status_code == 201, response.get_json()
+    with app.app_context():
+        assert [r.total_price for r in Reservation.query.order_by(Reservation.id)] == [550.0, 550.0]
+
+    too_long = dict(booking, start_date="2027-03-01", end_date="2077-03-01")
+    assert client.post("/reservations", json=too_long).status_code == 400
+
+
+def test_seasons():
+    check_seasons()
+
+
+def test_discounts():
+    check_discounts()
+
+
+def test_rates():
+    check_rates()
+
+
+def test_booking_prices():
+    check_booking_prices()
+
+
+if __name__ == "__main__":
+    try:
+        check_seasons()
+        check_discounts()
+        check_rates()
+        check_booking_prices()
+    except AssertionError as e:
+        print(f"FAIL {e}")
+        sys.exit(1)
+    print("Pricing OK")
@@ -0,0 +1,99 @@
+"""
+Query-count checks for the list endpoints.
+
+Seeds an in-memory SQLite database with several cars and a few hundred
+reservations, then asserts that each listing, and POST /quotes, is served
+by a fixed number of SQL statements however many rows it handles. A lazy
+relationship touched per row (the N+1 pattern) makes these fail.
+
+Run directly (python test_query_counts.py) or under pytest.
+"""
+
+import os
+import sys
+from datetime import date, timedelta
+
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+
+from create_app import create_app
+from extensions import db
+from models import Car, CarCategory, Reservation
+from sql_profiler import assert_max_queries
+
+# (path, statements allowed for the whole request)
+REQUESTS = [
+    ("/reservations?_start=0&_end=500", 2),  # COUNT + page
+    # catalog version stamp (when not memoised) + listing
+    ("/cars", 2),
+    ("/car-categories", 2),
+    ("/car-categories?include=stats", 1),  # one GROUP BY, however many categories
+    ("/availability?start=2027-03-01&end=2027-03-08", 1),
+    ("/cars/search?category=Economy&max_price=100&start=2027-03-01&end=2027-03-08&sort=-available", 1),
+]
+
+# (path, JSON body, statements allowed) for POSTs
+POST_REQUESTS = [
+    # version stamp + pricing rules (categories, seasons, discounts) + fleet rates, however many quotes
+    ("/quotes", {"quotes": [
+        {"car_id": n % 8 + 1, "start_date": "2027-03-01", "end_date": f"2027-03-{n % 20 + 2:02d}"} for n in range(200)
+    ]}, 5),
+]
+
+
+def build_app(cars=8, reservations=400):
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        db.session.add(CarCategory(title="Economy", rate=70))
+        db.session.add_all(
+            Car(name=f"Car {n}", model="2023", category="Economy", price_per_day=70, quantity=50)
+            for n in range(cars)
+        )
+        db.session.flush()
+        db.session.add_all(
+            Reservation(
+                firstname="Test", lastname=f"User {n}", email=f"user{n}@example.com",
+                car_id=n % cars + 1, start_date=date(2027, 3, 1) + timedelta(days=n % 30),
+                end_date=date(2027, 3, 4) + timedelta(days=n % 30), total_price=210
+            )
+            for n in range(reservations)
+        )
+        db.session.commit()
+    return app
+
+
+def check_query_counts():
+    """Return a list of failure messages, one per endpoint over its budget"""
+    app = build_app()
+    client = app.test_client()
+    failures = []
+    with app.app_context():
+        for path, limit in REQUESTS:
+            try:
+                with assert_max_queries(limit):
+                    response = client.get(path)
+                assert response.status_code == 200, f"{path} returned {response.status_code}"
+            except AssertionError as e:
+                failures.append(f"{path}: {e}")
+        for path, body, limit in POST_REQUESTS:
+            try:
+                with assert_max_queries(limit):
+                    response = client.post(path, json=body)
+                assert response.status_code == 200, f"POST {path} returned {response.status_code}"
+            except AssertionError as e:
+                failures.append(f"POST {path}: {e}")
+    return failures
+
+
+def test_list_endpoints_do_not_issue_per_row_queries():
+    failures = check_query_counts()
+    assert not failures, "\n".join(failures)
+
+
+if __name__ == "__main__":
+    failures = check_query_counts()
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"All {len(REQUESTS) + len(POST_REQUESTS)} endpoints within their query budgets")
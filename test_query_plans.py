@@ -0,0 +1,160 @@
+"""
+Query-plan regression checks for the API's hot queries.
+
+Builds the schema from the models in an in-memory SQLite database, runs
+EXPLAIN QUERY PLAN on each query below and fails if any of them scans a
+table it is not allowed to scan, or sorts in a temp B-tree where an index
+should provide the order. Reading a whole index (SCAN ... USING INDEX)
+counts as a full scan unless the query opts in to it, as a LIMITed walk
+down an index does.
+
+Run directly (python test_query_plans.py) or under pytest.
+"""
+
+import os
+import sys
+from datetime import date, datetime
+
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+
+from sqlalchemy import select, tuple_
+from werkzeug.datastructures import MultiDict
+
+from create_app import create_app
+from extensions import db
+from models import Reservation, EmailOutbox
+import archive
+import availability
+from routes import car_search_query
+
+WINDOW = (date(2027, 3, 1), date(2027, 3, 8))
+
+
+def reservations_overlapping_window():
+    start_date, end_date = WINDOW
+    return select(Reservation.id).where(
+        Reservation.car_id == 1,
+        Reservation.start_date < end_date,
+        Reservation.end_date > start_date,
+    )
+
+
+def reservations_for_customer():
+    return select(Reservation.id, Reservation.start_date).where(Reservation.email == "ada@example.com")
+
+
+def newest_reservations_page():
+    return (
+        select(Reservation.id, Reservation.created_at)
+        .order_by(Reservation.created_at.desc(), Reservation.id.desc())
+        .limit(25)
+    )
+
+
+def reservations_after_cursor():
+    key = tuple_(Reservation.created_at, Reservation.id)
+    return (
+        select(Reservation.id, Reservation.created_at)
+        .where(key < tuple_(datetime(2027, 3, 1), 500))
+        .order_by(Reservation.created_at.desc(), Reservation.id.desc())
+        .limit(25)
+    )
+
+
+def due_outbox_messages():
+    return (
+        select(EmailOutbox.id)
+        .where(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= datetime(2027, 3, 1))
+        .limit(10)
+    )
+
+
+def fleet_availability():
+    return availability.fleet_availability_query(*WINDOW)
+
+
+def category_stats():
+    return availability.category_stats_query(WINDOW[0])
+
+
+def completed_reservations_batch():
+    return archive.archive_batch_query(WINDOW[0], 1000)
+
+
+def car_search_by_category():
+    query, _ = car_search_query(MultiDict({
+        "category": "Economy", "max_price": "90", "start": "2027-03-01", "end": "2027-03-08", "sort": "price",
+    }))
+    return query
+
+
+# (query builder, tables it may scan in full, tables it may walk an index of from one end,
+#  whether an index must supply the order)
+QUERIES = [
+    (reservations_overlapping_window, set(), set(), False),
+    (reservations_for_customer, set(), set(), False),
+    # The LIMIT stops the walk down (created_at, id) after one page
+    (newest_reservations_page, set(), {"reservations"}, True),
+    (reservations_after_cursor, set(), set(), True),
+    (due_outbox_messages, set(), set(), False),
+    # Every car is in the answer, so reading the whole (small) cars table is expected
+    (fleet_availability, {"cars"}, set(), False),
+    (completed_reservations_batch, set(), set(), False),
+    # Every category is in the answer; its cars and today's occupancy come from indexes
+    (category_stats, {"car_categories"}, set(), False),
+    # Category and price range from one index, which also gives the price order
+    (car_search_by_category, set(), set(), True),
+]
+
+
+def explain(statement):
+    compiled = statement.compile(dialect=db.engine.dialect, compile_kwargs={"literal_binds": True})
+    with db.engine.connect() as conn:
+        return [row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}")]
+
+
+def plan_problems(plan, allowed_scans, index_scans, ordered):
+    problems = []
+    for step in plan:
+        if step.startswith("SCAN "):
+            table = step.split()[1]
+            if "USING" in step:
+                if table not in index_scans:
+                    problems.append(f"full index scan: {step}")
+            elif table not in allowed_scans:
+                problems.append(f"full scan: {step}")
+        if ordered and "TEMP B-TREE FOR ORDER BY" in step:
+            problems.append(f"unindexed sort: {step}")
+    return problems
+
+
+def check_query_plans():
+    """Return {query name: (plan, problems)} for every query that regressed"""
+    app = create_app()
+    failures = {}
+    with app.app_context():
+        db.create_all()
+        for build, allowed_scans, index_scans, ordered in QUERIES:
+            plan = explain(build())
+            problems = plan_problems(plan, allowed_scans, index_scans, ordered)
+            if problems:
+                failures[build.__name__] = (plan, problems)
+    return failures
+
+
+def test_query_plans_use_indexes():
+    failures = check_query_plans()
+    assert not failures, failures
+
+
+if __name__ == "__main__":
+    failures = check_query_plans()
+    for name, (plan, problems) in failures.items():
+        print(f"FAIL {name}")
+        for step in plan:
+            print(f"    {step}")
+        for problem in problems:
+            print(f"  -> {problem}")
+    if failures:
+        sys.exit(1)
+    print(f"All {len(QUERIES)} query plans use indexes")
@@ -0,0 +1,82 @@
+"""
+Checks for the GET /reservations filters.
+
+On an in-memory SQLite app with a handful of reservations: react-admin's
+getMany list filters (filter={"id": [...]}, filter={"email": [...]}) match
+every listed value, unknown plain query parameters are ignored, and
+unknown or malformed keys inside `filter` are rejected with 400.
+
+Run directly (python test_reservation_filters.py) or under pytest.
+"""
+
+import json
+import os
+import sys
+from datetime import date, timedelta
+from urllib.parse import quote
+
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+
+from create_app import create_app
+from extensions import db
+from models import Car, Reservation
+
+RESERVATIONS = 6
+
+
+def build_app():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        db.session.add(Car(name="Ford Focus", model="2023", category="Economy", price_per_day=70, quantity=10))
+        db.session.flush()
+        db.session.add_all(
+            Reservation(
+                firstname="Test", lastname=f"User {n}", email=f"user{n}@example.com", car_id=1,
+                start_date=date(2027, 3, 1) + timedelta(days=n), end_date=date(2027, 3, 3) + timedelta(days=n),
+                total_price=140,
+            )
+            for n in range(RESERVATIONS)
+        )
+        db.session.commit()
+    return app
+
+
+def _get(client, path, **filters):
+    if filters:
+        path += ("&" if "?" in path else "?") + "filter=" + quote(json.dumps(filters))
+    return client.get(path)
+
+
+def check_filters():
+    client = build_app().test_client()
+
+    response = _get(client, "/reservations", email=["user1@example.com", "user4@example.com"])
+    assert response.status_code == 200, response.get_json()
+    assert sorted(r["email"] for r in response.get_json()) == ["user1@example.com", "user4@example.com"]
+
+    response = _get(client, "/reservations", email="user2@example.com")
+    assert [r["email"] for r in response.get_json()] == ["user2@example.com"]
+
+    response = _get(client, "/reservations", id=[1, 3])
+    assert sorted(r["id"] for r in response.get_json()) == [1, 3]
+
+    response = client.get("/reservations?email=user5@example.com&_=1700000000&view=compact")
+    assert response.status_code == 200, "unknown plain parameters must be ignored"
+    assert [r["email"] for r in response.get_json()] == ["user5@example.com"]
+
+    assert _get(client, "/reservations", email=[{"bad": 1}]).status_code == 400
+    assert _get(client, "/reservations", colour="red").status_code == 400
+
+
+def test_reservation_filters():
+    check_filters()
+
+
+if __name__ == "__main__":
+    try:
+        check_filters()
+    except AssertionError as e:
+        print(f"FAIL {e}")
+        sys.exit(1)
+    print("Reservation filters OK")
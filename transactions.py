@@ -0,0 +1,42 @@
+"""
+Bounded retry for write transactions that lose a race.
+
+Bookings for the same car on the same days contend for the same
+car_occupancy rows. Postgres may abort one side with a deadlock or
+serialization failure and SQLite reports "database is locked" when another
+connection holds the write lock; both are safe to retry from the start of
+the transaction after a short, jittered backoff.
+"""
+
+import os
+import random
+import time
+
+from sqlalchemy.exc import DBAPIError
+
+from extensions import db
+
+RETRY_ATTEMPTS = int(os.getenv("DB_RETRY_ATTEMPTS", "4"))
+RETRY_BASE_DELAY = float(os.getenv("DB_RETRY_BASE_DELAY", "0.02"))
+
+# serialization_failure, deadlock_detected, lock_not_available
+RETRYABLE_PGCODES = {"40001", "40P01", "55P03"}
+
+
+def is_retryable(error):
+    orig = getattr(error, "orig", None)
+    if getattr(orig, "pgcode", None) in RETRYABLE_PGCODES:
+        return True
+    return "database is locked" in str(orig)
+
+
+def run_with_retry(work, attempts=RETRY_ATTEMPTS, base_delay=RETRY_BASE_DELAY):
+    """Call work() (which must commit or roll back itself), retrying contention errors"""
+    for attempt in range(1, attempts + 1):
+        try:
+            return work()
+        except DBAPIError as e:
+            db.session.rollback()
+            if attempt == attempts or not is_retryable(e):
+                raise
+            time.sleep(base_delay * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5))